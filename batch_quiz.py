@@ -0,0 +1,148 @@
+"""Headless batch generation: one quiz (JSON) per PDF of a directory.
+
+Usage:
+    python -m batch_quiz INPUT_DIR OUTPUT_DIR [--quiz-type multiple-choice] [--num-questions 5]
+    python -m batch_quiz INPUT_DIR OUTPUT_DIR --fake-llm --fake-latency 1.5   # offline benchmark
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fake_llm import FakeQuizChatModel
+from instrumentation import Trace, enable_json_logs, get_metrics, metrics_path
+from llm_clients import get_chat_model, run_coroutine
+from parallel_generation import agenerate_chunked
+from quiz_multiple_lang import (
+    QuizMultipleChoice,
+    QuizOpenEnded,
+    QuizTrueFalse,
+    choose_language_and_template,
+    create_quiz_chain,
+    extract_document_from_pdf,
+)
+from token_counting import count_tokens
+
+SCHEMAS = {
+    "multiple-choice": QuizMultipleChoice,
+    "true-false": QuizTrueFalse,
+    "open-ended": QuizOpenEnded,
+}
+
+
+async def process_document(path: Path, output_dir: Path, llm, args, extract_pool, llm_slots):
+    trace = Trace("batch_quiz", trace_id=path.stem)
+    result = {"source": path.name, "quiz_type": args.quiz_type}
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        with trace.span("read") as span:
+            data = await loop.run_in_executor(extract_pool, path.read_bytes)
+            span["bytes"] = len(data)
+
+        # PyMuPDF releases the GIL while parsing: extractions overlap with LLM calls
+        with trace.span("extraction", method="pymupdf") as span:
+            document = await loop.run_in_executor(extract_pool, extract_document_from_pdf, data)
+            context = document.text
+            span["tokens_before"] = result["tokens_before"] = document.tokens_before
+            span["tokens_saved"] = result["tokens_saved"] = document.tokens_saved
+
+        # Detection and token counting are CPU-bound: off the event loop, so
+        # that the other documents' calls keep overlapping
+        result["language"], prompt_template = await asyncio.to_thread(
+            choose_language_and_template, args.quiz_type, context, trace)
+
+        schema = SCHEMAS[args.quiz_type]
+        chain = create_quiz_chain(prompt_template, llm, schema)
+        with trace.span("llm_queue"):
+            await llm_slots.acquire()
+        try:
+            with trace.span("llm", model=args.model) as span:
+                span["tokens_in"] = await asyncio.to_thread(count_tokens, prompt_template.format(
+                    num_questions=args.num_questions, quiz_context=context))
+                quiz = await agenerate_chunked(chain, schema, context, args.num_questions)
+                span["tokens_out"] = await asyncio.to_thread(count_tokens, quiz.model_dump_json())
+        finally:
+            llm_slots.release()
+        result["quiz"] = quiz.model_dump()
+    except Exception as err:
+        result["error"] = f"{type(err).__name__}: {err}"
+
+    result["timings"] = {**trace.timings(), "total": time.perf_counter() - start}
+    result["spans"] = trace.spans
+    with open(output_dir / f"{path.stem}.json", "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return result
+
+
+async def run_batch(args, llm):
+    input_dir, output_dir = Path(args.input_dir), Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = sorted(p for p in input_dir.iterdir() if p.suffix.lower() == ".pdf")
+
+    llm_slots = asyncio.Semaphore(args.concurrency)
+    with ThreadPoolExecutor(max_workers=args.extract_workers) as extract_pool:
+        return await asyncio.gather(*(
+            process_document(path, output_dir, llm, args, extract_pool, llm_slots) for path in paths
+        ))
+
+
+def build_llm(args):
+    if args.fake_llm:
+        return FakeQuizChatModel(latency=args.fake_latency, jitter=args.fake_latency / 4)
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise SystemExit("OPENAI_API_KEY is not set (or use --fake-llm)")
+    # The app's pooled client: the OpenAI stack is only imported here
+    return get_chat_model(api_key, args.model, args.temperature)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m batch_quiz", description=__doc__.splitlines()[0])
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--quiz-type", choices=list(SCHEMAS), default="multiple-choice")
+    parser.add_argument("--num-questions", type=int, default=5)
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--temperature", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=4, help="documents in the LLM stage at once")
+    parser.add_argument("--extract-workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--fake-llm", action="store_true", help="use a deterministic offline model")
+    parser.add_argument("--fake-latency", type=float, default=1.0, help="seconds per fake LLM call")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Prometheus text file to write (default: MINDBRIDGE_METRICS_FILE or the cache dir)")
+    parser.add_argument("--log-json", action="store_true", help="log every stage span as a JSON line on stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.log_json:
+        enable_json_logs()
+    start = time.perf_counter()
+    # On the process-wide loop, which the pooled client's async connections belong to
+    results = run_coroutine(run_batch(args, build_llm(args)))
+    elapsed = time.perf_counter() - start
+
+    failed = [r for r in results if "error" in r]
+    for r in failed:
+        print(f"FAILED {r['source']}: {r['error']}")
+    print(f"{len(results) - len(failed)}/{len(results)} documents in {elapsed:.2f}s "
+          f"({len(results) / elapsed if elapsed else 0:.2f} docs/s)")
+    for stage in ["read", "extraction", "detection", "template", "llm_queue", "llm", "total"]:
+        values = [r["timings"][stage] for r in results if stage in r["timings"]]
+        if values:
+            print(f"  {stage:<11} mean {sum(values) / len(values):.3f}s  max {max(values):.3f}s")
+    before = sum(r.get("tokens_before", 0) for r in results)
+    if before:
+        saved = sum(r.get("tokens_saved", 0) for r in results)
+        print(f"  normalization removed {saved} of {before} context tokens ({saved / before:.1%})")
+    print(f"Metrics written to {get_metrics().write(args.metrics_file or metrics_path())}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,56 @@
+"""Grading 100k synthetic multiple-choice submissions: NumPy vs. a per-student Python loop.
+
+Usage: python benchmarks/bench_grading.py [--students 100000] [--questions 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grading import encode_submissions, grade, normalize_answer_key
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--options", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    alternatives = [[f"Option {q}-{o}" for o in range(args.options)] for q in range(args.questions)]
+    answers = [chr(97 + int(i)) for i in rng.integers(0, args.options, size=args.questions)]
+    # Stronger students pick the right option more often, so the item stats are meaningful
+    key = normalize_answer_key(answers, alternatives)
+    ability = rng.random((args.students, 1))
+    right = rng.random((args.students, args.questions)) < 0.3 + 0.6 * ability
+    responses = np.where(right, key, rng.integers(0, args.options, size=(args.students, args.questions)))
+    texts = [[alternatives[q][o] for q, o in enumerate(row)] for row in responses.tolist()]
+
+    start = time.perf_counter()
+    for row in texts:
+        sum(user_answer == alternatives[q][ord(answers[q]) - 97] for q, user_answer in enumerate(row))
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    encoded = encode_submissions(texts, alternatives)
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    report = grade(key, encoded, args.options)
+    vectorized = time.perf_counter() - start
+
+    print(f"{args.students} submissions x {args.questions} questions")
+    print(f"python loop (score only)    {loop * 1000:8.1f} ms")
+    print(f"encode answers -> indices   {encode * 1000:8.1f} ms")
+    print(f"numpy grade + item stats    {vectorized * 1000:8.1f} ms")
+    print(f"mean score {report.scores.mean():.2f}, "
+          f"difficulty {' '.join(f'{v:.2f}' for v in report.difficulty[:5])} ..., "
+          f"discrimination {' '.join(f'{v:.2f}' for v in report.discrimination[:5])} ...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Import-time profile of the app's modules, from `python -X importtime`.
+
+Each module is imported in a fresh interpreter, several times. The report
+gives the median import time, the heaviest direct imports and packages, and
+which of the heavy dependencies were deferred until first use, with what
+that first use costs.
+
+Usage:
+  python benchmarks/bench_import_time.py
+  python benchmarks/bench_import_time.py --module batch_quiz --runs 10
+  python benchmarks/bench_import_time.py --output benchmarks/import_time_report.txt
+"""
+import argparse
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(ROOT, "benchmarks", "import_time_report.txt")
+
+# Dependencies that only some sessions need, and should not be loaded by a plain
+# import, with what the app does on first use of each
+DEFERRED = {
+    "langchain_openai": "from langchain_openai import ChatOpenAI",
+    "langchain_core": "from langchain_core.prompts import ChatPromptTemplate",
+    "httpx": "import httpx",
+    "aiohttp": "import aiohttp",
+    "pymupdf": "import pymupdf",
+    "langdetect": "import langdetect",
+}
+
+
+def profile_import(statement: str) -> list:
+    """[(depth, name, self_us, cumulative_us)] in import order, for one fresh interpreter."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def summarize(runs: list, module: str) -> dict:
+    totals = [next(c for d, n, s, c in entries if n == module and d == 0) for entries in runs]
+    # Direct imports of the module and packages (self time summed), from the median run
+    median_run = runs[sorted(range(len(runs)), key=lambda i: totals[i])[len(runs) // 2]]
+    direct = [(name, cumulative) for depth, name, _, cumulative in median_run if depth == 1]
+    packages = defaultdict(int)
+    for _, name, self_us, _ in median_run:
+        packages[name.split(".")[0]] += self_us
+    loaded = {name.split(".")[0] for _, name, _, _ in median_run}
+    return {"total_us": statistics.median(totals), "min_us": min(totals),
+            "direct": sorted(direct, key=lambda item: -item[1]),
+            "packages": sorted(packages.items(), key=lambda item: -item[1]), "loaded": loaded}
+
+
+def first_use_us(module: str, statement: str, runs: int) -> float:
+    # Extra time of `statement` once `module` is loaded
+    code = (f"import time, {module}\nstart = time.perf_counter()\n{statement}\n"
+            f"print((time.perf_counter() - start) * 1e6)")
+    return statistics.median(
+        float(subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                             check=True).stdout)
+        for _ in range(runs)
+    )
+
+
+def report(module: str, runs: int, top: int) -> str:
+    summary = summarize([profile_import(f"import {module}") for _ in range(runs)], module)
+    lines = [f"import {module}: median {summary['total_us'] / 1000:.0f} ms, "
+             f"best {summary['min_us'] / 1000:.0f} ms over {runs} fresh interpreters",
+             "", "Heaviest direct imports (cumulative):"]
+    lines += [f"  {name:<40}{us / 1000:>9.1f} ms" for name, us in summary["direct"][:top]]
+    lines += ["", "Heaviest packages (self time):"]
+    lines += [f"  {name:<40}{us / 1000:>9.1f} ms" for name, us in summary["packages"][:top]]
+    lines += ["", "Heavy dependencies:"]
+    for dependency, statement in DEFERRED.items():
+        if dependency in summary["loaded"]:
+            lines.append(f"  {dependency:<40}  loaded at import")
+        else:
+            cost = first_use_us(module, statement, max(1, runs // 2))
+            lines.append(f"  {dependency:<40}  deferred, first use costs {cost / 1000:.0f} ms")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", action="append", help="module to import (default: quiz_multiple_lang)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--output", default=None, help=f"also write the report there (e.g. {REPORT_PATH})")
+    args = parser.parse_args(argv)
+
+    sections = [f"# {platform.machine()} {os.cpu_count()} cores, Python {platform.python_version()}"]
+    for module in args.module or ["quiz_multiple_lang"]:
+        sections.append(report(module, args.runs, args.top))
+    text = "\n\n".join(sections) + "\n"
+    print(text, end="")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Script execution time per quiz interaction, for a large uploaded document.
+
+Drives the app with Streamlit's AppTest against the mock OpenAI server:
+upload a generated PDF, generate a quiz, then answer and submit it several
+times. Reports, from the app's own spans, how long a full script run takes
+at that point, which is what every interaction cost while the quiz lived in
+the main script, and how long the quiz fragment takes on its own, which is
+what a submission costs now that only the fragment reruns.
+
+Usage: python benchmarks/bench_interaction.py [--pages 300] [--interactions 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pdf_extraction import make_synthetic_pdf
+from load_test import wait_for_generation
+from mock_openai_server import MockOpenAIServer
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "quiz_multiple_lang.py")
+
+
+def summary(label: str, values):
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    print(f"  {label:<34} median {statistics.median(values) * 1000:8.1f} ms   p95 {p95 * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--interactions", type=int, default=20)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(latency=0.0).start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.setdefault("MINDBRIDGE_CACHE_DIR", tempfile.mkdtemp(prefix="mindbridge-bench-"))
+    from streamlit.testing.v1 import AppTest
+
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=300).run()
+        at.sidebar.text_input[0].input("sk-bench")
+        at.file_uploader[0].set_value(("cours.pdf", make_synthetic_pdf(args.pages), "application/pdf"))
+        at.run()
+        at.number_input[0].set_value(args.questions)
+        at.button[0].click().run()
+        wait_for_generation(at, 300)
+        if at.exception:
+            raise SystemExit(f"App error: {at.exception[0].message}")
+
+        rng = random.Random(0)
+        full_runs, fragment_runs = [], []
+        for _ in range(args.interactions):
+            for i in range(len(at.session_state["quiz"])):
+                radio = at.radio(key=f"question_{i}")
+                radio.set_value(rng.choice(radio.options))
+            # AppTest always reruns the whole script; the spans tell both costs apart
+            at.form_submit_button[0].click().run()
+            if at.exception:
+                raise SystemExit(f"App error: {at.exception[0].message}")
+            spans = at.session_state["stage_spans"]
+            full_runs.append(spans["script"]["duration_s"])
+            if "quiz_fragment" in spans:
+                fragment_runs.append(spans["quiz_fragment"]["duration_s"])
+    finally:
+        server.stop()
+
+    print(f"{args.pages}-page document, {args.questions} questions, {args.interactions} submissions")
+    summary("full script run", full_runs)
+    if fragment_runs:
+        summary("quiz fragment run", fragment_runs)
+
+
+if __name__ == "__main__":
+    main()
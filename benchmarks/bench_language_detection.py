@@ -0,0 +1,52 @@
+"""Language detection on long inputs: langdetect on the whole text vs. the sampled, cached detector.
+
+Usage: python benchmarks/bench_language_detection.py [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+from langdetect import DetectorFactory, detect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from language_detection import detect_language as detect_language_sampled
+
+TEXTS = [
+    ("français", "Bonjour, comment allez-vous? Je suis ravi de vous rencontrer."),
+    ("anglais", "Hello, how are you? I am happy to meet you."),
+    ("arabe", "مرحبا كيف حالك؟ أنا سعيد بلقائك."),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    DetectorFactory.seed = 0
+    for name, text in TEXTS:
+        for copies in [100, 1000, 10000]:
+            long_text = " ".join([text] * copies)
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                detect(long_text)
+            whole = (time.perf_counter() - start) / args.repeat
+
+            # First call (sampling + detection), then calls answered by the cache
+            start = time.perf_counter()
+            detect_language_sampled(long_text + " ")
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                detect_language_sampled(long_text + " ")
+            cached = (time.perf_counter() - start) / args.repeat
+
+            print(f"{name:<9} {len(long_text):>8} car. | texte entier: {whole * 1000:8.1f} ms"
+                  f" | échantillonné: {first * 1000:6.1f} ms | cache: {cached * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
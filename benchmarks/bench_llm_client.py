@@ -0,0 +1,67 @@
+"""Cold (new client per click) vs. pooled ChatOpenAI calls against the local mock server.
+
+Usage: python benchmarks/bench_llm_client.py [--calls 30] [--latency 0.05]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_clients import get_chat_model
+from mock_openai_server import MockOpenAIServer
+from quiz_multiple_lang import QuizMultipleChoice, choose_prompt_template, create_quiz_chain
+
+CONTEXT = "La photosynthèse convertit la lumière en énergie chimique. Les plantes produisent de l'oxygène."
+
+
+def cold_model(base_url: str, temperature: float):
+    # What a click used to cost: a new client, hence new connections
+    return ChatOpenAI(model="gpt-4o", api_key="sk-mock", base_url=base_url, temperature=temperature,
+                      http_client=httpx.Client(), http_async_client=httpx.AsyncClient())
+
+
+def pooled_model(base_url: str, temperature: float):
+    return get_chat_model("sk-mock", "gpt-4o", temperature, base_url=base_url)
+
+
+def bench(label: str, make_model, base_url: str, calls: int):
+    prompt_template = choose_prompt_template("multiple-choice", CONTEXT)
+    setup, total = [], []
+    for i in range(calls):
+        start = time.perf_counter()
+        llm = make_model(base_url, temperature=(i % 3) * 0.2)
+        chain = create_quiz_chain(prompt_template, llm, QuizMultipleChoice)
+        built = time.perf_counter()
+        chain.invoke({"num_questions": 3, "quiz_context": CONTEXT})
+        setup.append(built - start)
+        total.append(time.perf_counter() - start)
+    total_sorted = sorted(total)
+    print(f"  {label:<8} setup {statistics.mean(setup) * 1000:7.2f} ms | "
+          f"call p50 {statistics.median(total) * 1000:7.2f} ms | "
+          f"p95 {total_sorted[int(0.95 * (len(total) - 1))] * 1000:7.2f} ms | "
+          f"first {total[0] * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock server latency (s)")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(latency=args.latency).start()
+    try:
+        print(f"{args.calls} calls per mode, server latency {args.latency * 1000:.0f} ms")
+        bench("cold", cold_model, server.base_url, args.calls)
+        bench("pooled", pooled_model, server.base_url, args.calls)
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
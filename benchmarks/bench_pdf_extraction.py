@@ -0,0 +1,81 @@
+"""Serial vs. page-sharded PDF extraction timings.
+
+Usage: python benchmarks/bench_pdf_extraction.py [--pages 600] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pymupdf as fitz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_extraction
+from pdf_extraction import extract_text_parallel, extract_text_serial
+
+BUNDLED_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "temp_uploaded.pdf")
+
+PARAGRAPH = (
+    "La photosynthèse est le processus par lequel les plantes convertissent la lumière "
+    "en énergie chimique. Photosynthesis converts light energy into chemical energy. "
+)
+
+
+def make_synthetic_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), f"Page {i + 1}\n" + PARAGRAPH * 25, fontsize=9)
+    return doc.tobytes()
+
+
+def best_of(repeat, fn, *args, **kwargs) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def worker_counts() -> list:
+    counts, workers = [], 2
+    while workers <= max(2, os.cpu_count() or 1):
+        counts.append(workers)
+        workers *= 2
+    return counts
+
+
+def bench(label: str, data: bytes, repeat: int):
+    page_count = fitz.open(stream=data, filetype="pdf").page_count
+    assert extract_text_parallel(data, workers=2, min_pages=0) == extract_text_serial(data)
+
+    serial = best_of(repeat, extract_text_serial, data)
+    print(f"\n{label}: {page_count} pages, {len(data) / 1024:.0f} KiB")
+    print(f"  {'mode':<12}{'workers':>8}{'seconds':>10}{'speedup':>9}")
+    print(f"  {'serial':<12}{1:>8}{serial:>10.3f}{1.0:>9.2f}")
+
+    for workers in worker_counts():
+        # min_pages=0 forces the pool even on short documents, to show its overhead
+        parallel = best_of(repeat, extract_text_parallel, data, workers=workers, min_pages=0)
+        print(f"  {'sharded':<12}{workers:>8}{parallel:>10.3f}{serial / parallel:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=600)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # `workers` only caps the shards in flight: the shared pool must have as
+    # many processes as the largest row, or the larger rows measure the same thing
+    pdf_extraction.POOL_WORKERS = max(worker_counts())
+    print(f"CPU cores: {os.cpu_count()}, pool processes: {pdf_extraction.POOL_WORKERS}")
+    with open(BUNDLED_PDF, "rb") as f:
+        bench("temp_uploaded.pdf", f.read(), args.repeat)
+    bench("synthetic", make_synthetic_pdf(args.pages), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
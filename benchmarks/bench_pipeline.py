@@ -0,0 +1,157 @@
+"""Per-stage latency benchmarks of the quiz pipeline, checked against stored baselines.
+
+Covers PDF extraction (bundled and generated PDFs), language detection,
+template selection, prompt rendering and `create_quiz_chain(...).invoke`
+against the deterministic fake chat model. Prints throughput and
+p50/p95/p99 per stage; exits with status 1 if a stage regressed.
+
+Usage:
+  python benchmarks/bench_pipeline.py                   # compare with benchmarks/baselines.json
+  python benchmarks/bench_pipeline.py --save-baseline   # record this machine's numbers
+  python benchmarks/bench_pipeline.py --llm-latency 0.2 --only chain
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pdf_extraction import BUNDLED_PDF, PARAGRAPH, make_synthetic_pdf
+from fake_llm import FakeQuizChatModel
+from language_detection import detect_language
+from quiz_multiple_lang import (QuizMultipleChoice, QuizTrueFalse, choose_prompt_template,
+                                create_quiz_chain, extract_text_from_pdf)
+from quiz_templates_miltiple_lang import get_template
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# A stage regresses when its p50 or p95 exceeds the baseline by this factor,
+# and by more than MIN_REGRESSION_MS (sub-millisecond stages are noisy).
+DEFAULT_TOLERANCE = 0.5
+MIN_REGRESSION_MS = 0.5
+
+TEXTS = {
+    "fr": PARAGRAPH * 40,
+    "ar": "التمثيل الضوئي هو العملية التي تحول بها النباتات الطاقة الضوئية إلى طاقة كيميائية. " * 40,
+    "en": "Photosynthesis converts light energy into chemical energy stored in glucose. " * 40,
+}
+
+
+def measure(fn: Callable[[int], object], iterations: int, warmup: int = 2) -> dict:
+    for i in range(warmup):
+        fn(i)
+    timings = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(warmup + i)
+        timings.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(np.array(timings) * 1000, [50, 95, 99])
+    return {"iterations": iterations, "ops_per_s": iterations / total,
+            "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def build_stages(args) -> Dict[str, Callable[[], dict]]:
+    with open(BUNDLED_PDF, "rb") as f:
+        bundled = f.read()
+    large = make_synthetic_pdf(args.pages)
+    context = TEXTS["fr"]
+    template = get_template("multiple-choice", "fr")
+    chain = create_quiz_chain(template, FakeQuizChatModel(latency=args.llm_latency), QuizMultipleChoice)
+    tf_chain = create_quiz_chain(get_template("true-false", "en"), FakeQuizChatModel(latency=args.llm_latency),
+                                 QuizTrueFalse)
+    n = args.iterations
+
+    return {
+        "extract.bundled_pdf": lambda: measure(lambda i: extract_text_from_pdf(bundled), n),
+        f"extract.synthetic_{args.pages}p": lambda: measure(lambda i: extract_text_from_pdf(large), max(3, n // 20)),
+        # A different text per call defeats the detection cache: the cold path
+        "detect.cold.fr": lambda: measure(lambda i: detect_language(f"{i} " + TEXTS["fr"]), n),
+        "detect.cold.ar": lambda: measure(lambda i: detect_language(f"{i} " + TEXTS["ar"]), n),
+        "detect.cold.en_long": lambda: measure(lambda i: detect_language(f"{i} " + TEXTS["en"] * 200), n),
+        "detect.cached": lambda: measure(lambda i: detect_language(TEXTS["en"]), n * 10),
+        "template.choose": lambda: measure(lambda i: choose_prompt_template("true-false", TEXTS["en"]), n * 10),
+        "prompt.render": lambda: measure(
+            lambda i: template.invoke({"num_questions": 5, "quiz_context": context}), n * 10),
+        "chain.invoke.multiple_choice": lambda: measure(
+            lambda i: chain.invoke({"num_questions": 5, "quiz_context": context}), n),
+        "chain.invoke.true_false": lambda: measure(
+            lambda i: tf_chain.invoke({"num_questions": 10, "quiz_context": TEXTS["en"]}), n),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for stage, result in results.items():
+        base = baseline.get("stages", {}).get(stage)
+        if base is None:
+            continue
+        for metric in ["p50_ms", "p95_ms"]:
+            limit = base[metric] * (1 + tolerance)
+            if result[metric] > limit and result[metric] - base[metric] > MIN_REGRESSION_MS:
+                regressions.append(f"{stage} {metric}: {result[metric]:.2f} ms > {limit:.2f} ms "
+                                   f"(baseline {base[metric]:.2f} ms + {tolerance:.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=400, help="pages of the generated PDF")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="fake model latency in seconds")
+    parser.add_argument("--only", default="", help="run the stages whose name contains this text")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    config = {"iterations": args.iterations, "pages": args.pages, "llm_latency": args.llm_latency}
+    results = {}
+    print(f"{'stage':<32}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, run in build_stages(args).items():
+        if args.only not in stage:
+            continue
+        results[stage] = run()
+        r = results[stage]
+        print(f"{stage:<32}{r['ops_per_s']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+    if args.save_baseline:
+        baseline = {"config": config, "machine": f"{platform.machine()} {os.cpu_count()} cores, "
+                                                  f"Python {platform.python_version()}", "stages": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline["stages"] = json.load(f).get("stages", {})
+        baseline["stages"].update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != config:
+        print(f"\nWARNING: baseline recorded with {baseline.get('config')}, this run uses {config}")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\n" + "!" * 72)
+        print(f"PERFORMANCE REGRESSION in {len(regressions)} measurement(s):")
+        for line in regressions:
+            print(f"  {line}")
+        print("!" * 72)
+        return 1
+    print(f"\nNo regression against {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
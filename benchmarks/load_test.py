@@ -0,0 +1,266 @@
+"""Load test: simulated users go through upload -> extract -> generate -> submit in the Streamlit app.
+
+Each user is a headless AppTest session of quiz_multiple_lang.py, driven
+from its own thread of this one process, so that all the users load a single
+app: one set of caches, one generation job queue, one extraction pool, one
+HTTP connection pool, as behind a real Streamlit server. The OpenAI API is
+replaced by the local mock server, with configurable latency and error rate.
+For each concurrency level, the tool reports throughput, per-step latency
+percentiles, failures, and the resident memory of the app process.
+
+Limitation: AppTest keeps its runtime in a process-wide singleton, so script
+runs (page loads, reruns, clicks) are serialized across the users; what runs
+concurrently is what the app does off the script thread (generation jobs,
+LLM calls). Step latencies therefore include the wait for the other users'
+script runs. With --processes, each user gets its own spawned process
+instead: script runs overlap, but the users no longer share one app.
+
+Usage:
+  python benchmarks/load_test.py --users 1,4,8,16 --latency 1.0 --error-rate 0.02
+  python benchmarks/load_test.py --users 8 --rounds 3 --json results.json
+  python benchmarks/load_test.py --users 4 --processes
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pymupdf as fitz
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from mock_openai_server import MockOpenAIServer
+
+APP_PATH = os.path.join(ROOT, "quiz_multiple_lang.py")
+DEFAULT_PDF = os.path.join(ROOT, "temp_uploaded.pdf")
+STEPS = ["load", "upload_extract", "generate", "submit"]
+QUIZ_TYPES = ["multiple-choice", "true-false", "open-ended"]
+
+# AppTest runs share a process-wide runtime: one script run at a time
+_script_lock = threading.Lock()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def rss_mb() -> float:
+    """Current resident memory of this process (Linux), else its peak."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def personalize(pdf: bytes, user: int) -> bytes:
+    # A line of text of its own, so that every user misses the extraction and
+    # quiz caches, as with real classes uploading different courses.
+    doc = fitz.open(stream=pdf, filetype="pdf")
+    doc[0].insert_text((20, 20), f"Session {user} {time.time_ns()}", fontsize=6)
+    return doc.tobytes()
+
+
+def warm_worker():
+    # Import the app's modules up front, so "load" measures a page load and
+    # not the worker's interpreter start-up; the LLM stack is only imported on
+    # first use, which a long-running server pays once, not once per user.
+    import langchain_openai  # noqa: F401
+    import quiz_multiple_lang  # noqa: F401
+    from streamlit.testing.v1 import AppTest  # noqa: F401
+
+
+def run_script(target):
+    """`target.run()` (an AppTest, or a clicked widget) while no other session's script runs."""
+    with _script_lock:
+        return target.run()
+
+
+def simulate_user(user: int, pdf: bytes, args) -> dict:
+    """One session through the whole flow; returns the time of each step, or the error."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(user)
+    timings = {}
+    data = pdf if args.same_document else personalize(pdf, user)
+    quiz_type = args.quiz_type or QUIZ_TYPES[user % len(QUIZ_TYPES)]
+    started_at = time.time()
+    try:
+        start = time.perf_counter()
+        at = run_script(AppTest.from_file(APP_PATH, default_timeout=args.timeout))
+        timings["load"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        at.sidebar.text_input[0].input("sk-load-test")
+        at.file_uploader[0].set_value((f"cours-{user}.pdf", data, "application/pdf"))
+        run_script(at)
+        timings["upload_extract"] = time.perf_counter() - start
+        _check(at, "upload")
+
+        start = time.perf_counter()
+        at.number_input[0].set_value(args.num_questions)
+        at.selectbox[0].set_value(quiz_type)
+        run_script(at.button[0].click())
+        wait_for_generation(at, args.timeout)
+        timings["generate"] = time.perf_counter() - start
+        _check(at, "generate")
+        if not len(at.session_state["quiz"]):
+            raise RuntimeError("no questions generated")
+
+        start = time.perf_counter()
+        for i in range(len(at.session_state["quiz"])):
+            if quiz_type == "open-ended":
+                at.text_input(key=f"question_{i}").input(f"réponse {rng.randint(0, 9)}")
+            else:
+                radio = at.radio(key=f"question_{i}")
+                radio.set_value(rng.choice(radio.options))
+        run_script(at.form_submit_button[0].click())
+        timings["submit"] = time.perf_counter() - start
+        _check(at, "submit")
+        result = {"user": user, "quiz_type": quiz_type, "timings": timings}
+    except Exception as err:
+        result = {"user": user, "quiz_type": quiz_type, "timings": timings, "error": f"{type(err).__name__}: {err}"}
+    result.update(started_at=started_at, ended_at=time.time(),
+                  pid=os.getpid(), rss_mb=rss_mb(), peak_rss_mb=peak_rss_mb())
+    return result
+
+
+def wait_for_generation(at, timeout: float, poll_interval: float = 0.05):
+    # The quiz is generated on the app's job queue; in a browser the progress
+    # fragment polls for it, here each poll is a rerun.
+    deadline = time.perf_counter() + timeout
+    while "generation" in at.session_state:
+        if time.perf_counter() > deadline:
+            raise TimeoutError("generation still pending")
+        time.sleep(poll_interval)
+        run_script(at)
+
+
+def _check(at, step: str):
+    if at.exception:
+        raise RuntimeError(f"{step}: {at.exception[0].message}")
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def run_level(users: int, pdf: bytes, args, server) -> dict:
+    requests_before, errors_before = server.requests, server.errors
+    if args.processes:
+        # Fresh workers per level: memory figures are not inflated by earlier levels
+        pool = ProcessPoolExecutor(max_workers=users, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=warm_worker)
+    else:
+        pool = ThreadPoolExecutor(max_workers=users)
+    with pool:
+        futures = [pool.submit(simulate_user, i, pdf, args) for i in range(users * args.rounds)]
+        sessions = [future.result() for future in futures]
+    # From the first session start to the last session end: worker start-up is not counted
+    elapsed = max(s["ended_at"] for s in sessions) - min(s["started_at"] for s in sessions)
+
+    ok = [s for s in sessions if "error" not in s]
+    totals = [sum(s["timings"].values()) for s in ok]
+    # Last report of each process (a single one unless --processes)
+    workers = {s["pid"]: s for s in sessions}
+    return {
+        "users": users,
+        "shared_process": not args.processes,
+        "sessions": len(sessions),
+        "failed": len(sessions) - len(ok),
+        "errors": sorted({s["error"] for s in sessions if "error" in s})[:5],
+        "elapsed_s": elapsed,
+        "sessions_per_s": len(ok) / elapsed if elapsed else 0.0,
+        "session_s": percentiles(totals),
+        "steps_s": {step: percentiles([s["timings"][step] for s in ok if step in s["timings"]]) for step in STEPS},
+        "llm_requests": server.requests - requests_before,
+        "llm_errors": server.errors - errors_before,
+        "worker_processes": len(workers),
+        "worker_rss_mb_mean": float(np.mean([w["rss_mb"] for w in workers.values()])),
+        "worker_rss_mb_peak": max(w["peak_rss_mb"] for w in workers.values()),
+    }
+
+
+def print_level(result: dict):
+    session = result["session_s"]
+    print(f"\n== {result['users']} concurrent users: {result['sessions']} sessions, {result['failed']} failed, "
+          f"{result['sessions_per_s']:.2f} sessions/s")
+    if session:
+        print(f"   session  p50 {session['p50']:.2f}s  p95 {session['p95']:.2f}s  p99 {session['p99']:.2f}s")
+    for step, stats in result["steps_s"].items():
+        if stats:
+            print(f"   {step:<15} p50 {stats['p50']:.3f}s  p95 {stats['p95']:.3f}s  p99 {stats['p99']:.3f}s")
+    print(f"   LLM requests {result['llm_requests']} ({result['llm_errors']} injected errors)")
+    if result["shared_process"]:
+        print(f"   app process: {result['worker_rss_mb_mean']:.0f} MB resident, "
+              f"{result['worker_rss_mb_peak']:.0f} MB peak since start")
+        print("   (one shared app; script runs serialized by AppTest, step latencies include that wait)")
+    else:
+        print(f"   memory per worker process: {result['worker_rss_mb_mean']:.0f} MB resident on average, "
+              f"{result['worker_rss_mb_peak']:.0f} MB peak ({result['worker_processes']} processes)")
+        print("   (one app per user process: no cache, queue or pool is shared between users)")
+    for error in result["errors"]:
+        print(f"   ! {error}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=1, help="sessions per user at each level")
+    parser.add_argument("--latency", type=float, default=0.5, help="mock LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of LLM calls answered with a 500")
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--same-document", action="store_true", help="every user uploads the same bytes")
+    parser.add_argument("--quiz-type", choices=QUIZ_TYPES, default=None, help="default: rotate")
+    parser.add_argument("--num-questions", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per script run")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    parser.add_argument("--processes", action="store_true",
+                        help="one spawned process (and app) per user instead of one shared app")
+    args = parser.parse_args(argv)
+
+    with open(args.pdf, "rb") as f:
+        pdf = f.read()
+    server = MockOpenAIServer(args.latency, args.jitter, args.error_rate).start()
+    # The app builds its clients from the environment: point them at the mock,
+    # and keep caches and metrics out of the user's real cache directory.
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.setdefault("MINDBRIDGE_CACHE_DIR", tempfile.mkdtemp(prefix="mindbridge-load-"))
+    if not args.processes:
+        warm_worker()
+
+    results = []
+    try:
+        for users in (int(u) for u in args.users.split(",")):
+            results.append(run_level(users, pdf, args, server))
+            print_level(results[-1])
+    finally:
+        server.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "levels": results}, f, indent=2)
+    return 1 if any(r["failed"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Local OpenAI-compatible stand-in for benchmarks and load tests.
+
+Serves POST /v1/chat/completions with a configurable latency and error rate.
+Structured-output requests (response_format json_schema) get a well-formed
+quiz built from the prompt's context.
+
+Usage: python benchmarks/mock_openai_server.py [--port 8001] [--latency 0.5] [--error-rate 0.05]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm import fake_quiz_json
+
+
+class MockOpenAIServer:
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, error_rate: float = 0.0,
+                 port: int = 0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.port = port
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def _content(self, body: dict) -> str:
+        prompt = body["messages"][-1]["content"]
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            return fake_quiz_json(response_format["json_schema"]["schema"], prompt)
+        return prompt
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        self.requests += 1
+        await asyncio.sleep(max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter)))
+        if self._rng.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"error": {"message": "mock overloaded", "type": "server_error"}},
+                                     status=500)
+
+        content = self._content(body)
+        if body.get("stream"):
+            return await self._stream(request, body, content)
+        prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+        return web.json_response({
+            "id": f"chatcmpl-mock-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        })
+
+    async def _stream(self, request, body: dict, content: str):
+        """Server-sent events in the chat.completion.chunk format."""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        size = max(1, len(content) // 40)
+        for i in range(0, len(content) + 1, size):
+            delta = {"role": "assistant", "content": content[i:i + size]} if i < len(content) else {}
+            chunk = {
+                "id": f"chatcmpl-mock-{self.requests}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "delta": delta,
+                             "finish_reason": None if i < len(content) else "stop"}],
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            await asyncio.sleep(self.latency / 40)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def _app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        return app
+
+    async def _start(self):
+        self._runner = web.AppRunner(self._app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self) -> "MockOpenAIServer":
+        """Serve from a background thread; returns once the port is bound."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.latency, args.jitter, args.error_rate, args.port).start()
+    print(f"Mock OpenAI server on {server.base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import re
+from collections import Counter
+from typing import Iterable, List, NamedTuple, Tuple
+
+from token_counting import count_tokens
+
+
+############################################
+# CONTEXT NORMALIZATION
+############################################
+# Raw page text carries running headers and footers, page numbers,
+# hyphenated line breaks and whitespace runs: tokens paid on every call for
+# nothing the model can ask about. Pages are normalized between extraction
+# and prompt building, in two linear passes: the first splits each page into
+# lines, joins hyphenation breaks and counts the lines found at its edges;
+# the second drops those repeated across pages, page numbers and boilerplate.
+#
+# Arabic text is left as is: no case folding of the output, no Unicode
+# normalization (joiners, marks and presentation forms are kept), and
+# de-hyphenation only joins words whose continuation starts in lowercase,
+# which Arabic script has not. Arabic-Indic page numbers are still matched.
+
+# Lines at the top and bottom of a page where headers, footers and page numbers sit
+EDGE_LINES = 3
+
+# An edge line is a running header or footer when found, digits aside, on at
+# least this share of the pages (alternating even/odd headers each cover half)
+# and on at least REPEATED_MIN_PAGES pages.
+REPEATED_PAGE_FRACTION = 0.4
+REPEATED_MIN_PAGES = 3
+
+# Longer lines are body text, never headers or boilerplate
+MAX_BOILERPLATE_CHARS = 120
+
+_DIGITS = re.compile(r"\d+")
+
+# "12", "- 12 -", "Page 3 of 10", "p. 4", "3/10", "صفحة ٣ من ١٠"
+_PAGE_NUMBER = re.compile(
+    r"(?:page|pg\.?|p\.|seite|pagina|página|صفحة|الصفحة)?\s*[-–—]?\s*\d+\s*"
+    r"(?:(?:/|of|sur|de|von|من)\s*\d+)?\s*[-–—]?",
+    re.IGNORECASE,
+)
+
+_BOILERPLATE = re.compile(
+    r"(?:©|\(c\)\s*\d{4}|copyright\b|all rights reserved|tous droits réservés"
+    r"|todos los derechos reservados|جميع الحقوق محفوظة)",
+    re.IGNORECASE,
+)
+
+SOFT_HYPHEN = "\u00ad"
+_HYPHENS = ("-", "\u2010", SOFT_HYPHEN)
+
+
+class NormalizedText(NamedTuple):
+    text: str
+    pages: int
+    tokens_before: int
+    tokens_after: int
+    lines_removed: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def _lines(page: str) -> List[str]:
+    # str.split() collapses every Unicode space (NBSP included) but not
+    # zero-width joiners, which Arabic and Persian shaping needs.
+    return [" ".join(line.split()) for line in page.splitlines()]
+
+
+def _edges(lines: List[str]) -> List[int]:
+    filled = [i for i, line in enumerate(lines) if line]
+    return sorted(set(filled[:EDGE_LINES] + filled[-EDGE_LINES:]))
+
+
+def _key(line: str) -> str:
+    # Digits are masked so that "Chapitre 2 — 14" and "Chapitre 2 — 15" match
+    return _DIGITS.sub("#", line.casefold())
+
+
+def is_page_number(line: str) -> bool:
+    return _PAGE_NUMBER.fullmatch(line) is not None
+
+
+def _continues(line: str, following: str) -> bool:
+    # "connais-" + "sance": the break is a hyphenation, not a compound or a dash
+    return (len(line) > 1 and line.endswith(_HYPHENS) and line[-2].isalpha()
+            and following[:1].islower())
+
+
+def _dehyphenate(lines: List[str]) -> List[str]:
+    joined = []
+    for line in lines:
+        if joined and line and _continues(joined[-1], line):
+            word, _, rest = line.partition(" ")
+            joined[-1] = joined[-1][:-1] + word
+            # The rest of the line starts a new one, keeping the line structure
+            if rest:
+                joined.append(rest)
+        else:
+            joined.append(line)
+    return joined
+
+
+def _normalize(pages: Iterable[str]) -> Tuple[List[str], int]:
+    split, seen = [], Counter()
+    for page in pages:
+        lines = _dehyphenate(_lines(page))
+        split.append(lines)
+        seen.update({_key(lines[i]) for i in _edges(lines) if len(lines[i]) <= MAX_BOILERPLATE_CHARS})
+
+    threshold = max(REPEATED_MIN_PAGES, REPEATED_PAGE_FRACTION * len(split))
+    repeated = {key for key, count in seen.items() if count >= threshold}
+    normalized, removed, last = [], 0, None  # last: index of the last non-empty page
+    for lines in split:
+        edges = set(_edges(lines))
+        kept = []
+        for i, line in enumerate(lines):
+            if i in edges and (is_page_number(line) or _key(line) in repeated):
+                removed += 1
+            elif len(line) <= MAX_BOILERPLATE_CHARS and _BOILERPLATE.search(line):
+                removed += 1
+            elif line or (kept and kept[-1]):
+                # Runs of blank lines collapse into one paragraph break
+                kept.append(line)
+        page = "\n".join(kept).replace(SOFT_HYPHEN, "").strip()
+        if last is not None and page and _continues(normalized[last], page):
+            # A word hyphenated across the page break ends on the first page
+            word, _, page = page.partition(" ")
+            normalized[last] = normalized[last][:-1] + word
+        if page:
+            last = len(normalized)
+        normalized.append(page)
+    return normalized, removed
+
+
+def normalize_page_texts(pages: Iterable[str]) -> List[str]:
+    """Normalized text of each page, in order (pages left empty are kept, as "")."""
+    return _normalize(pages)[0]
+
+
+def normalize_pages(pages: Iterable[str]) -> NormalizedText:
+    """Text of the pages without their running headers, page numbers, boilerplate and hyphenation breaks."""
+    tokens_before = 0
+
+    def counted():
+        nonlocal tokens_before
+        for page in pages:
+            tokens_before += count_tokens(page)
+            yield page
+
+    page_texts, removed = _normalize(counted())
+    text = "\n".join(filter(None, page_texts))
+    return NormalizedText(text, len(page_texts), tokens_before, count_tokens(text), removed)
+
+
+def normalize_text(text: str) -> NormalizedText:
+    """Same, for a text without page breaks: repeated lines cannot be told from body text there."""
+    return normalize_pages([text])
@@ -0,0 +1,212 @@
+import re
+import threading
+import zlib
+from typing import Hashable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+############################################
+# NEAR-DUPLICATE QUESTION INDEX (MinHash + LSH)
+############################################
+
+# 64 MinHash values per question, cut into 16 bands of 4 rows: two questions
+# share a band (and become candidates) with high probability from a Jaccard
+# similarity of about (1/16) ** (1/4) = 0.5.
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 2
+DUPLICATE_THRESHOLD = 0.5
+
+# Band keys are appended to a small unsorted tail, merged into the sorted
+# arrays once it reaches this size; queries binary-search the sorted part.
+TAIL_SIZE = 4096
+
+_PRIME = np.uint64(4294967291)  # largest prime below 2 ** 32
+_BAND_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """MinHash signatures in one growable uint32 array, LSH bands in sorted uint64 arrays.
+
+    Memory per stored question is about NUM_PERM * 4 + BANDS * 12 bytes
+    (448 bytes with the defaults), so hundreds of thousands fit in memory.
+    Queries cost O(BANDS * log n) plus a scan of the short unsorted tail.
+
+    Each question can be stored with a scope (e.g. document and quiz type)
+    and a source (e.g. the quiz cache key): add_if_new only compares it with
+    questions of the same scope, and ignores those of its own source, so a
+    quiz served again from the cache does not match itself.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS,
+                 threshold: float = DUPLICATE_THRESHOLD, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        rng = np.random.RandomState(seed)
+        # (a * x + b) mod p, with a, b < 2 ** 31 so that a * x + b fits in uint64
+        self._a = rng.randint(1, 2 ** 31, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31, size=num_perm).astype(np.uint64)
+
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self._count = 0
+        self._sorted_keys = [np.empty(0, dtype=np.uint64) for _ in range(bands)]
+        self._sorted_ids = [np.empty(0, dtype=np.uint32) for _ in range(bands)]
+        self._tail_keys = np.empty((TAIL_SIZE, bands), dtype=np.uint64)
+        self._tail_ids = np.empty(TAIL_SIZE, dtype=np.uint32)
+        self._tail_count = 0
+        self._owners: List[Tuple[Hashable, Hashable]] = []  # (scope, source) of each id
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+        if not hashes.size:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> np.ndarray:
+        rows = signature.astype(np.uint64).reshape(self.bands, self.rows)
+        keys = np.zeros(self.bands, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for r in range(self.rows):
+                keys = keys * _BAND_MIX + rows[:, r]
+        # Make keys band-specific so equal rows in different bands do not collide
+        return keys ^ np.arange(self.bands, dtype=np.uint64)
+
+    def _candidates(self, keys: np.ndarray) -> set:
+        found = set()
+        for band in range(self.bands):
+            sorted_keys = self._sorted_keys[band]
+            lo = np.searchsorted(sorted_keys, keys[band], side="left")
+            hi = np.searchsorted(sorted_keys, keys[band], side="right")
+            found.update(self._sorted_ids[band][lo:hi].tolist())
+        tail = slice(0, self._tail_count)
+        matches = (self._tail_keys[tail] == keys).any(axis=1)
+        found.update(self._tail_ids[tail][matches].tolist())
+        return found
+
+    def query(self, text: str) -> List[Tuple[int, float]]:
+        """Stored ids whose estimated Jaccard similarity with `text` reaches the threshold."""
+        return self._query(self.signature(text))
+
+    def _query(self, signature: np.ndarray) -> List[Tuple[int, float]]:
+        with self._lock:
+            return self._query_locked(signature)
+
+    def _query_locked(self, signature: np.ndarray) -> List[Tuple[int, float]]:
+        candidates = sorted(self._candidates(self._band_keys(signature)))
+        if not candidates:
+            return []
+        similarities = (self._signatures[candidates] == signature).mean(axis=1)
+        return [(doc_id, float(sim)) for doc_id, sim in zip(candidates, similarities) if sim >= self.threshold]
+
+    def add(self, text: str, scope: Hashable = None, source: Hashable = None) -> int:
+        return self._add(self.signature(text), scope, source)
+
+    def _add(self, signature: np.ndarray, scope: Hashable = None, source: Hashable = None) -> int:
+        with self._lock:
+            return self._add_locked(signature, scope, source)
+
+    def _add_locked(self, signature: np.ndarray, scope: Hashable, source: Hashable) -> int:
+        keys = self._band_keys(signature)
+        if self._count == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        doc_id = self._count
+        self._signatures[doc_id] = signature
+        self._owners.append((scope, source))
+        self._count += 1
+        self._tail_keys[self._tail_count] = keys
+        self._tail_ids[self._tail_count] = doc_id
+        self._tail_count += 1
+        if self._tail_count == TAIL_SIZE:
+            self._merge_tail()
+        return doc_id
+
+    def _merge_tail(self):
+        for band in range(self.bands):
+            keys = np.concatenate([self._sorted_keys[band], self._tail_keys[:, band]])
+            ids = np.concatenate([self._sorted_ids[band], self._tail_ids])
+            order = np.argsort(keys, kind="stable")
+            self._sorted_keys[band] = keys[order]
+            self._sorted_ids[band] = ids[order]
+        self._tail_count = 0
+
+    def add_if_new(self, text: str, scope: Hashable = None,
+                   source: Hashable = None) -> Tuple[bool, List[Tuple[int, float]]]:
+        """Insert `text` unless it near-duplicates a stored question of `scope`; returns (added, matches).
+
+        Matches from `source` itself are not returned, and the text is not
+        stored twice for it. The check and the insert are one step: two
+        sessions adding the same question at once store it only once.
+        """
+        signature = self.signature(text)
+        with self._lock:
+            matches = [(doc_id, sim) for doc_id, sim in self._query_locked(signature)
+                       if self._owners[doc_id][0] == scope]
+            if not matches:
+                self._add_locked(signature, scope, source)
+                return True, []
+        others = [(doc_id, sim) for doc_id, sim in matches
+                  if source is None or self._owners[doc_id][1] != source]
+        return False, others
+
+
+class FilteredQuiz(NamedTuple):
+    quiz: object
+    flagged: List[int]  # positions, in the returned quiz, of near duplicates kept
+    removed: int
+
+
+def filter_quiz(index: NearDuplicateIndex, quiz, reject: bool = False, min_questions: int = 0,
+                scope: Hashable = None, source: Hashable = None) -> FilteredQuiz:
+    """Check every question of `quiz` against the index and insert the new ones.
+
+    With `reject=True`, near duplicates are removed from the returned quiz
+    (rebuilt with the same class), but only down to `min_questions`: the
+    duplicates needed to reach it are kept, and flagged.
+    """
+    duplicates = []
+    for i, question in enumerate(quiz.questions):
+        _, matches = index.add_if_new(question, scope, source)
+        if matches:
+            duplicates.append(i)
+    # Never below min_questions, nor down to an empty quiz; the last duplicates go first
+    removable = max(0, len(quiz.questions) - max(min_questions, 1)) if reject else 0
+    removed = set(duplicates[len(duplicates) - min(removable, len(duplicates)):])
+    if not removed:
+        return FilteredQuiz(quiz, duplicates, 0)
+
+    keep = [i for i in range(len(quiz.questions)) if i not in removed]
+    fields = quiz.model_dump()
+    for name in ["questions", "answers", "alternatives"]:
+        if name in fields:
+            fields[name] = [fields[name][i] for i in keep if i < len(fields[name])]
+    duplicate_set = set(duplicates)
+    flagged = [position for position, i in enumerate(keep) if i in duplicate_set]
+    return FilteredQuiz(type(quiz)(**fields), flagged, len(removed))
+
+
+_default_index = None
+
+
+def get_question_index() -> NearDuplicateIndex:
+    """Process-wide index of every question generated so far, scoped by the callers."""
+    global _default_index
+    if _default_index is None:
+        _default_index = NearDuplicateIndex()
+    return _default_index
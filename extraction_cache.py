@@ -0,0 +1,179 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+############################################
+# CONTENT-ADDRESSED CACHE FOR EXTRACTED TEXT
+############################################
+
+def document_key(data: bytes, parse_method: str) -> str:
+    """Key of an extracted document: hash of the PDF bytes plus the parse method."""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{parse_method}-{digest}"
+
+
+class ExtractionCache:
+    """Two-tier cache: in-memory LRU, plus an optional on-disk tier with size-based eviction."""
+
+    def __init__(self, max_entries: int = 32, disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.txt")
+
+    def _remember(self, key: str, text: str):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        # Touch the file so disk eviction is LRU as well
+        try:
+            os.utime(path, None)
+        except OSError:
+            # Evicted by another session since we read it: the text is still good
+            pass
+        with self._lock:
+            self._remember(key, text)
+        return text
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._remember(key, text)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".txt"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.disk_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        entries.sort()
+        while total > self.max_disk_bytes and entries:
+            _, size, name = entries.pop(0)
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def get_or_extract(self, key: str, extract: Callable[[], str]) -> str:
+        """Return the cached text for `key`, running `extract` at most once per key."""
+        text = self.get(key)
+        if text is not None:
+            self._count(hit=True)
+            return text
+
+        # One lock per key so concurrent sessions uploading the same document
+        # wait for a single extraction instead of all parsing it. The lock stays
+        # registered while anyone holds or waits for it (entry = [lock, users]),
+        # so a newcomer never gets a second lock for the same key.
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                text = self.get(key)
+                if text is not None:
+                    self._count(hit=True)
+                    return text
+                self._count(hit=False)
+                text = extract()
+                self.put(key, text)
+            return text
+        finally:
+            # Also when `extract` raises: a failed key must not keep its lock forever
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1] and self._key_locks.get(key) is entry:
+                    del self._key_locks[key]
+
+    def _count(self, hit: bool):
+        # Sessions run on concurrent threads: `+=` on an attribute is not atomic
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def memory_texts(self) -> list:
+        """The texts held by the in-memory tier (the objects themselves, not copies)."""
+        with self._lock:
+            return list(self._memory.values())
+
+    def evict_oldest(self) -> bool:
+        """Drop the least recently used in-memory entry that is also on disk; False if there is none.
+
+        Entries only held in memory are kept: dropping them would mean
+        extracting (and, with LlamaParse, uploading) the document again.
+        """
+        if not self.disk_dir:
+            return False
+        with self._lock:
+            for key in self._memory:
+                if os.path.exists(self._disk_path(key)):
+                    del self._memory[key]
+                    return True
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+
+_default_cache = None
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Process-wide cache; the disk tier is enabled with MINDBRIDGE_CACHE_DIR."""
+    global _default_cache
+    if _default_cache is None:
+        disk_dir = os.environ.get("MINDBRIDGE_CACHE_DIR")
+        max_disk_mb = int(os.environ.get("MINDBRIDGE_CACHE_MAX_MB", "512"))
+        _default_cache = ExtractionCache(
+            disk_dir=os.path.join(disk_dir, "extracted_text") if disk_dir else None,
+            max_disk_bytes=max_disk_mb * 1024 * 1024,
+        )
+    return _default_cache
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+# Pieces a streamed reply is cut into
+STREAM_CHUNKS = 40
+
+
+############################################
+# DETERMINISTIC FAKE CHAT MODEL (offline runs, benchmarks)
+############################################
+
+def build_fake_quiz(schema, num_questions: int, context: str) -> dict:
+    """A quiz payload for `schema` (pydantic class or JSON schema) whose questions are sentences of `context`.
+
+    Handles both shapes used by the app: parallel `questions` / `answers` /
+    `alternatives` lists, and a `questions` list of per-question objects.
+    """
+    json_schema = schema if isinstance(schema, dict) else schema.model_json_schema()
+    properties = json_schema["properties"]
+    sentences = [s.strip() for s in re.split(r"[.!?؟\n]+", context) if len(s.strip()) > 3] or ["..."]
+    picked = [sentences[i % len(sentences)] for i in range(num_questions)]
+    questions = [f"Q{i + 1}. {sentence} ?" for i, sentence in enumerate(picked)]
+    alternatives = [[sentence, "Aucune des réponses", "Toutes les réponses"] for sentence in picked]
+
+    def answers(field):
+        if "True or False" in field.get("description", ""):
+            return ["True" if i % 2 == 0 else "False" for i in range(num_questions)]
+        return list(picked)
+
+    item_ref = properties["questions"].get("items", {}).get("$ref")
+    if item_ref:
+        item_properties = json_schema["$defs"][item_ref.split("/")[-1]]["properties"]
+        item_answers = answers(item_properties["answer"])
+        payload = {"questions": []}
+        for i, question in enumerate(questions):
+            item = {"question": question, "answer": item_answers[i]}
+            if "alternatives" in item_properties:
+                item["alternatives"] = alternatives[i]
+            payload["questions"].append(item)
+    else:
+        payload = {"questions": questions, "answers": answers(properties["answers"])}
+        if "alternatives" in properties:
+            payload["alternatives"] = alternatives
+    if "quiz_text" in properties:
+        payload["quiz_text"] = "Quiz"
+    return payload
+
+
+def fake_quiz_json(schema, prompt: str) -> str:
+    """JSON answer to a rendered quiz prompt, matching `schema`."""
+    # The templates put {num_questions}, then "context" or ":", then {quiz_context}
+    match = re.search(r"\d+", prompt)
+    num_questions = int(match.group()) if match else 3
+    rest = prompt[match.end():] if match else prompt
+    separator = re.search(r":\s*", rest) or re.search(r"context\s*", rest)
+    context = rest[separator.end():] if separator else rest
+    return json.dumps(build_fake_quiz(schema, num_questions, context), ensure_ascii=False)
+
+
+class FakeQuizChatModel(BaseChatModel):
+    """Answers every prompt with a well-formed quiz after a configurable latency.
+
+    Works with `create_quiz_chain`: `with_structured_output(schema)` makes the
+    model reply with JSON matching the schema, parsed back into it.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    seed: int = 0
+    model_name: str = "fake-quiz"
+
+    _rng: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-quiz"
+
+    def _delay(self) -> float:
+        if self._rng is None:
+            self._rng = random.Random(self.seed)
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _reply(self, messages: List[BaseMessage], quiz_schema=None) -> ChatResult:
+        prompt = messages[-1].content
+        content = prompt if quiz_schema is None else fake_quiz_json(quiz_schema, prompt)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, quiz_schema=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        return self._reply(messages, quiz_schema)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, quiz_schema=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return self._reply(messages, quiz_schema)
+
+    def _chunks(self, messages: List[BaseMessage], quiz_schema=None):
+        # The reply is cut in pieces spread over the latency, like a token stream
+        content = self._reply(messages, quiz_schema).generations[0].message.content
+        size = max(1, len(content) // STREAM_CHUNKS)
+        pieces = [content[i:i + size] for i in range(0, len(content), size)]
+        delay = self._delay() / max(1, len(pieces))
+        return pieces, delay
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, quiz_schema=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        pieces, delay = self._chunks(messages, quiz_schema)
+        for piece in pieces:
+            time.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, quiz_schema=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        pieces, delay = self._chunks(messages, quiz_schema)
+        for piece in pieces:
+            await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    def with_structured_output(self, schema, **kwargs):
+        if isinstance(schema, dict):
+            # JSON schema: parsed as plain dicts, partial objects while streaming
+            return self.bind(quiz_schema=schema) | JsonOutputParser()
+        return self.bind(quiz_schema=schema) | RunnableLambda(
+            lambda message: schema.model_validate_json(message.content)
+        )
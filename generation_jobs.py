@@ -0,0 +1,194 @@
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+############################################
+# BACKGROUND GENERATION JOBS
+############################################
+# Quiz generation waits on the model for seconds to minutes. Run in the
+# Streamlit script, it holds the session's rerun and a server thread for
+# the whole call; as a job, the script returns at once and polls for
+# progress, and a fixed pool of workers serves every session of the process.
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_PENDING = 64
+# Finished jobs kept for sessions that have not polled them yet
+KEEP_FINISHED = 256
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    """A generation submitted to the queue; read by the UI, updated by the worker."""
+
+    def __init__(self, key: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.key = key
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.partial: List[Any] = []  # results available before the end (e.g. streamed questions)
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.watchers = 1
+        self._cancel = threading.Event()
+        self._future: Optional[concurrent.futures.Future] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def report(self, progress: float, message: Optional[str] = None):
+        """Called by the job itself, from any thread, to publish its progress."""
+        self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def check_cancelled(self):
+        """Raises JobCancelled once nobody waits for the job any more; long jobs call it between steps."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def wait(self, future: concurrent.futures.Future, poll_interval: float = 0.1):
+        """Result of `future` (e.g. from submit_coroutine); cancels it if the job is cancelled meanwhile."""
+        while True:
+            try:
+                return future.result(timeout=poll_interval)
+            except concurrent.futures.TimeoutError:
+                if self._cancel.is_set():
+                    future.cancel()
+                    raise JobCancelled(self.id)
+
+
+class JobQueue:
+    """Bounded pool of worker threads with a local queue, and no external broker.
+
+    Jobs are keyed (e.g. by the quiz cache key): submitting a key that is
+    already queued or running returns the in-flight job instead of
+    generating the same quiz twice. A job is cancelled when every session
+    that submitted it has cancelled it.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, max_pending: int = DEFAULT_MAX_PENDING,
+                 keep_finished: int = KEEP_FINISHED):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="generation")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()  # id -> Job, finished ones evicted oldest first
+        self._inflight = {}         # key -> Job, queued or running
+        self.deduplicated = 0
+
+    def submit(self, key: str, fn: Callable[[Job], Any]) -> Job:
+        """Run `fn(job)` on a worker; its return value becomes `job.result`."""
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is not None and not job.cancelled:
+                job.watchers += 1
+                self.deduplicated += 1
+                return job
+            if len(self._inflight) >= self.max_pending:
+                raise QueueFull(f"{len(self._inflight)} generations already pending")
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._inflight[key] = job
+            job._future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]):
+        try:
+            job.check_cancelled()
+            job.status, job.started_at = RUNNING, time.time()
+            result = fn(job)
+            job.check_cancelled()
+            job.result, job.progress, job.status = result, 1.0, DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as err:
+            logger.warning("Generation job %s failed: %s", job.id, err)
+            job.error, job.status = err, FAILED
+        finally:
+            job.finished_at = time.time()
+            self._finish(job)
+
+    def _finish(self, job: Job):
+        with self._lock:
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            finished = [j for j in self._jobs.values() if j.done]
+            for old in finished[:max(0, len(finished) - self.keep_finished)]:
+                del self._jobs[old.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Withdraw one watcher; the job is cancelled when none is left. Returns True if it was."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return False
+            job.watchers -= 1
+            if job.watchers > 0:
+                return False
+            job._cancel.set()
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            # Still waiting for a worker: it will never start
+            if job._future.cancel():
+                job.status, job.finished_at = CANCELLED, time.time()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "queued": sum(job.status == QUEUED for job in jobs),
+            "running": sum(job.status == RUNNING for job in jobs),
+            "done": sum(job.status == DONE for job in jobs),
+            "failed": sum(job.status == FAILED for job in jobs),
+            "cancelled": sum(job.status == CANCELLED for job in jobs),
+            "deduplicated": self.deduplicated,
+            "workers": self.max_workers,
+        }
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide queue; MINDBRIDGE_GENERATION_WORKERS sets the pool size (default 8)."""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(
+                max_workers=int(os.environ.get("MINDBRIDGE_GENERATION_WORKERS", DEFAULT_WORKERS)),
+                max_pending=int(os.environ.get("MINDBRIDGE_GENERATION_MAX_PENDING", DEFAULT_MAX_PENDING)),
+            )
+    return _default_queue
@@ -0,0 +1,148 @@
+import re
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+
+############################################
+# ANSWER-KEY NORMALIZATION
+############################################
+# Models write the correct answer as the option text, as a letter ("b",
+# "B)", "(c)") or, for true/false, in any casing or language. The key is
+# normalized once into option indices; submissions are encoded the same way
+# and a whole class is then graded with array operations.
+
+TRUE_FALSE_OPTIONS = ["True", "False"]
+
+_TRUE_WORDS = {"true", "vrai", "oui", "yes", "صحيح", "صح", "نعم"}
+_FALSE_WORDS = {"false", "faux", "non", "no", "خطأ", "خاطئ", "خطا", "لا"}
+
+# -1 marks a missing answer, or a key entry that matches no option
+UNANSWERED = -1
+
+_LETTER = re.compile(r"^\(?([a-z])\s*[).:]?$")
+_LETTER_PREFIX = re.compile(r"^\(?[a-z]\s*[).:]\s+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).casefold().split())
+
+
+def _strip_letter(text: str) -> str:
+    return _LETTER_PREFIX.sub("", text)
+
+
+def option_index(answer: Optional[str], options: Sequence[str]) -> int:
+    """Index of `answer` among `options` (by text or by letter), or UNANSWERED."""
+    if answer is None:
+        return UNANSWERED
+    normalized = _normalize(answer)
+    if not normalized:
+        return UNANSWERED
+    if list(options) == TRUE_FALSE_OPTIONS:
+        if normalized.strip(".!") in _TRUE_WORDS:
+            return 0
+        if normalized.strip(".!") in _FALSE_WORDS:
+            return 1
+        return UNANSWERED
+
+    normalized_options = [_normalize(option) for option in options]
+    if normalized in normalized_options:
+        return normalized_options.index(normalized)
+    bare_options = [_strip_letter(option) for option in normalized_options]
+    if _strip_letter(normalized) in bare_options:
+        return bare_options.index(_strip_letter(normalized))
+    letter = _LETTER.match(normalized)
+    if letter and ord(letter.group(1)) - 97 < len(options):
+        return ord(letter.group(1)) - 97
+    return UNANSWERED
+
+
+def _options_for(alternatives: Optional[Sequence[Sequence[str]]], num_questions: int):
+    if alternatives is None:
+        return [TRUE_FALSE_OPTIONS] * num_questions
+    return alternatives
+
+
+def normalize_answer_key(answers: Sequence[str],
+                         alternatives: Optional[Sequence[Sequence[str]]] = None) -> np.ndarray:
+    """Integer array of correct option indices; without `alternatives`, a true/false key."""
+    options = _options_for(alternatives, len(answers))
+    return np.array([option_index(answer, options[i]) for i, answer in enumerate(answers)], dtype=np.int16)
+
+
+def encode_submissions(submissions: Sequence[Sequence[Optional[str]]],
+                       alternatives: Optional[Sequence[Sequence[str]]] = None) -> np.ndarray:
+    """(students, questions) matrix of chosen option indices from submitted answers."""
+    if not submissions:
+        return np.empty((0, 0), dtype=np.int16)
+    num_questions = len(submissions[0])
+    options = _options_for(alternatives, num_questions)
+    # Per question, each distinct answer is parsed once and looked up after that
+    columns = []
+    for q in range(num_questions):
+        lookup = {}
+        column = []
+        for submission in submissions:
+            answer = submission[q] if q < len(submission) else None
+            index = lookup.get(answer)
+            if index is None:
+                index = lookup[answer] = option_index(answer, options[q])
+            column.append(index)
+        columns.append(column)
+    return np.array(columns, dtype=np.int16).T
+
+
+############################################
+# BULK GRADING
+############################################
+
+class GradeReport(NamedTuple):
+    scores: np.ndarray          # (students,) number of correct answers
+    correct: np.ndarray         # (students, questions) bool
+    difficulty: np.ndarray      # (questions,) share of students who answered correctly
+    discrimination: np.ndarray  # (questions,) correlation between the item and the rest of the test
+    option_counts: np.ndarray   # (questions, options) how many students chose each option
+
+
+def grade(answer_key: np.ndarray, responses: np.ndarray, num_options: Optional[int] = None) -> GradeReport:
+    """Grade a (students, questions) matrix of option indices against the key in one pass.
+
+    Key entries that match no option (UNANSWERED) are never counted as correct.
+    """
+    answer_key = np.asarray(answer_key)
+    responses = np.atleast_2d(np.asarray(responses))
+    students, questions = responses.shape
+
+    correct = (responses == answer_key) & (answer_key != UNANSWERED)
+    scores = correct.sum(axis=1, dtype=np.int32)
+    difficulty = correct.mean(axis=0) if students else np.zeros(questions)
+
+    # Item-rest correlation: does getting this question right go with a high
+    # score on the other questions? Constant columns have no correlation.
+    discrimination = np.zeros(questions)
+    if students:
+        item = correct.astype(np.float32)
+        rest = scores[:, None].astype(np.float32) - item
+        item_c = item - item.mean(axis=0)
+        rest_c = rest - rest.mean(axis=0)
+        denominator = np.sqrt((item_c ** 2).sum(axis=0) * (rest_c ** 2).sum(axis=0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            discrimination = np.where(denominator > 0, (item_c * rest_c).sum(axis=0) / denominator, 0.0)
+
+    if num_options is None:
+        num_options = int(max(responses.max(initial=UNANSWERED), answer_key.max(initial=UNANSWERED))) + 1
+    answered = responses >= 0
+    flat = (np.nonzero(answered)[1] * num_options + responses[answered]).astype(np.int64)
+    option_counts = np.bincount(flat, minlength=questions * num_options).reshape(questions, num_options)
+
+    return GradeReport(scores, correct, difficulty, discrimination, option_counts)
+
+
+def grade_answers(answers: List[str], submissions: Sequence[Sequence[Optional[str]]],
+                  alternatives: Optional[Sequence[Sequence[str]]] = None) -> GradeReport:
+    """Normalize the key and the submitted answers, then grade them."""
+    num_options = max((len(options) for options in alternatives), default=0) if alternatives else 2
+    responses = (encode_submissions(submissions, alternatives) if submissions else
+                 np.empty((0, len(answers)), dtype=np.int16))
+    return grade(normalize_answer_key(answers, alternatives), responses, num_options)
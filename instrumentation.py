@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+############################################
+# TRACES AND SPANS
+############################################
+# A trace covers one run of the pipeline (a Streamlit rerun, a document of a
+# batch); each stage is a span with its wall time and optional attributes
+# such as token counts or cache hits. Every finished span is logged as one
+# JSON line and aggregated into process-wide metrics.
+
+# Attributes aggregated into the Prometheus counters
+TOKEN_ATTRIBUTES = {"tokens_in": "input", "tokens_out": "output", "tokens_saved": "saved"}
+
+# Reruns write the metrics file at most this often (seconds)
+METRICS_WRITE_INTERVAL = 15.0
+
+# Upper bounds (seconds) of the stage duration histogram
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Trace:
+    def __init__(self, name: str, trace_id: Optional[str] = None):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.spans: List[dict] = []
+
+    @contextmanager
+    def span(self, stage: str, **attributes):
+        """Time the block; attributes can be added to the yielded dict from inside it."""
+        record = {"trace": self.trace_id, "pipeline": self.name, "stage": stage,
+                  "start": time.time(), **attributes}
+        start = time.perf_counter()
+        try:
+            yield record
+        # Exception only: st.rerun() and st.stop() unwind the script with
+        # BaseExceptions, which are control flow, not failures
+        except Exception as err:
+            record["error"] = type(err).__name__
+            raise
+        finally:
+            record["duration_s"] = time.perf_counter() - start
+            self.spans.append(record)
+            get_metrics().observe(record)
+            logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    def timings(self) -> Dict[str, float]:
+        """Duration of each stage (summed if a stage ran several times)."""
+        totals = {}
+        for record in self.spans:
+            totals[record["stage"]] = totals.get(record["stage"], 0.0) + record["duration_s"]
+        return totals
+
+
+############################################
+# PROCESS-WIDE METRICS (Prometheus text format)
+############################################
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = {}  # stage -> [bucket counts..., count, sum]
+        self._tokens = {}     # (stage, direction) -> total
+        self._cache = {}      # (stage, "hit" | "miss") -> total
+        self._errors = {}     # stage -> total
+        self._written_at = None
+
+    def observe(self, record: dict):
+        stage, duration = record["stage"], record["duration_s"]
+        with self._lock:
+            histogram = self._durations.setdefault(stage, [0] * len(BUCKETS) + [0, 0.0])
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += duration
+            for attribute, direction in TOKEN_ATTRIBUTES.items():
+                if record.get(attribute):
+                    key = (stage, direction)
+                    self._tokens[key] = self._tokens.get(key, 0) + record[attribute]
+            if "cache_hit" in record:
+                key = (stage, "hit" if record["cache_hit"] else "miss")
+                self._cache[key] = self._cache.get(key, 0) + 1
+            if "error" in record:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+
+    def render(self) -> str:
+        lines = ["# HELP mindbridge_stage_seconds Wall time of each pipeline stage.",
+                 "# TYPE mindbridge_stage_seconds histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self._durations.items()):
+                for bound, count in zip(BUCKETS, histogram):
+                    lines.append(f'mindbridge_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'mindbridge_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram[-2]}')
+                lines.append(f'mindbridge_stage_seconds_sum{{stage="{stage}"}} {histogram[-1]:.6f}')
+                lines.append(f'mindbridge_stage_seconds_count{{stage="{stage}"}} {histogram[-2]}')
+            lines += ["# HELP mindbridge_tokens_total Tokens sent to and received from the model, "
+                      "and removed from contexts by normalization.",
+                      "# TYPE mindbridge_tokens_total counter"]
+            for (stage, direction), total in sorted(self._tokens.items()):
+                lines.append(f'mindbridge_tokens_total{{stage="{stage}",direction="{direction}"}} {total}')
+            lines += ["# HELP mindbridge_cache_total Cache lookups per stage.",
+                      "# TYPE mindbridge_cache_total counter"]
+            for (stage, result), total in sorted(self._cache.items()):
+                lines.append(f'mindbridge_cache_total{{stage="{stage}",result="{result}"}} {total}')
+            lines += ["# HELP mindbridge_stage_errors_total Stages that raised.",
+                      "# TYPE mindbridge_stage_errors_total counter"]
+            for stage, total in sorted(self._errors.items()):
+                lines.append(f'mindbridge_stage_errors_total{{stage="{stage}"}} {total}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Optional[str] = None) -> str:
+        """Write the metrics for a textfile collector; atomic, so scrapes never see half a file."""
+        path = path or metrics_path()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Sessions run on threads of the same process: the temp name must be per thread
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+        self._written_at = time.monotonic()
+        return path
+
+    def write_if_due(self, interval: float = METRICS_WRITE_INTERVAL) -> Optional[str]:
+        """write(), unless the file was written less than `interval` seconds ago."""
+        with self._lock:
+            if self._written_at is not None and time.monotonic() - self._written_at < interval:
+                return None
+            # Claimed now, so concurrent sessions do not all write
+            self._written_at = time.monotonic()
+        return self.write()
+
+
+def metrics_path() -> str:
+    """MINDBRIDGE_METRICS_FILE, or metrics.prom under MINDBRIDGE_CACHE_DIR (default ~/.cache/mindbridge)."""
+    if os.environ.get("MINDBRIDGE_METRICS_FILE"):
+        return os.environ["MINDBRIDGE_METRICS_FILE"]
+    cache_dir = os.environ.get("MINDBRIDGE_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "mindbridge")
+    return os.path.join(cache_dir, "metrics.prom")
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+_json_handler = None
+
+
+def enable_json_logs():
+    """Log every span as one JSON line on stderr; calling it again does nothing."""
+    global _json_handler
+    with _default_metrics_lock:
+        if _json_handler is None:
+            _json_handler = logging.StreamHandler()
+            _json_handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(_json_handler)
+            logger.setLevel(logging.INFO)
+
+
+def get_metrics() -> Metrics:
+    """Process-wide metrics, shared by every session and batch task."""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+    return _default_metrics
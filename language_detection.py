@@ -0,0 +1,103 @@
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from lazy_imports import lazy_module
+
+
+def _seed(module):
+    # langdetect is randomized: a fixed seed makes it return the same answer for the same text
+    module.DetectorFactory.seed = 0
+
+
+# Only needed for texts whose script does not give the language away
+langdetect = lazy_module("langdetect", on_import=_seed)
+
+
+############################################
+# SAMPLED, CACHED LANGUAGE DETECTION
+############################################
+
+DEFAULT_LANGUAGE = "en"
+
+# Characters looked at in total, and in how many windows spread over the text
+SAMPLE_CHARS = 2000
+SAMPLE_WINDOWS = 8
+
+# Scripts used by a single language we support: no need for the statistical model
+SCRIPT_LANGUAGES = [
+    ("ar", [(0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)]),
+]
+# Share of the letters in the sample that must belong to the script
+SCRIPT_THRESHOLD = 0.5
+
+CACHE_SIZE = 1024
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def sample_text(text: str, max_chars: int = SAMPLE_CHARS, windows: int = SAMPLE_WINDOWS) -> str:
+    """Up to `max_chars` characters taken from `windows` evenly spread positions of `text`."""
+    if len(text) <= max_chars:
+        return text
+    window = max_chars // windows
+    step = (len(text) - window) / (windows - 1)
+    parts = []
+    for i in range(windows):
+        start = int(i * step)
+        # Start and end on word boundaries so no truncated words skew the n-grams
+        chunk = text[start:start + window]
+        # (text without spaces, e.g. Chinese, Japanese or Thai, is kept as is)
+        if start > 0:
+            _, separator, rest = chunk.partition(" ")
+            chunk = rest if separator else chunk
+        chunk = chunk.rpartition(" ")[0] or chunk
+        parts.append(chunk)
+    return " ".join(parts)
+
+
+def detect_script(text: str):
+    """Language of the dominant script of `text`, or None if no single-language script dominates."""
+    letters = 0
+    counts = {lang: 0 for lang, _ in SCRIPT_LANGUAGES}
+    for char in text:
+        if not char.isalpha():
+            continue
+        letters += 1
+        code = ord(char)
+        if code < 0x0600:
+            continue
+        for lang, ranges in SCRIPT_LANGUAGES:
+            if any(low <= code <= high for low, high in ranges):
+                counts[lang] += 1
+                break
+    if not letters:
+        return None
+    lang, count = max(counts.items(), key=lambda item: item[1])
+    return lang if count / letters >= SCRIPT_THRESHOLD else None
+
+
+def detect_language(text: str) -> str:
+    """Language code of `text` (e.g. 'fr', 'en', 'ar'), from a bounded sample of it."""
+    sample = unicodedata.normalize("NFC", sample_text(text))
+    key = hashlib.sha1(sample.encode("utf-8")).hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    lang = detect_script(sample)
+    if lang is None:
+        try:
+            lang = langdetect.detect(sample)
+        except langdetect.LangDetectException:
+            # No usable features (empty text, digits only...)
+            lang = DEFAULT_LANGUAGE
+
+    with _cache_lock:
+        _cache[key] = lang
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return lang
@@ -0,0 +1,44 @@
+import importlib
+import sys
+import threading
+import types
+from typing import Callable, Optional
+
+
+############################################
+# MODULES IMPORTED ON FIRST USE
+############################################
+# The app only needs the LLM stack when a quiz is generated, LlamaParse when
+# that parser is picked, and so on: importing all of it up front made every
+# new process (Streamlit worker, extraction shard, container) pay seconds of
+# start-up for code a given session may never run.
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module, which is imported on the first attribute access."""
+
+    def __init__(self, name: str, on_import: Optional[Callable[[types.ModuleType], None]] = None):
+        super().__init__(name)
+        self._lazy_on_import = on_import
+        self._lazy_lock = threading.Lock()
+
+    def __getattr__(self, attribute: str):
+        with self._lazy_lock:
+            module = importlib.import_module(self.__name__)
+            if self._lazy_on_import is not None:
+                self._lazy_on_import(module)
+                self._lazy_on_import = None
+            # Later lookups find the attributes here, without going through this method
+            # (packages such as langchain_core.prompts resolve theirs on demand too)
+            self.__dict__.update(module.__dict__)
+            value = self.__dict__[attribute] = getattr(module, attribute)
+        return value
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self.__name__!r}>"
+
+
+def lazy_module(name: str, on_import: Optional[Callable[[types.ModuleType], None]] = None) -> types.ModuleType:
+    """`name`, imported when first used; `on_import` runs once on the real module (e.g. to configure it)."""
+    if name in sys.modules and on_import is None:
+        return sys.modules[name]
+    return LazyModule(name, on_import)
@@ -0,0 +1,193 @@
+import asyncio
+import concurrent.futures
+import os
+import queue
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from lazy_imports import lazy_module
+from llm_clients import submit_coroutine
+
+# Only loaded when a document is actually sent to LlamaParse
+aiohttp = lazy_module("aiohttp")
+
+
+############################################
+# ASYNC LLAMAPARSE JOB CLIENT
+############################################
+
+# The REST routes the llama_parse SDK itself calls (upload, then poll the
+# job, then fetch its text). The SDK is not a dependency any more: it writes
+# uploads to disk and runs its own event loop per call. Should the service
+# move these routes, only the three constants below change.
+DEFAULT_BASE_URL = "https://api.cloud.llamaindex.ai"
+
+UPLOAD_ROUTE = "/api/parsing/upload"
+JOB_STATUS_ROUTE = "/api/parsing/job/{job_id}"
+JOB_RESULT_ROUTE = "/api/parsing/job/{job_id}/result/text"
+
+# on_progress(message, fraction) with fraction in [0, 1]
+ProgressCallback = Callable[[str, float], None]
+
+
+class LlamaParseError(Exception):
+    pass
+
+
+class LlamaParseClient:
+    """Uploads PDF bytes to LlamaParse and polls the jobs, several at a time.
+
+    No file is written to disk: the bytes are sent directly as the multipart
+    upload, so concurrent sessions cannot clobber each other's documents.
+    Use it as an async context manager, inside a single event loop; or pass
+    it a `session` and `semaphore` shared with other clients (the limit then
+    applies to all of them, see parse_pdf_bytes).
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL, max_concurrency: int = 4,
+                 poll_interval: float = 1.0, max_poll_interval: float = 8.0, timeout: float = 600.0,
+                 session=None, semaphore: Optional[asyncio.Semaphore] = None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self._headers = {"Authorization": f"Bearer {api_key}"}
+        self._owns_session = session is None
+        self._session = session
+        self._semaphore = semaphore
+
+    async def __aenter__(self):
+        if self._owns_session:
+            self._session = aiohttp.ClientSession()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._owns_session:
+            await self._session.close()
+            self._session = None
+
+    def _url(self, route: str, **params) -> str:
+        return self.base_url + route.format(**params)
+
+    async def _upload(self, data: bytes, file_name: str) -> str:
+        form = aiohttp.FormData()
+        form.add_field("file", data, filename=file_name, content_type="application/pdf")
+        async with self._session.post(self._url(UPLOAD_ROUTE), data=form, headers=self._headers) as resp:
+            if resp.status >= 400:
+                raise LlamaParseError(f"Upload of {file_name} failed ({resp.status}): {await resp.text()}")
+            return (await resp.json())["id"]
+
+    async def _wait_for_job(self, job_id: str, on_progress: Optional[ProgressCallback]):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        interval = self.poll_interval
+        polls = 0
+        while True:
+            async with self._session.get(self._url(JOB_STATUS_ROUTE, job_id=job_id), headers=self._headers) as resp:
+                if resp.status >= 400:
+                    raise LlamaParseError(f"Status check of job {job_id} failed ({resp.status})")
+                job = await resp.json()
+
+            # Allowed values: PENDING, SUCCESS, ERROR, CANCELED
+            status = job["status"]
+            if status == "SUCCESS":
+                return
+            if status != "PENDING":
+                raise LlamaParseError(
+                    f"Job {job_id} failed with status {status}: {job.get('error_message', 'no error message')}"
+                )
+            if loop.time() > deadline:
+                raise LlamaParseError(f"Timeout while parsing job {job_id}")
+
+            # The service does not report a percentage: creep towards 90 %
+            polls += 1
+            if on_progress:
+                on_progress("parsing", 0.2 + 0.7 * (1 - 0.8 ** polls))
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+
+    async def _fetch_text(self, job_id: str) -> str:
+        async with self._session.get(self._url(JOB_RESULT_ROUTE, job_id=job_id), headers=self._headers) as resp:
+            if resp.status >= 400:
+                raise LlamaParseError(f"Fetching the result of job {job_id} failed ({resp.status})")
+            return (await resp.json())["text"]
+
+    async def parse(self, data: bytes, file_name: str = "document.pdf",
+                    on_progress: Optional[ProgressCallback] = None) -> str:
+        async with self._semaphore:
+            if on_progress:
+                on_progress("uploading", 0.0)
+            job_id = await self._upload(data, file_name)
+            if on_progress:
+                on_progress("parsing", 0.2)
+            await self._wait_for_job(job_id, on_progress)
+            text = await self._fetch_text(job_id)
+            if on_progress:
+                on_progress("done", 1.0)
+            return text
+
+    async def parse_many(self, documents: Sequence[Tuple[bytes, str]],
+                         on_progress: Optional[ProgressCallback] = None) -> List[str]:
+        """Parse `(data, file_name)` pairs concurrently; results are in input order."""
+        fractions = [0.0] * len(documents)
+
+        def job_progress(i):
+            def report(message, fraction):
+                fractions[i] = fraction
+                if on_progress:
+                    on_progress(f"{documents[i][1]}: {message}", sum(fractions) / len(fractions))
+            return report
+
+        return await asyncio.gather(*(
+            self.parse(data, file_name, job_progress(i))
+            for i, (data, file_name) in enumerate(documents)
+        ))
+
+
+############################################
+# PROCESS-WIDE CLIENT
+############################################
+
+# Parses in flight at once for the whole process, every session and key included
+MAX_CONCURRENT_PARSES = int(os.environ.get("MINDBRIDGE_LLAMAPARSE_CONCURRENCY", "4"))
+
+# Created on the shared event loop of llm_clients, and only ever used there
+_shared_session = None
+_shared_semaphore = None
+
+
+async def _shared_client(api_key: str, **client_options) -> LlamaParseClient:
+    global _shared_session, _shared_semaphore
+    if _shared_session is None:
+        _shared_session = aiohttp.ClientSession()
+        _shared_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PARSES)
+    return LlamaParseClient(api_key, session=_shared_session, semaphore=_shared_semaphore, **client_options)
+
+
+def parse_pdf_bytes(data: bytes, api_key: str, file_name: str = "document.pdf",
+                    on_progress: Optional[ProgressCallback] = None, **client_options) -> str:
+    """Synchronous entry point for callers without an event loop (e.g. the Streamlit script).
+
+    The parse runs on the process-wide event loop, with one connection pool
+    and at most MAX_CONCURRENT_PARSES parses in flight across all callers.
+    `on_progress` is still called on the caller's thread.
+    """
+    updates = queue.SimpleQueue()
+
+    async def run():
+        client = await _shared_client(api_key, **client_options)
+        return await client.parse(data, file_name, lambda *update: updates.put(update))
+
+    future = submit_coroutine(run())
+    while True:
+        concurrent.futures.wait([future], timeout=0.1)
+        # Checked before draining: once done, every update (the final "done" one
+        # included) is already in the queue, and this drain relays it
+        finished = future.done()
+        while on_progress and not updates.empty():
+            on_progress(*updates.get())
+        if finished:
+            return future.result()
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Callable, Optional
+
+from pydantic import ValidationError
+
+
+############################################
+# PERSISTENT CACHE OF GENERATED QUIZZES (SQLite)
+############################################
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 2000
+
+
+def make_key(prompt_template, **inputs) -> str:
+    """Hash of the prompt template and every input that changes the model's answer."""
+    payload = json.dumps(
+        {"template": prompt_template.pretty_repr(), **inputs},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QuizResponseCache:
+    """SQLite-backed cache of structured quiz responses, with a TTL and LRU eviction.
+
+    Responses generated with temperature > 0 are meant to vary, so they bypass
+    the cache unless `cache_creative=True` is passed.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quiz_responses ("
+                " key TEXT PRIMARY KEY, payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS quiz_responses_last_used ON quiz_responses (last_used)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM quiz_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM quiz_responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE quiz_responses SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key: str, payload: str):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO quiz_responses (key, payload, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            conn.execute("DELETE FROM quiz_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM quiz_responses WHERE key IN ("
+                " SELECT key FROM quiz_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM quiz_responses WHERE key = ?", (key,))
+
+    def get_or_generate(self, key: str, schema, generate: Callable, temperature: float = 0.0,
+                        cache_creative: bool = False):
+        """Cached `schema` instance for `key`, or the result of `generate()` (then stored)."""
+        if temperature > 0 and not cache_creative:
+            with self._lock:
+                self.bypassed += 1
+            return generate()
+
+        payload = self.get(key)
+        if payload is not None:
+            try:
+                response = schema.model_validate_json(payload)
+            except ValidationError:
+                # Stored under an older schema: drop it and answer as a miss,
+                # instead of failing on every hit until the TTL expires
+                self.delete(key)
+            else:
+                with self._lock:
+                    self.hits += 1
+                return response
+
+        with self._lock:
+            self.misses += 1
+        response = generate()
+        self.put(key, response.model_dump_json())
+        return response
+
+    def stats(self) -> dict:
+        with closing(self._connect()) as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM quiz_responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "bypassed": self.bypassed, "entries": entries}
+
+
+_default_cache = None
+
+
+def get_quiz_cache() -> QuizResponseCache:
+    """Process-wide cache, stored under MINDBRIDGE_CACHE_DIR (default ~/.cache/mindbridge)."""
+    global _default_cache
+    if _default_cache is None:
+        cache_dir = os.environ.get("MINDBRIDGE_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "mindbridge")
+        _default_cache = QuizResponseCache(
+            os.path.join(cache_dir, "quiz_responses.sqlite3"),
+            ttl_seconds=float(os.environ.get("MINDBRIDGE_QUIZ_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            max_entries=int(os.environ.get("MINDBRIDGE_QUIZ_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        )
+    return _default_cache
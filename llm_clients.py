@@ -0,0 +1,105 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
+from lazy_imports import lazy_module
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+# The OpenAI stack is the slowest import of the app by far: loaded with the first client
+httpx = lazy_module("httpx")
+langchain_openai = lazy_module("langchain_openai")
+
+
+############################################
+# POOLED CHAT MODEL CLIENTS
+############################################
+
+DEFAULT_MODEL = "gpt-4o"
+
+# One HTTP connection pool for every key and model: connections (and their
+# TLS sessions) are kept alive and reused across clicks and sessions.
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 60
+REQUEST_TIMEOUT = 120.0
+CONNECT_TIMEOUT = 10.0
+
+# Chat model clients kept, least recently used dropped first: every new key
+# would otherwise pin a client for the life of the process.
+MAX_CHAT_MODELS = int(os.environ.get("MINDBRIDGE_MAX_CHAT_MODELS", "32"))
+
+_lock = threading.Lock()
+_http_client = None
+_http_async_client = None
+_chat_models = OrderedDict()
+
+_loop = None
+
+
+def _shared_http_clients():
+    global _http_client, _http_async_client
+    if _http_client is None:
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                              keepalive_expiry=KEEPALIVE_EXPIRY)
+        timeout = httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+        _http_client = httpx.Client(limits=limits, timeout=timeout)
+        _http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+    return _http_client, _http_async_client
+
+
+def get_chat_model(api_key: str, model: str = DEFAULT_MODEL, temperature: float = 0.0,
+                   base_url: Optional[str] = None) -> "ChatOpenAI":
+    """Chat model for `api_key` and `model`, sharing the process-wide connection pool.
+
+    The underlying client is built once per (API key, model, base URL) and kept
+    among the MAX_CHAT_MODELS most recently used; each call returns a cheap copy
+    carrying its own temperature. The API key is passed to
+    the client directly, never through os.environ, so concurrent sessions with
+    different keys do not interfere.
+    """
+    pool_key = (hashlib.sha256(api_key.encode("utf-8")).hexdigest(), model, base_url)
+    with _lock:
+        chat_model = _chat_models.get(pool_key)
+        if chat_model is None:
+            http_client, http_async_client = _shared_http_clients()
+            chat_model = langchain_openai.ChatOpenAI(
+                model=model,
+                api_key=api_key,
+                base_url=base_url,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            _chat_models[pool_key] = chat_model
+            # Evicted clients only drop their key: the HTTP pool stays shared
+            while len(_chat_models) > MAX_CHAT_MODELS:
+                _chat_models.popitem(last=False)
+        else:
+            _chat_models.move_to_end(pool_key)
+    # model_copy() does not rebuild the OpenAI clients: the copy shares them
+    return chat_model.model_copy(update={"temperature": temperature})
+
+
+def run_coroutine(coro):
+    """Run `coro` to completion on the process-wide event loop and return its result.
+
+    Pooled async connections belong to the loop that opened them, so async
+    calls made from synchronous code (e.g. the Streamlit script) must all go
+    through this loop rather than a fresh asyncio.run() loop per call.
+    """
+    return submit_coroutine(coro).result()
+
+
+def submit_coroutine(coro) -> "concurrent.futures.Future":
+    """Schedule `coro` on the process-wide event loop; cancelling the future cancels the coroutine."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _loop)
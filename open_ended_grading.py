@@ -0,0 +1,224 @@
+import itertools
+import logging
+import re
+import unicodedata
+import zlib
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from language_detection import detect_language
+from lazy_imports import lazy_module
+
+prompts = lazy_module("langchain_core.prompts")
+
+logger = logging.getLogger(__name__)
+
+
+############################################
+# LANGUAGE-AWARE NORMALIZATION (fr / en / ar)
+############################################
+
+STOPWORDS = {
+    "fr": {"le", "la", "les", "un", "une", "des", "du", "de", "d", "l", "et", "ou", "est", "sont",
+           "a", "en", "au", "aux", "ce", "cette", "qui", "que", "il", "elle", "ils", "se", "sa", "son", "ses"},
+    "en": {"the", "a", "an", "of", "and", "or", "is", "are", "to", "in", "it", "its", "that",
+           "this", "by", "for", "on", "with", "as", "be"},
+    "ar": {"في", "من", "على", "إلى", "الى", "عن", "و", "هو", "هي", "ان", "أن", "إن", "التي", "الذي", "ذلك", "هذا", "هذه"},
+}
+
+_ARABIC_DIACRITICS = re.compile("[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+_ARABIC_LETTERS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+_FOLDED_STOPWORDS = {**STOPWORDS, "ar": {word.translate(_ARABIC_LETTERS) for word in STOPWORDS["ar"]}}
+
+
+def normalize_answer(text: str, language: str = "en") -> str:
+    """Lower-case, accent- and punctuation-free words, without the language's stop words.
+
+    Arabic keeps its letters: short vowels and tatweel are removed and the
+    alef / ya / ta marbuta variants folded, since students write them freely.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    if language == "ar":
+        text = _ARABIC_DIACRITICS.sub("", text).translate(_ARABIC_LETTERS)
+    else:
+        text = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    stopwords = _FOLDED_STOPWORDS.get(language, set())
+    return " ".join(word for word in re.findall(r"\w+", text) if word not in stopwords)
+
+
+############################################
+# HASHED CHARACTER N-GRAM TF-IDF
+############################################
+
+NGRAM_SIZES = (3, 4, 5)
+HASH_BITS = 20
+
+# Cosine similarity from which an answer is accepted, and below which it is
+# rejected; answers in between are borderline and may go to the LLM.
+ACCEPT_SIMILARITY = 0.6
+REJECT_SIMILARITY = 0.3
+
+
+@lru_cache(maxsize=65536)
+def _word_ngrams(word: str) -> tuple:
+    # Class answers reuse the same words over and over: hash each word once
+    padded = f" {word} "
+    return tuple(zlib.crc32(padded[i:i + n].encode("utf-8")) & ((1 << HASH_BITS) - 1)
+                 for n in NGRAM_SIZES for i in range(len(padded) - n + 1))
+
+
+def hashed_ngrams(text: str) -> np.ndarray:
+    """Hashed character n-grams of every word (padded with spaces), with repeats."""
+    return np.fromiter(itertools.chain.from_iterable(_word_ngrams(word) for word in text.split()), dtype=np.uint32)
+
+
+class SparseRows(NamedTuple):
+    """CSR-like rows: row i owns features[indptr[i]:indptr[i + 1]], sorted, with their weights."""
+    indptr: np.ndarray
+    features: np.ndarray
+    weights: np.ndarray
+
+
+def term_frequencies(texts: Sequence[str]) -> SparseRows:
+    # Counting is done for all texts at once, on (row, feature) keys
+    hashed = [hashed_ngrams(text) for text in texts]
+    row_of = np.repeat(np.arange(len(texts), dtype=np.int64), [len(h) for h in hashed])
+    features = np.concatenate(hashed) if hashed else np.empty(0, dtype=np.uint32)
+    keys, counts = np.unique((row_of << HASH_BITS) | features.astype(np.int64), return_counts=True)
+    indptr = np.searchsorted(keys >> HASH_BITS, np.arange(len(texts) + 1))
+    # Sublinear tf: a repeated n-gram should not dominate the answer
+    return SparseRows(indptr.astype(np.int64), (keys & ((1 << HASH_BITS) - 1)).astype(np.uint32),
+                      (1 + np.log(counts)).astype(np.float32))
+
+
+def _l2_normalize(rows: SparseRows) -> SparseRows:
+    row_of = np.repeat(np.arange(len(rows.indptr) - 1), np.diff(rows.indptr))
+    norms = np.sqrt(np.bincount(row_of, weights=rows.weights ** 2, minlength=len(rows.indptr) - 1))
+    norms[norms == 0] = 1
+    return rows._replace(weights=(rows.weights / norms[row_of]).astype(np.float32))
+
+
+class OpenEndedReport(NamedTuple):
+    similarity: np.ndarray  # (students, questions) cosine similarity to the reference answer
+    correct: np.ndarray     # (students, questions) bool
+    borderline: np.ndarray  # (students, questions) bool, neither clearly right nor wrong
+    scores: np.ndarray      # (students,) number of correct answers
+
+
+class OpenEndedGrader:
+    """Scores free-text answers against the reference answers of a quiz, without any API call.
+
+    The references are vectorized once (IDF fitted on them); all submissions
+    are then compared in one batch: a sparse dot product done with a sorted
+    lookup of (question, feature) keys. IDF weights are kept for the
+    references' n-grams only, all others sharing the maximum weight.
+    """
+
+    def __init__(self, references: Sequence[str], language: Optional[str] = None,
+                 accept: float = ACCEPT_SIMILARITY, reject: float = REJECT_SIMILARITY):
+        self.language = language or detect_language(" ".join(references))
+        self.accept = accept
+        self.reject = reject
+        self.num_questions = len(references)
+
+        tf = term_frequencies([normalize_answer(ref, self.language) for ref in references])
+        self._idf_features, df = np.unique(tf.features, return_counts=True)
+        # Smoothed IDF; n-grams never seen in a reference get the maximum weight
+        self._idf_weights = (np.log((1 + len(references)) / (1 + df)) + 1).astype(np.float32)
+        self._max_idf = np.float32(np.log(1 + len(references)) + 1)
+        references_vec = _l2_normalize(tf._replace(weights=tf.weights * self._idf(tf.features)))
+
+        question_of = np.repeat(np.arange(self.num_questions, dtype=np.int64), np.diff(references_vec.indptr))
+        keys = (question_of << HASH_BITS) | references_vec.features.astype(np.int64)
+        order = np.argsort(keys)
+        self._keys = keys[order]
+        self._weights = references_vec.weights[order]
+
+    def _idf(self, features: np.ndarray) -> np.ndarray:
+        if not len(self._idf_features):
+            return np.full(len(features), self._max_idf, dtype=np.float32)
+        position = np.minimum(np.searchsorted(self._idf_features, features), len(self._idf_features) - 1)
+        return np.where(self._idf_features[position] == features, self._idf_weights[position], self._max_idf)
+
+    @property
+    def nbytes(self) -> int:
+        return (self._idf_features.nbytes + self._idf_weights.nbytes
+                + self._keys.nbytes + self._weights.nbytes)
+
+    def similarity(self, submissions: Sequence[Sequence[Optional[str]]]) -> np.ndarray:
+        """(students, questions) cosine similarities, computed for every answer at once."""
+        students = len(submissions)
+        # One text per (student, question) cell, missing answers as empty text
+        texts = [normalize_answer((submission[q] if q < len(submission) else None) or "", self.language)
+                 for submission in submissions for q in range(self.num_questions)]
+        tf = term_frequencies(texts)
+        vectors = _l2_normalize(tf._replace(weights=tf.weights * self._idf(tf.features)))
+        if not len(self._keys) or not len(vectors.features):
+            return np.zeros((students, self.num_questions))
+
+        cell_of = np.repeat(np.arange(len(texts), dtype=np.int64), np.diff(vectors.indptr))
+        keys = ((cell_of % self.num_questions) << HASH_BITS) | vectors.features.astype(np.int64)
+        position = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        matched = self._keys[position] == keys
+        products = np.where(matched, vectors.weights * self._weights[position], 0)
+        similarity = np.bincount(cell_of, weights=products, minlength=len(texts))
+        return similarity.reshape(students, self.num_questions)
+
+    def grade(self, submissions: Sequence[Sequence[Optional[str]]]) -> OpenEndedReport:
+        similarity = self.similarity(submissions)
+        correct = similarity >= self.accept
+        borderline = (similarity >= self.reject) & ~correct
+        return OpenEndedReport(similarity, correct, borderline, correct.sum(axis=1))
+
+
+############################################
+# OPTIONAL LLM ESCALATION OF BORDERLINE CASES
+############################################
+
+class AnswerJudgement(BaseModel):
+    correct: bool = Field(description="Whether the student answer is correct")
+
+
+JUDGE_INSTRUCTIONS = (
+    "You are grading a quiz. Decide whether the student's answer is correct, "
+    "given the expected answer. Accept answers that are worded differently or "
+    "written in another language if they mean the same thing.\n\n"
+    "Question: {question}\nExpected answer: {reference}\nStudent answer: {answer}"
+)
+
+
+@lru_cache(maxsize=1)
+def judge_prompt():
+    # Built on the first escalation: local grading never needs langchain
+    return prompts.ChatPromptTemplate.from_template(JUDGE_INSTRUCTIONS)
+
+
+def escalate_borderline(report: OpenEndedReport, questions: List[str], references: List[str],
+                        submissions: Sequence[Sequence[Optional[str]]], llm,
+                        max_concurrency: int = 8) -> OpenEndedReport:
+    """Ask the model about the borderline answers only, in one batch, and fold in its verdicts.
+
+    Answers the model could not judge (API error, bad output) stay borderline,
+    with their lexical verdict.
+    """
+    cells = list(zip(*np.nonzero(report.borderline)))
+    if not cells:
+        return report
+    chain = judge_prompt() | llm.with_structured_output(AnswerJudgement)
+    judgements = chain.batch(
+        [{"question": questions[q], "reference": references[q], "answer": submissions[s][q]} for s, q in cells],
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True,
+    )
+    correct = report.correct.copy()
+    borderline = report.borderline.copy()
+    for (s, q), judgement in zip(cells, judgements):
+        if isinstance(judgement, Exception):
+            logger.warning("LLM grading failed for question %d: %s", q + 1, judgement)
+            continue
+        correct[s, q] = judgement.correct
+        borderline[s, q] = False
+    return report._replace(correct=correct, borderline=borderline, scores=correct.sum(axis=1))
@@ -0,0 +1,194 @@
+import itertools
+import logging
+import math
+import re
+from typing import Callable, List, Optional
+
+from llm_clients import run_coroutine
+from token_counting import count_tokens, split_by_tokens
+
+logger = logging.getLogger(__name__)
+
+
+############################################
+# TOKEN-BUDGETED CHUNKING
+############################################
+
+# Context tokens sent per call; well under the model window, leaving room for
+# the prompt and the structured answer.
+DEFAULT_CHUNK_TOKENS = 6000
+
+# Simultaneous LLM calls per quiz
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Candidates requested per question, so duplicates can be dropped at merge time
+CANDIDATE_FACTOR = 1.5
+
+# Questions asked per call: a quiz of N questions goes out as ceil(N / 5)
+# concurrent calls, whatever the length of the context.
+DEFAULT_SHARD_SIZE = 5
+
+# Word-set Jaccard similarity from which two questions count as duplicates
+DUPLICATE_SIMILARITY = 0.8
+
+
+def _units(text: str, max_tokens: int):
+    # Paragraphs; over-budget paragraphs are split into sentences, and
+    # over-budget sentences cut on token boundaries.
+    for paragraph in re.split(r"\n\s*\n", text):
+        tokens = count_tokens(paragraph)
+        if tokens <= max_tokens:
+            yield paragraph, tokens, "\n\n"
+            continue
+        for sentence in re.split(r"(?<=[.!?؟])\s+", paragraph):
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                yield sentence, tokens, " "
+            else:
+                for piece in split_by_tokens(sentence, max_tokens):
+                    yield piece, count_tokens(piece), ""
+
+
+def split_context(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS) -> List[str]:
+    """Pack paragraphs (or sentences) into chunks of at most `max_tokens` tokens, in document order."""
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    chunks = []
+    current, current_tokens = "", 0
+    for unit, tokens, separator in _units(text, max_tokens):
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = "", 0
+        current = f"{current}{separator}{unit}" if current else unit
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def _rotate(text: str, turn: int, turns: int) -> str:
+    # The same slice, starting `turn / turns` of the way through its sentences
+    if not turn:
+        return text
+    sentences = re.split(r"(?<=[.!?؟])\s+", text)
+    start = turn * len(sentences) // turns
+    return " ".join(sentences[start:] + sentences[:start])
+
+
+def shard_contexts(context: str, shards: int, max_tokens: int = DEFAULT_CHUNK_TOKENS) -> List[str]:
+    """Context of each of `shards` calls, at most `max_tokens` tokens each.
+
+    With more slices of the document than calls, the calls take slices
+    spread evenly over it. With fewer, slices are reused, rotated so that
+    each call starts at a different sentence (identical inputs would get
+    identical questions back).
+    """
+    slices = split_context(context, max_tokens)
+    if len(slices) >= shards:
+        return [slices[i * len(slices) // shards] for i in range(shards)]
+    turns = math.ceil(shards / len(slices))
+    return [_rotate(slices[i % len(slices)], i // len(slices), turns) for i in range(shards)]
+
+
+############################################
+# MERGING CANDIDATE QUIZZES
+############################################
+
+def normalize_question(question: str) -> str:
+    return " ".join(re.findall(r"\w+", question.lower()))
+
+
+def is_near_duplicate(words: set, selected_words: List[set]) -> bool:
+    for other in selected_words:
+        union = len(words | other)
+        if union and len(words & other) / union >= DUPLICATE_SIMILARITY:
+            return True
+    return False
+
+
+def merge_quizzes(schema, quizzes, num_questions: int):
+    """Select `num_questions` distinct questions from several quizzes into one `schema` object.
+
+    Questions are taken round-robin across the quizzes so that every part of
+    the document is represented. Exact duplicates (after normalization) and
+    near duplicates (most words in common) are skipped.
+    """
+    has_alternatives = "alternatives" in schema.model_fields
+    merged = {"questions": [], "answers": []}
+    if has_alternatives:
+        merged["alternatives"] = []
+
+    seen = set()
+    selected_words = []
+    longest = max((len(quiz.questions) for quiz in quizzes), default=0)
+    for rank in range(longest):
+        for quiz in quizzes:
+            if len(merged["questions"]) == num_questions:
+                break
+            # Skip questions the model returned without their answer / alternatives
+            if rank >= min(len(quiz.questions), len(quiz.answers)):
+                continue
+            if has_alternatives and rank >= len(quiz.alternatives):
+                continue
+            key = normalize_question(quiz.questions[rank])
+            words = set(key.split())
+            if key in seen or is_near_duplicate(words, selected_words):
+                continue
+            seen.add(key)
+            selected_words.append(words)
+            merged["questions"].append(quiz.questions[rank])
+            merged["answers"].append(quiz.answers[rank])
+            if has_alternatives:
+                merged["alternatives"].append(quiz.alternatives[rank])
+
+    if "quiz_text" in schema.model_fields:
+        merged["quiz_text"] = next((quiz.quiz_text for quiz in quizzes if quiz.quiz_text), "")
+    return schema(**merged)
+
+
+############################################
+# MAP-REDUCE GENERATION
+############################################
+
+async def agenerate_chunked(chain, schema, context: str, num_questions: int,
+                            max_tokens: int = DEFAULT_CHUNK_TOKENS,
+                            max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                            shard_size: int = DEFAULT_SHARD_SIZE,
+                            on_progress: Optional[Callable[[int, int], None]] = None):
+    """Generate candidate questions in concurrent calls, then merge them.
+
+    The quiz is sharded into ceil(num_questions / shard_size) calls, each on
+    a token-budgeted slice of the context (see shard_contexts). Latency is
+    that of the slowest call (given enough concurrency), not the sum.
+    `on_progress(done, total)` is called as each call completes.
+    """
+    shards = math.ceil(num_questions / shard_size)
+    if shards == 1 and count_tokens(context) <= max_tokens:
+        return await chain.ainvoke({"num_questions": num_questions, "quiz_context": context})
+    chunks = shard_contexts(context, shards, max_tokens)
+
+    if on_progress is not None:
+        done = itertools.count(1)
+
+        def chunk_done(run):
+            on_progress(next(done), len(chunks))
+
+        chain = chain.with_listeners(on_end=chunk_done, on_error=chunk_done)
+    per_chunk = math.ceil(num_questions * CANDIDATE_FACTOR / len(chunks))
+    results = await chain.abatch(
+        [{"num_questions": per_chunk, "quiz_context": chunk} for chunk in chunks],
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True,
+    )
+    quizzes = [result for result in results if not isinstance(result, Exception)]
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("Quiz generation failed on one chunk: %s", result)
+    if not quizzes:
+        raise results[0]
+    return merge_quizzes(schema, quizzes, num_questions)
+
+
+def generate_chunked(chain, schema, context: str, num_questions: int, **options):
+    return run_coroutine(agenerate_chunked(chain, schema, context, num_questions, **options))
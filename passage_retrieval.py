@@ -0,0 +1,183 @@
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Callable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from parallel_generation import split_context
+from token_counting import count_tokens
+
+
+############################################
+# PASSAGES
+############################################
+
+# Passages are paragraphs packed up to this size, so a topic pulls in a few
+# focused paragraphs rather than whole pages.
+PASSAGE_TOKENS = 250
+
+# Context sent to the chain when retrieval is on
+DEFAULT_CONTEXT_TOKENS = 4000
+
+# Retrieval indexes kept in memory (one per document)
+MAX_INDEXES = 16
+
+
+class Passage(NamedTuple):
+    page: Optional[int]
+    text: str
+    tokens: int
+
+
+def passages_from_text(text: str, page: Optional[int] = None) -> List[Passage]:
+    return [Passage(page, chunk, count_tokens(chunk))
+            for chunk in split_context(text, PASSAGE_TOKENS) if chunk.strip()]
+
+
+def passages_from_pages(pages: Iterable[Tuple[int, str]]) -> List[Passage]:
+    """Passages that remember their page, from (page number, text) pairs such as iter_pages()."""
+    passages = []
+    for page, text in pages:
+        passages.extend(passages_from_text(text, page))
+    return passages
+
+
+# Bound on page numbers when the document's page count is unknown (pasted text)
+MAX_PAGE_NUMBER = 10_000
+
+
+def parse_page_ranges(spec: str, page_count: int = MAX_PAGE_NUMBER) -> Set[int]:
+    """'3-7, 12' -> {3, 4, 5, 6, 7, 12}; raises ValueError on anything else.
+
+    Pages outside 1..page_count are rejected before any range is expanded.
+    """
+    pages = set()
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        match = re.fullmatch(r"(\d+)\s*(?:-\s*(\d+))?", part)
+        if not match:
+            raise ValueError(f"Plage de pages invalide : {part!r}")
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        first, last = min(first, last), max(first, last)
+        if first < 1 or last > page_count:
+            raise ValueError(f"Plage de pages invalide : {part!r} (pages 1 à {page_count})")
+        pages.update(range(first, last + 1))
+    return pages
+
+
+############################################
+# BM25 INDEX
+############################################
+
+def terms(text: str) -> List[str]:
+    # Accents (and Arabic diacritics) are dropped so that "equation" finds "équation"
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return [word for word in re.findall(r"\w+", stripped) if len(word) > 1 or not word.isascii()]
+
+
+class BM25Index:
+    """Inverted index over passages: each term maps to numpy arrays of passage ids and term frequencies."""
+
+    def __init__(self, passages: List[Passage], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        postings = {}
+        lengths = np.zeros(len(passages), dtype=np.float32)
+        for i, passage in enumerate(passages):
+            counts = Counter(terms(passage.text))
+            lengths[i] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((i, tf))
+        self._postings = {
+            term: (np.array([i for i, _ in entries], dtype=np.int32),
+                   np.array([tf for _, tf in entries], dtype=np.float32))
+            for term, entries in postings.items()
+        }
+        self._length_norm = (1 - b + b * lengths / max(float(lengths.mean()) if len(lengths) else 0.0, 1.0))
+
+    def __len__(self):
+        return len(self.passages)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        n = len(self.passages)
+        for term in set(terms(query)):
+            if term not in self._postings:
+                continue
+            ids, tf = self._postings[term]
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + self.k1 * self._length_norm[ids])
+        return scores
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
+        """(passage id, score) of the best-matching passages, best first."""
+        scores = self.scores(query)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(int(i), float(scores[i])) for i in order if scores[i] > 0]
+
+
+def select_context(index: BM25Index, topic: str = "", pages: Optional[Set[int]] = None,
+                   max_tokens: int = DEFAULT_CONTEXT_TOKENS) -> str:
+    """The passages to send to the chain, in document order, within `max_tokens`.
+
+    With a topic, passages are taken by decreasing BM25 score (passages that
+    do not mention it are skipped); without one, from the start of the
+    selected pages. Passages without a page number ignore the page filter.
+    """
+    candidates = [i for i, passage in enumerate(index.passages)
+                  if not pages or passage.page is None or passage.page in pages]
+    if topic.strip():
+        scores = index.scores(topic)
+        candidates = sorted((i for i in candidates if scores[i] > 0), key=lambda i: -scores[i])
+
+    chosen, used = [], 0
+    for i in candidates:
+        tokens = index.passages[i].tokens
+        if used + tokens > max_tokens:
+            if topic.strip():
+                continue
+            break
+        chosen.append(i)
+        used += tokens
+    return "\n\n".join(index.passages[i].text for i in sorted(chosen))
+
+
+############################################
+# PER-DOCUMENT INDEX CACHE
+############################################
+
+class IndexCache:
+    """Small LRU of BM25 indexes, so each document is indexed once per process."""
+
+    def __init__(self, max_entries: int = MAX_INDEXES):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: str, build: Callable[[], List[Passage]]) -> BM25Index:
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key]
+        index = BM25Index(build())
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
+
+
+_default_cache = None
+
+
+def get_index_cache() -> IndexCache:
+    """Process-wide cache of retrieval indexes."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = IndexCache()
+    return _default_cache
@@ -0,0 +1,169 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import types
+from collections import deque
+from typing import Iterator, List, Optional, Tuple, Union
+
+from lazy_imports import lazy_module
+
+fitz = lazy_module("pymupdf")
+
+
+############################################
+# STREAMING PAGE ITERATOR
+############################################
+
+# bytes, a zero-copy memoryview (e.g. UploadedFile.getbuffer()), or a file path
+PdfSource = Union[bytes, memoryview, str, os.PathLike]
+
+
+def open_document(source: PdfSource):
+    if isinstance(source, (str, os.PathLike)):
+        # MuPDF reads pages from the file on demand, nothing is loaded up front
+        return fitz.open(source)
+    if isinstance(source, bytearray):
+        source = memoryview(source)
+    # bytes and memoryview are wrapped by MuPDF without being copied
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def page_count(source: PdfSource) -> int:
+    doc = open_document(source)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def iter_pages(source: PdfSource, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Yield `(page_number, text)` lazily, one page at a time (page numbers start at 1).
+
+    Only the current page's text is alive at any point, so consumers that
+    process pages incrementally keep memory bounded by a page, not a book.
+    """
+    doc = open_document(source)
+    try:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for i in range(start, stop):
+            yield i + 1, doc[i].get_text("text")
+    finally:
+        doc.close()
+
+
+############################################
+# PAGE-SHARDED PDF EXTRACTION
+############################################
+
+# Below this many pages, starting worker processes costs more than it saves.
+PARALLEL_MIN_PAGES = 300
+
+# Shards per worker: small enough ranges to balance uneven pages across workers.
+SHARDS_PER_WORKER = 4
+
+# One pool for the whole process (every session, every batch thread), so
+# concurrent extractions share the cores instead of each starting its own.
+# Workers are started by a fork server, never forked from the threaded
+# server process (forking a process with running threads can deadlock).
+# Shards do not share the PDF's byte buffer: in-memory documents are written
+# once to a temporary file, and each worker opens that path, MuPDF then only
+# reading the pages of its shard. Shared memory would save that write, but
+# the workers' MuPDF documents would pin the segment until they are closed.
+POOL_WORKERS = int(os.environ.get("MINDBRIDGE_EXTRACTION_WORKERS") or os.cpu_count() or 1)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool():
+    """Process-wide pool of POOL_WORKERS processes, all started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            # Streamlit runs the app script as __main__: started now, the
+            # workers would import and run it again. Start them all at once
+            # (multiprocessing.Pool does, unlike ProcessPoolExecutor), with a
+            # bare __main__.
+            main = sys.modules["__main__"]
+            sys.modules["__main__"] = types.ModuleType("__main__")
+            try:
+                _pool = context.Pool(POOL_WORKERS)
+            finally:
+                sys.modules["__main__"] = main
+    return _pool
+
+
+def _extract_range(task: Tuple[str, int, int]) -> List[str]:
+    # MuPDF reads the file on demand: each shard only loads its own pages
+    path, start, stop = task
+    doc = open_document(path)
+    try:
+        return [doc[i].get_text("text") for i in range(start, stop)]
+    finally:
+        doc.close()
+
+
+def page_ranges(page_count: int, shards: int) -> List[Tuple[int, int]]:
+    """Split `page_count` pages into at most `shards` contiguous (start, stop) ranges."""
+    shards = max(1, min(shards, page_count))
+    size, extra = divmod(page_count, shards)
+    ranges = []
+    start = 0
+    for i in range(shards):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def extract_pages_serial(data: PdfSource) -> List[str]:
+    return [text for _, text in iter_pages(data)]
+
+
+def extract_text_serial(data: PdfSource) -> str:
+    return "".join(extract_pages_serial(data))
+
+
+def extract_pages_parallel(data: PdfSource, workers: Optional[int] = None,
+                           min_pages: int = PARALLEL_MIN_PAGES) -> List[str]:
+    """Text of every page, with page ranges sharded across the process pool, in page order.
+
+    `workers` caps how many shards of this document are in flight at once;
+    the pool itself has POOL_WORKERS processes, so more gains nothing.
+    Falls back to the serial path for documents shorter than `min_pages`.
+    """
+    workers = workers or POOL_WORKERS
+    pages = page_count(data)
+    if pages < min_pages or workers < 2:
+        return extract_pages_serial(data)
+
+    # Workers get a path rather than the bytes: nothing large is pickled per shard
+    temp_path = None
+    if not isinstance(data, (str, os.PathLike)):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(data)
+            temp_path = f.name
+    path = os.fspath(data) if temp_path is None else temp_path
+    try:
+        pool = get_extraction_pool()
+        # At most `workers` shards of this document in flight; results in page order
+        pending, results = deque(), []
+        for start, stop in page_ranges(pages, workers * SHARDS_PER_WORKER):
+            if len(pending) == workers:
+                results.extend(pending.popleft().get())
+            pending.append(pool.apply_async(_extract_range, ((path, start, stop),)))
+        while pending:
+            results.extend(pending.popleft().get())
+        return results
+    finally:
+        if temp_path is not None:
+            os.remove(temp_path)
+
+
+def extract_text_parallel(data: PdfSource, workers: Optional[int] = None,
+                          min_pages: int = PARALLEL_MIN_PAGES) -> str:
+    return "".join(extract_pages_parallel(data, workers, min_pages))
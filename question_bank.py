@@ -0,0 +1,164 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import List, Optional
+
+
+############################################
+# QUESTION BANK (SQLite + FTS5)
+############################################
+# Every generated question is kept with the document it was generated from,
+# its language, quiz type and answer key. Once a document has enough stored
+# questions, a quiz can be assembled locally instead of calling the LLM.
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS questions ("
+    " id INTEGER PRIMARY KEY, document TEXT NOT NULL, language TEXT NOT NULL,"
+    " quiz_type TEXT NOT NULL, question TEXT NOT NULL, answer TEXT NOT NULL,"
+    " alternatives TEXT, created_at REAL NOT NULL,"
+    " UNIQUE (document, quiz_type, question))",
+    "CREATE INDEX IF NOT EXISTS questions_lookup ON questions (document, quiz_type, language)",
+    # External-content FTS table: the text lives once, in `questions`
+    "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5("
+    " question, answer, content='questions', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS questions_ai AFTER INSERT ON questions BEGIN"
+    " INSERT INTO questions_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_ad AFTER DELETE ON questions BEGIN"
+    " INSERT INTO questions_fts (questions_fts, rowid, question, answer)"
+    " VALUES ('delete', old.id, old.question, old.answer); END",
+]
+
+
+def _fts_query(text: str) -> str:
+    # Quote every word so user text cannot inject FTS5 operators; OR them so
+    # that bm25 ranks questions sharing the most words first.
+    words = [word.replace('"', '""') for word in text.split()]
+    return " OR ".join(f'"{word}"' for word in words if word.strip('"'))
+
+
+class QuestionBank:
+    """Stored questions, looked up by document hash, quiz type and language."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.served = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def add_quiz(self, document: str, language: str, quiz_type: str, quiz) -> int:
+        """Store the questions of `quiz`; returns how many were new for this document."""
+        alternatives = getattr(quiz, "alternatives", None) or []
+        now = time.time()
+        rows = [
+            (document, language, quiz_type, question, answer,
+             json.dumps(alternatives[i], ensure_ascii=False) if i < len(alternatives) else None, now)
+            for i, (question, answer) in enumerate(zip(quiz.questions, quiz.answers))
+        ]
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO questions"
+                " (document, language, quiz_type, question, answer, alternatives, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # rowcount leaves out the FTS rows written by the trigger
+            return cursor.rowcount
+
+    def count(self, document: str, quiz_type: str, language: Optional[str] = None) -> int:
+        sql = "SELECT COUNT(*) FROM questions WHERE document = ? AND quiz_type = ?"
+        params = [document, quiz_type]
+        if language:
+            sql += " AND language = ?"
+            params.append(language)
+        with closing(self._connect()) as conn:
+            return conn.execute(sql, params).fetchone()[0]
+
+    def _select(self, document: str, quiz_type: str, language: Optional[str],
+                limit: int, topic: Optional[str]) -> List[tuple]:
+        params = [document, quiz_type]
+        language_filter = ""
+        if language:
+            language_filter = " AND q.language = ?"
+            params.append(language)
+        match = _fts_query(topic) if topic else ""
+        with closing(self._connect()) as conn:
+            if match:
+                # Questions about the topic first (bm25), then the rest at random
+                return conn.execute(
+                    "SELECT q.question, q.answer, q.alternatives FROM questions q"
+                    " LEFT JOIN (SELECT rowid, bm25(questions_fts) AS rank FROM questions_fts"
+                    "            WHERE questions_fts MATCH ?) f ON f.rowid = q.id"
+                    " WHERE q.document = ? AND q.quiz_type = ?" + language_filter +
+                    " ORDER BY f.rank IS NULL, f.rank, random() LIMIT ?",
+                    [match] + params + [limit],
+                ).fetchall()
+            return conn.execute(
+                "SELECT q.question, q.answer, q.alternatives FROM questions q"
+                " WHERE q.document = ? AND q.quiz_type = ?" + language_filter +
+                " ORDER BY random() LIMIT ?",
+                params + [limit],
+            ).fetchall()
+
+    def serve(self, document: str, quiz_type: str, schema, num_questions: int,
+              language: Optional[str] = None, topic: Optional[str] = None):
+        """A `schema` quiz of `num_questions` stored questions, or None if too few are stored."""
+        rows = self._select(document, quiz_type, language, num_questions, topic)
+        if len(rows) < num_questions:
+            return None
+        with self._lock:
+            self.served += 1
+        fields = {
+            "questions": [row[0] for row in rows],
+            "answers": [row[1] for row in rows],
+        }
+        if "alternatives" in schema.model_fields:
+            fields["alternatives"] = [json.loads(row[2] or "[]") for row in rows]
+        if "quiz_text" in schema.model_fields:
+            fields["quiz_text"] = ""
+        return schema(**fields)
+
+    def search(self, text: str, limit: int = 20) -> List[dict]:
+        """Full-text search over every stored question and answer, best matches first."""
+        match = _fts_query(text)
+        if not match:
+            return []
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT q.document, q.language, q.quiz_type, q.question, q.answer"
+                " FROM questions_fts f JOIN questions q ON q.id = f.rowid"
+                " WHERE questions_fts MATCH ? ORDER BY bm25(questions_fts) LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        keys = ["document", "language", "quiz_type", "question", "answer"]
+        return [dict(zip(keys, row)) for row in rows]
+
+    def stats(self) -> dict:
+        with closing(self._connect()) as conn:
+            questions, documents = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT document) FROM questions"
+            ).fetchone()
+        return {"questions": questions, "documents": documents, "served": self.served}
+
+
+_default_bank = None
+
+
+def get_question_bank() -> QuestionBank:
+    """Process-wide bank, stored under MINDBRIDGE_CACHE_DIR (default ~/.cache/mindbridge)."""
+    global _default_bank
+    if _default_bank is None:
+        cache_dir = os.environ.get("MINDBRIDGE_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "mindbridge")
+        _default_bank = QuestionBank(os.path.join(cache_dir, "question_bank.sqlite3"))
+    return _default_bank
@@ -1,31 +1,71 @@
 #llx-bYcdRMr0i9Wca2MfWFigTh952x9EfgrkQcKOh9fMpeO0s9CW
-import streamlit as st
+import logging
 import os
-from typing import List
+import time
+
+import streamlit as st
+from typing import List, NamedTuple
 
 # For PDF extraction
-import pymupdf as fitz
+from pdf_extraction import extract_pages_parallel, iter_pages, page_count
+
+# Running headers, page numbers and hyphenation stripped before prompting
+from context_normalization import NormalizedText, normalize_page_texts, normalize_pages
 
-# For language detection
-from langdetect import detect
+# For language detection (sampled, seeded and cached)
+from language_detection import detect_language
 
-# LLM
-from langchain_openai import ChatOpenAI
+# LLM (pooled clients, one per API key and model)
+from llm_clients import get_chat_model, submit_coroutine
 
 # Pydantic models for structured output
 from pydantic import BaseModel, Field
 
 # Parsing
-from llama_parse import LlamaParse
+from llamaparse_client import parse_pdf_bytes
 
 # --------------------------------------------
 # 1) IMPORT TRANSLATED TEMPLATES
 # --------------------------------------------
 from quiz_templates_miltiple_lang import *
 
-# Helper function to detect language
-def detect_language(text: str) -> str:
-    return detect(text)
+# Cache of extracted text, shared by all sessions of the process
+from extraction_cache import document_key, get_extraction_cache
+
+# Chunked map-reduce generation for long contexts
+from parallel_generation import agenerate_chunked
+
+# Persistent cache of generated quizzes
+from llm_cache import get_quiz_cache, make_key
+
+# Streaming generation, question by question
+from streaming_quiz import QuizStream
+
+# Near-duplicate detection across generations
+from dedup_index import filter_quiz, get_question_index
+
+# Local bank of every generated question, searchable by document
+from question_bank import get_question_bank
+
+# BM25 retrieval of the passages relevant to a topic or page range
+from passage_retrieval import (DEFAULT_CONTEXT_TOKENS, get_index_cache, parse_page_ranges,
+                               passages_from_pages, passages_from_text, select_context)
+from token_counting import count_tokens
+
+# Answer keys normalized to option indices, graded with NumPy
+from grading import encode_submissions, grade
+from open_ended_grading import escalate_borderline
+
+# Compact per-session state, with shared texts and a per-process memory budget
+from quiz_state import QuizState, get_session_registry
+
+# Per-stage spans: sidebar panel, JSON logs and Prometheus metrics file
+from instrumentation import Trace, enable_json_logs, get_metrics
+
+# Generation runs on a shared pool of workers; the script polls for progress
+from generation_jobs import CANCELLED, DONE, QueueFull, get_job_queue
+
+logger = logging.getLogger(__name__)
 
 
 ############################################
@@ -54,97 +94,115 @@ class QuizOpenEnded(BaseModel):
 # HELPER FUNCTIONS
 ############################################
 
+def extract_document_from_pdf(pdf_file) -> NormalizedText:
+    # Accepts an uploaded file, or the raw bytes / a memoryview over them.
+    # Large documents are sharded across processes, short ones stay serial.
+    data = pdf_file.read() if hasattr(pdf_file, "read") else pdf_file
+    return normalize_pages(extract_pages_parallel(data))
+
+
 def extract_text_from_pdf(pdf_file) -> str:
-    doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
-    text = "".join(page.get_text("text") for page in doc)
-    return text
+    return extract_document_from_pdf(pdf_file).text
 
 
-def extract_text_llamaparse(pdf_file, api_key) -> str:
-    with open("temp_uploaded.pdf", "wb") as f:
-        f.write(pdf_file.read())
+def extract_text_llamaparse(pdf_file, api_key, on_progress=None) -> str:
+    # The bytes are uploaded directly: no shared temporary file on disk
+    data = pdf_file.read() if hasattr(pdf_file, "read") else bytes(pdf_file)
+    text = parse_pdf_bytes(data, api_key, getattr(pdf_file, "name", "document.pdf"), on_progress)
 
-    parser = LlamaParse(api_key=api_key, result_type="text", verbose=True)
-    docs = parser.load_data("temp_uploaded.pdf")
-    
-    if not docs:
+    if not text.strip():
         return "Aucun contenu extrait du PDF."
-    
-    return "\n".join([doc.text for doc in docs])
+
+    return text
 
 
 def create_quiz_chain(prompt_template, llm, pydantic_object_schema):
     return prompt_template | llm.with_structured_output(pydantic_object_schema)
 
 
-def display_questions(quiz_type):
-    if quiz_type == "multiple-choice":
-        for i, question in enumerate(st.session_state.questions):
+def display_questions(quiz: QuizState):
+    if quiz.quiz_type == "multiple-choice":
+        for i, question in enumerate(quiz.questions):
             st.markdown(f"**Question {i + 1}:** {question}")
-            options = st.session_state.alternatives[i]
-            selected_option = st.radio(
+            st.radio(
                 f"Select your answer for Q{i + 1}",
-                options,
+                quiz.options(i),
                 key=f"question_{i}"
             )
-            st.session_state.user_answers[i] = selected_option
 
-            # ✅ Affiche la bonne réponse
-            answer = st.session_state.answers[i]
-            if answer in options:
-                st.markdown(f"<span style='color: green'>Bonne réponse : **{answer}**</span>", unsafe_allow_html=True)
+            # ✅ Affiche la bonne réponse (clé normalisée une fois, à la génération)
+            correct_answer = quiz.correct_answer(i)
+            if correct_answer is not None:
+                st.markdown(f"<span style='color: green'>Bonne réponse : **{correct_answer}**</span>", unsafe_allow_html=True)
             else:
-                try:
-                    correct_index = ord(answer.strip().lower()) - 97
-                    if 0 <= correct_index < len(options):
-                        st.markdown(f"<span style='color: green'>Bonne réponse : **{options[correct_index]}**</span>", unsafe_allow_html=True)
-                except:
-                    st.warning(f"Impossible d'afficher la bonne réponse pour la question {i+1}.")
-
-    elif quiz_type == "true-false":
-        for i, question in enumerate(st.session_state.questions):
+                st.warning(f"Impossible d'afficher la bonne réponse pour la question {i+1}.")
+
+    elif quiz.quiz_type == "true-false":
+        for i, question in enumerate(quiz.questions):
             st.markdown(f"**Question {i + 1}:** {question}")
-            selected_option = st.radio(
+            st.radio(
                 f"Select your answer for Q{i + 1}",
-                ["True", "False"],
+                quiz.options(i),
                 key=f"question_{i}"
             )
-            st.session_state.user_answers[i] = selected_option
 
-            st.markdown(f"<span style='color: green'>Bonne réponse : **{st.session_state.answers[i]}**</span>", unsafe_allow_html=True)
+            correct_answer = quiz.correct_answer(i)
+            if correct_answer is not None:
+                st.markdown(f"<span style='color: green'>Bonne réponse : **{correct_answer}**</span>", unsafe_allow_html=True)
+            else:
+                st.warning(f"Impossible d'afficher la bonne réponse pour la question {i+1}.")
 
-    elif quiz_type == "open-ended":
-        for i, question in enumerate(st.session_state.questions):
+    elif quiz.quiz_type == "open-ended":
+        for i, question in enumerate(quiz.questions):
             st.markdown(f"**Question {i + 1}:** {question}")
-            user_response = st.text_input(
+            st.text_input(
                 f"Your answer for Q{i + 1}",
                 key=f"question_{i}"
             )
-            st.session_state.user_answers[i] = user_response
 
-            st.markdown(f"<span style='color: green'>Réponse attendue : **{st.session_state.answers[i]}**</span>", unsafe_allow_html=True)
+            st.markdown(f"<span style='color: green'>Réponse attendue : **{quiz.correct_answer(i)}**</span>", unsafe_allow_html=True)
 
 
-def process_submission(quiz_type):
-    if 'user_answers' in st.session_state:
-        if any(ans is None or ans.strip() == "" for ans in st.session_state.user_answers):
-            st.warning("Please answer all the questions before submitting.")
-            return
+def store_quiz(quiz, quiz_type):
+    # The quiz keeps the type it was generated with, whatever the selectbox says later
+    st.session_state.quiz.set_quiz(quiz, quiz_type)
 
-        if quiz_type in ["multiple-choice", "true-false"]:
-            user_answers = [
-                st.session_state.get(f"question_{i}") for i in range(len(st.session_state.questions))
-            ]
-            st.session_state.user_answers_news = user_answers
-            score = sum(
-                user_answer == correct_answer
-                for user_answer, correct_answer
-                in zip(st.session_state.user_answers_news, st.session_state.answers)
-            )
-            st.write(f"Your score is **{score}/{len(st.session_state.questions)}**")
-        else:
-            st.write("Open-ended questions have been submitted.")
-            st.write("Answers:", st.session_state.answers)
+
+class GenerationResult(NamedTuple):
+    quiz: BaseModel
+    flagged: List[int]  # positions of the questions close to earlier ones
+    removed: int        # questions dropped as too close to earlier ones
+    notes: List[str]
+    trace: Trace
+
+
+def process_submission(quiz: QuizState, llm=None):
+    # `llm`, if given, settles the open-ended answers the local grader is unsure about
+    submission = [st.session_state.get(f"question_{i}") for i in range(len(quiz))]
+    if any(answer is None or answer.strip() == "" for answer in submission):
+        st.warning("Please answer all the questions before submitting.")
+        return
+
+    if quiz.quiz_type in ["multiple-choice", "true-false"]:
+        responses = encode_submissions([submission], quiz.alternatives or None)
+        score = int(grade(quiz.answer_key, responses).scores[0])
+        st.write(f"Your score is **{score}/{len(quiz)}**")
+    else:
+        report = quiz.grader().grade([submission])
+        if llm is not None and report.borderline.any():
+            try:
+                report = escalate_borderline(report, list(quiz.questions), list(quiz.references),
+                                             [submission], llm)
+            except Exception as err:
+                # The lexical score stands on its own
+                logger.warning("LLM grading unavailable: %s", err)
+                st.warning("Correction par le modèle indisponible : les réponses incertaines restent à vérifier.")
+        for i, similarity in enumerate(report.similarity[0]):
+            verdict = ("✅" if report.correct[0, i] else
+                       "❔ à vérifier" if report.borderline[0, i] else "❌")
+            st.write(f"Q{i + 1} : {verdict} (similarité {similarity:.2f})")
+        st.write(f"Your score is **{int(report.scores[0])}/{len(quiz)}**")
+        st.write("Answers:", list(quiz.references))
 
 
 ############################################
@@ -153,55 +211,158 @@ def process_submission(quiz_type):
 
 def choose_prompt_template(quiz_type: str, text_context: str):
     lang = detect_language(text_context)
+    return get_template(quiz_type, lang)
 
-    if quiz_type == "multiple-choice":
-        if lang == "fr":
-            return create_multiple_choice_template_fr()
-        elif lang == "ar":
-            return create_multiple_choice_template_ar()
-        else:
-            return create_multiple_choice_template_en()
 
-    elif quiz_type == "true-false":
-        if lang == "fr":
-            return create_true_false_template_fr()
-        elif lang == "ar":
-            return create_true_false_template_ar()
-        else:
-            return create_true_false_template_en()
+def choose_language_and_template(quiz_type: str, text_context: str, trace: Trace):
+    """(language, template) for a quiz on `text_context`, with a span per step.
 
-    else:
-        if lang == "fr":
-            return create_open_ended_template_fr()
-        elif lang == "ar":
-            return create_open_ended_template_ar()
-        else:
-            return create_open_ended_template_en()
+    The app and the batch CLI both go through here, so they always pick the
+    same template for the same text.
+    """
+    with trace.span("detection") as span:
+        language = span["language"] = detect_language(text_context)
+    with trace.span("template"):
+        return language, get_template(quiz_type, language)
 
 
 ############################################
 # MAIN STREAMLIT APP
 ############################################
 
+def record_trace(trace: Trace):
+    # Reruns that only redraw the form would hide the generation timings:
+    # keep the latest span of every stage for the session.
+    if 'stage_spans' not in st.session_state:
+        st.session_state.stage_spans = {}
+    for record in trace.spans:
+        st.session_state.stage_spans[record["stage"]] = record
+
+
+def write_metrics(force: bool = False):
+    # Reruns (and fragment polls) are frequent: the file is rewritten every
+    # METRICS_WRITE_INTERVAL seconds at most, and whenever a generation ends.
+    try:
+        if force:
+            get_metrics().write()
+        else:
+            get_metrics().write_if_due()
+    except OSError as err:
+        logger.warning("Could not write the metrics file: %s", err)
+
+
+def show_trace_panel(trace: Trace):
+    record_trace(trace)
+    write_metrics()
+    with st.sidebar.expander("Performance par étape"):
+        if not st.session_state.stage_spans:
+            st.caption("Aucune mesure pour l'instant.")
+        for stage, record in st.session_state.stage_spans.items():
+            details = [f"{record['duration_s'] * 1000:.0f} ms"]
+            if record.get("tokens_in") or record.get("tokens_out"):
+                details.append(f"{record.get('tokens_in', 0)} → {record.get('tokens_out', 0)} tokens")
+            if "cache_hit" in record:
+                details.append("cache ✅" if record["cache_hit"] else "cache ❌")
+            if "error" in record:
+                details.append(f"erreur {record['error']}")
+            st.markdown(f"**{stage}** : " + ", ".join(details))
+
+
+@st.fragment
+def quiz_fragment(openai_api_key, escalate_open_ended):
+    # Submitting the form reruns this function only: the upload, extraction
+    # and generation code above is not executed again for an answer.
+    trace = Trace("quiz_fragment")
+    quiz = st.session_state.quiz
+    quiz.touch()
+    try:
+        with trace.span("quiz_fragment", questions=len(quiz)):
+            with st.form("quiz_form"):
+                with trace.span("rendering", questions=len(quiz)):
+                    display_questions(quiz)
+                submitted = st.form_submit_button("Submit Answers")
+                if submitted:
+                    grading_llm = (get_chat_model(openai_api_key, "gpt-4o", 0.0)
+                                   if escalate_open_ended and openai_api_key else None)
+                    with trace.span("grading", quiz_type=quiz.quiz_type):
+                        process_submission(quiz, grading_llm)
+    finally:
+        # The sidebar panel belongs to the full run; it picks these spans up next time
+        record_trace(trace)
+
+
+# How often a pending generation is polled, in seconds
+POLL_SECONDS = 0.5
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def generation_progress():
+    # Only this fragment reruns while the job runs; the whole app reruns once it is over
+    pending = st.session_state.get("generation")
+    if pending is None:
+        return
+    job = get_job_queue().get(pending["job_id"])
+    if job is not None and not job.done:
+        waiting = "En attente d'un worker…" if job.status == "queued" else "Génération du quiz…"
+        st.progress(job.progress, text=job.message or waiting)
+        for i, item in enumerate(list(job.partial)):
+            st.markdown(f"**Question {i + 1}:** {item.question}")
+        if st.button("Annuler la génération"):
+            get_job_queue().cancel(job.id)
+            del st.session_state.generation
+            st.rerun()
+        return
+
+    del st.session_state.generation
+    write_metrics(force=True)
+    notices = st.session_state.generation_notices = []
+    if job is None or job.status == CANCELLED:
+        notices.append(("warning", "La génération a été annulée."))
+    elif job.status != DONE:
+        notices.append(("error", f"La génération du quiz a échoué : {job.error}"))
+    else:
+        result = job.result
+        store_quiz(result.quiz, pending["quiz_type"])
+        record_trace(result.trace)
+        notices.append(("success", "Quiz generated below! Scroll down to answer."))
+        notices += [("caption", note) for note in result.notes]
+        if result.removed:
+            asked = len(result.quiz.questions) + result.removed
+            notices.append(("info", f"{result.removed} question(s) trop proches de questions déjà générées "
+                                    f"ont été retirées : le quiz en compte {len(result.quiz.questions)} sur {asked}."))
+        if result.flagged:
+            numbers = ", ".join(str(i + 1) for i in result.flagged)
+            notices.append(("info", f"Questions {numbers} : proches de questions déjà générées."))
+    st.rerun()
+
+
 def main():
+    if os.environ.get("MINDBRIDGE_LOG_JSON"):
+        # Spans as JSON lines on the server's stderr, for a log collector
+        enable_json_logs()
+    trace = Trace("quiz_app")
+    try:
+        with trace.span("script"):
+            run_app(trace)
+    finally:
+        # Idle sessions give their texts and graders back if the process is over budget
+        get_session_registry().enforce()
+        show_trace_panel(trace)
+
+
+def run_app(trace: Trace):
     st.title("MindBridge Quiz Generator")
     st.write("Upload a PDF, extract its text, then generate a quiz based on that text!")
 
-    if 'questions' not in st.session_state:
-        st.session_state.questions = []
-    if 'answers' not in st.session_state:
-        st.session_state.answers = []
-    if 'user_answers' not in st.session_state:
-        st.session_state.user_answers = []
-    if 'alternatives' not in st.session_state:
-        st.session_state.alternatives = []
+    if 'quiz' not in st.session_state:
+        st.session_state.quiz = QuizState()
+    quiz_state = st.session_state.quiz
+    quiz_state.touch()
 
     openai_api_key = st.sidebar.text_input("Enter your OpenAI API key", type="password")
     llamaparse_api_key = st.sidebar.text_input("Enter your LlamaParse API key", type="password")
 
-    if openai_api_key:
-        os.environ["OPENAI_API_KEY"] = openai_api_key
-    else:
+    if not openai_api_key:
         st.warning("Please enter your OpenAI API key to continue.")
 
     uploaded_file = st.file_uploader("Upload a PDF file", type=["pdf"])
@@ -209,24 +370,114 @@ def main():
     parse_method = st.radio("Méthode d'extraction du texte PDF", ["Standard (PyMuPDF)", "LlamaParse (qualité supérieure)"])
 
     pdf_text = ""
-    if uploaded_file is not None:
+    pinned_text = (quiz_state.document_text(uploaded_file.file_id, parse_method)
+                   if uploaded_file is not None else None)
+    if pinned_text is not None:
+        # Same upload as the previous run: neither hashed nor looked up again
+        pdf_text = pinned_text
+        st.success("Texte extrait du PDF ! Vous pouvez le voir ou le modifier ci-dessous :")
+    elif uploaded_file is not None:
+        # Every widget interaction reruns the script: extract each document
+        # only once, keyed by the uploaded bytes and the parse method.
+        # getbuffer() is a zero-copy view over the upload
+        with trace.span("upload_read") as span:
+            pdf_bytes = uploaded_file.getbuffer()
+            span["bytes"] = len(pdf_bytes)
+        extraction_cache = get_extraction_cache()
+        hits_before = extraction_cache.hits
         if parse_method == "LlamaParse (qualité supérieure)":
             if not llamaparse_api_key:
                 st.error("Veuillez saisir votre clé API LlamaParse.")
                 return
-            pdf_text = extract_text_llamaparse(uploaded_file, llamaparse_api_key)
+            progress_bar = st.progress(0.0, text="LlamaParse")
+
+            def report_progress(message, fraction):
+                progress_bar.progress(fraction, text=f"LlamaParse : {message}")
+
+            extraction_key = document_key(pdf_bytes, "llamaparse")
+            with trace.span("extraction", method="llamaparse") as span:
+                pdf_text = extraction_cache.get_or_extract(
+                    extraction_key,
+                    lambda: extract_text_llamaparse(pdf_bytes, llamaparse_api_key, report_progress)
+                )
+                span["cache_hit"] = extraction_cache.hits > hits_before
+            progress_bar.empty()
         else:
-            pdf_text = extract_text_from_pdf(uploaded_file)
-
+            # The cached text is the normalized one, under its own key
+            extraction_key = document_key(pdf_bytes, "pymupdf-normalized")
+            with trace.span("extraction", method="pymupdf") as span:
+                def extract():
+                    document = extract_document_from_pdf(pdf_bytes)
+                    span["tokens_before"] = document.tokens_before
+                    span["tokens_saved"] = document.tokens_saved
+                    return document.text
+
+                pdf_text = extraction_cache.get_or_extract(extraction_key, extract)
+                span["cache_hit"] = extraction_cache.hits > hits_before
+            if span.get("tokens_saved"):
+                st.caption(f"Normalisation : {span['tokens_saved']} tokens retirés sur {span['tokens_before']} "
+                           "(en-têtes, numéros de page, césures, espaces).")
+
+        # The session references the text in the shared store instead of holding a copy
+        quiz_state.set_document(uploaded_file.file_id, parse_method, extraction_key, pdf_text,
+                                document_key(pdf_bytes, "pdf"), document_key(pdf_bytes, "passages"))
+        pdf_text = quiz_state.document_text(uploaded_file.file_id, parse_method)
         st.success("Texte extrait du PDF ! Vous pouvez le voir ou le modifier ci-dessous :")
     else:
         st.info("Please upload a PDF file.")
 
     context = st.text_area("Context (extracted from PDF)", pdf_text, height=200)
 
-    num_questions = st.number_input("Number of questions", min_value=1, max_value=10, value=3)
+    with st.expander("Cibler une partie du document"):
+        retrieval_mode = st.checkbox("N'envoyer au modèle que les passages pertinents", value=False)
+        topic = st.text_input("Sujet ou chapitre (mots-clés)", "")
+        page_spec = st.text_input("Pages (ex. 12-30, 45)", "")
+        context_budget = st.number_input("Budget de contexte (tokens)", min_value=500, max_value=30000,
+                                         value=DEFAULT_CONTEXT_TOKENS, step=500)
+
+    num_questions = st.number_input("Number of questions", min_value=1, max_value=60, value=3)
     quiz_type = st.selectbox("Select quiz type", ["multiple-choice", "true-false", "open-ended"])
     temperature = st.slider("Créativité du quiz (température)", min_value=0.0, max_value=4.0, value=0.0, step=0.2)
+    chunked_mode = st.checkbox(
+        "Documents longs / nombreuses questions : générer en parallèle par morceaux",
+        value=True
+    )
+    streaming_mode = st.checkbox("Afficher les questions au fur et à mesure (streaming)", value=False)
+    cache_creative = st.sidebar.checkbox("Réutiliser les quiz en cache même si température > 0", value=False)
+    duplicate_policy = st.sidebar.selectbox("Questions proches de questions déjà générées", ["Signaler", "Retirer"])
+    escalate_open_ended = st.sidebar.checkbox(
+        "Réponses ouvertes : faire trancher les cas limites par le modèle", value=False
+    )
+    serve_from_bank = st.sidebar.checkbox(
+        "Servir depuis la banque de questions quand elle en contient assez", value=False
+    )
+
+    quiz_cache = get_quiz_cache()
+    cache_stats = quiz_cache.stats()
+    st.sidebar.caption(
+        f"Cache des quiz : {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+        f"{cache_stats['bypassed']} ignorés, {cache_stats['entries']} entrées"
+    )
+    question_bank = get_question_bank()
+    bank_stats = question_bank.stats()
+    st.sidebar.caption(
+        f"Banque de questions : {bank_stats['questions']} questions, "
+        f"{bank_stats['documents']} documents"
+    )
+    session_stats = get_session_registry().stats()
+    st.sidebar.caption(
+        f"Sessions : {session_stats['sessions']}, {session_stats['texts']} documents en mémoire, "
+        f"{session_stats['memory_mb']:.0f}/{session_stats['budget_mb']:.0f} Mo"
+    )
+
+    # A pending generation is cancelled as soon as its inputs change
+    signature = hash((context, retrieval_mode, topic, page_spec, context_budget, num_questions, quiz_type,
+                      temperature, chunked_mode, streaming_mode, cache_creative, duplicate_policy))
+    pending = st.session_state.get("generation")
+    if pending is not None and pending["signature"] != signature:
+        get_job_queue().cancel(pending["job_id"])
+        del st.session_state.generation
+        st.info("Paramètres modifiés : la génération en cours a été annulée.")
 
     if st.button("Generate Quiz"):
         if not openai_api_key:
@@ -236,40 +487,156 @@ def main():
             st.error("Please provide a non-empty context (or upload a valid PDF).")
             return
 
-        prompt_template = choose_prompt_template(quiz_type, context)
-        llm = ChatOpenAI(model="gpt-4o", temperature=temperature)
+        schema = (QuizMultipleChoice if quiz_type == "multiple-choice" else
+                  QuizTrueFalse if quiz_type == "true-false" else
+                  QuizOpenEnded)
 
-        chain = create_quiz_chain(prompt_template, llm,
-                                  QuizMultipleChoice if quiz_type == "multiple-choice" else
-                                  QuizTrueFalse if quiz_type == "true-false" else
-                                  QuizOpenEnded)
-
-        quiz_response = chain.invoke({
-            "num_questions": num_questions,
-            "quiz_context": context
-        })
-
-        st.session_state.questions = quiz_response.questions
-        st.session_state.answers = quiz_response.answers
-        st.session_state.alternatives = quiz_response.alternatives if quiz_type == "multiple-choice" else []
-        st.session_state.user_answers = [None] * len(st.session_state.questions)
-
-        st.success("Quiz generated below! Scroll down to answer.")
-
-    if st.session_state.questions:
-        with st.form("quiz_form"):
-            display_questions(quiz_type)
-            submitted = st.form_submit_button("Submit Answers")
-            if submitted:
-                process_submission(quiz_type)
-
-
-    if st.session_state.questions:
-        with st.form("quiz_form"):
-            display_questions(quiz_type)
-            submitted = st.form_submit_button("Submit Answers")
-            if submitted:
-                process_submission(quiz_type)
+        # The bank is keyed by the uploaded file, or by the text if it was edited
+        if uploaded_file is not None and context == pdf_text:
+            document_id = quiz_state.document_id
+        else:
+            document_id = document_key(context.encode("utf-8"), "text")
+        language, prompt_template = choose_language_and_template(quiz_type, context, trace)
+
+        prompt_context = context
+        if retrieval_mode:
+            # Page numbers are only known for the unedited PyMuPDF text, which
+            # is the concatenation of the normalized pages in order.
+            paged = document_id.startswith("pdf-") and parse_method == "Standard (PyMuPDF)"
+            try:
+                if paged:
+                    pages = parse_page_ranges(page_spec, page_count(uploaded_file.getbuffer()))
+                else:
+                    pages = parse_page_ranges(page_spec)
+            except ValueError as err:
+                st.error(str(err))
+                return
+            if paged:
+                index = get_index_cache().get_or_build(
+                    quiz_state.passages_key,
+                    lambda: passages_from_pages(enumerate(normalize_page_texts(
+                        text for _, text in iter_pages(uploaded_file.getbuffer())), 1))
+                )
+            else:
+                if pages:
+                    st.warning("Numéros de page indisponibles pour ce texte : la plage de pages est ignorée.")
+                index = get_index_cache().get_or_build(
+                    document_key(context.encode("utf-8"), "passages"),
+                    lambda: passages_from_text(context)
+                )
+            with trace.span("retrieval") as span:
+                prompt_context = select_context(index, topic, pages, context_budget)
+                span["tokens_in"] = count_tokens(prompt_context)
+            if not prompt_context.strip():
+                st.error("Aucun passage ne correspond à ce sujet ou à ces pages.")
+                return
+            st.caption(f"Contexte envoyé : {count_tokens(prompt_context)} tokens "
+                       f"sur {count_tokens(context)} pour le document complet.")
+
+        banked = None
+        if serve_from_bank:
+            start = time.perf_counter()
+            with trace.span("bank") as span:
+                banked = question_bank.serve(document_id, quiz_type, schema, num_questions, language, topic)
+                span["cache_hit"] = banked is not None
+        if banked is not None:
+            store_quiz(banked, quiz_type)
+            st.success(
+                f"Quiz composé depuis la banque de questions en "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms, sans appel au modèle."
+            )
+        else:
+            llm = get_chat_model(openai_api_key, "gpt-4o", temperature)
+            chain = create_quiz_chain(prompt_template, llm, schema)
+
+            def run_generation(job):
+                # Runs on a worker of the job queue: no Streamlit calls in here
+                job_trace = Trace("generation", trace_id=trace.trace_id)
+                notes = []
+
+                def generate():
+                    if streaming_mode:
+                        stream = QuizStream(prompt_template, llm, schema, {
+                            "num_questions": num_questions,
+                            "quiz_context": prompt_context
+                        })
+                        for item in stream:
+                            # Leaving the loop closes the stream, and the request with it
+                            job.check_cancelled()
+                            job.partial.append(item)
+                            job.report(len(job.partial) / num_questions,
+                                       f"{len(job.partial)}/{num_questions} questions reçues")
+                        notes.append(
+                            f"Première question en {stream.time_to_first_question or 0:.1f} s, "
+                            f"quiz complet en {stream.total_time:.1f} s"
+                        )
+                        return stream.quiz
+                    if chunked_mode:
+                        # Short contexts asking for few questions still go out as a single call
+                        return job.wait(submit_coroutine(agenerate_chunked(
+                            chain, schema, prompt_context, num_questions,
+                            on_progress=lambda done, total: job.report(done / total, f"{done}/{total} parties du document")
+                        )))
+                    return chain.invoke({
+                        "num_questions": num_questions,
+                        "quiz_context": prompt_context
+                    })
+
+                def generate_counted():
+                    llm_span["tokens_in"] = count_tokens(prompt_template.format(
+                        num_questions=num_questions, quiz_context=prompt_context))
+                    job.report(0.0, "Génération du quiz…")
+                    quiz = generate()
+                    if not quiz.questions:
+                        # Raising keeps an empty quiz out of the cache
+                        raise ValueError("le modèle n'a renvoyé aucune question")
+                    llm_span["tokens_out"] = count_tokens(quiz.model_dump_json())
+                    return quiz
+
+                # generate_counted() adds the token counts to llm_span, unless the cache answers
+                with job_trace.span("llm", model="gpt-4o") as llm_span:
+                    hits_before = quiz_cache.hits
+                    model_quiz = quiz_cache.get_or_generate(cache_key, schema, generate_counted, temperature, cache_creative)
+                    llm_span["cache_hit"] = quiz_cache.hits > hits_before
+                job.check_cancelled()
+                # The cache holds the model's quiz, duplicates are filtered per request. Questions
+                # are compared within the document and quiz type; a quiz served again from the
+                # cache is its own source, so it does not match its first serving.
+                cached = temperature == 0 or cache_creative
+                # "Retirer" drops every near duplicate, keeping at least one question;
+                # the notice then reports how many are missing.
+                filtered = filter_quiz(get_question_index(), model_quiz,
+                                       reject=duplicate_policy == "Retirer",
+                                       scope=(document_id, quiz_type), source=cache_key if cached else job.id)
+                question_bank.add_quiz(document_id, language, quiz_type, filtered.quiz)
+                return GenerationResult(filtered.quiz, filtered.flagged, filtered.removed, notes, job_trace)
+
+            cache_key = make_key(prompt_template, quiz_context=prompt_context, quiz_type=quiz_type,
+                                 num_questions=num_questions, model="gpt-4o",
+                                 temperature=temperature, chunked=chunked_mode and not streaming_mode)
+            # Sessions asking for the same quiz share one job, unless the cache would
+            # be bypassed anyway (creative temperature): then each wants its own quiz.
+            job_key = f"{cache_key}:{document_id}:{duplicate_policy}"
+            if temperature > 0 and not cache_creative:
+                job_key += f":{trace.trace_id}"
+            try:
+                job = get_job_queue().submit(job_key, run_generation)
+            except QueueFull:
+                st.error("Trop de quiz en cours de génération sur le serveur, réessayez dans un instant.")
+                return
+            previous = st.session_state.get("generation")
+            st.session_state.generation = {"job_id": job.id, "quiz_type": quiz_type,
+                                           "duplicate_policy": duplicate_policy, "signature": signature}
+            if previous is not None:
+                get_job_queue().cancel(previous["job_id"])
+
+    if st.session_state.get("generation") is not None:
+        generation_progress()
+    for kind, message in st.session_state.pop("generation_notices", []):
+        getattr(st, kind)(message)
+
+    if len(quiz_state):
+        quiz_fragment(openai_api_key, escalate_open_ended)
 
 if __name__ == "__main__":
     main()
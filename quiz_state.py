@@ -0,0 +1,264 @@
+import os
+import sys
+import threading
+import time
+import weakref
+from typing import Optional, Sequence
+
+import numpy as np
+
+from extraction_cache import get_extraction_cache
+from grading import TRUE_FALSE_OPTIONS, UNANSWERED, normalize_answer_key
+from open_ended_grading import OpenEndedGrader
+
+
+############################################
+# SHARED EXTRACTED TEXTS
+############################################
+# Sessions that work on the same document reference one copy of its text,
+# under the extraction key (hash of the PDF bytes plus the parse method).
+# A text is dropped as soon as no session references it any more.
+
+class TextStore:
+    def __init__(self):
+        self._texts = {}
+        self._refs = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, text: str) -> str:
+        """Store `text` under `key` (or reuse the stored copy) and take a reference to it."""
+        with self._lock:
+            self._texts.setdefault(key, text)
+            self._refs[key] = self._refs.get(key, 0) + 1
+        return key
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        with self._lock:
+            return self._texts.get(key)
+
+    def release(self, key: Optional[str]):
+        with self._lock:
+            if key not in self._refs:
+                return
+            self._refs[key] -= 1
+            if not self._refs[key]:
+                del self._refs[key], self._texts[key]
+
+    def texts(self) -> list:
+        with self._lock:
+            return list(self._texts.values())
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_text_store() -> TextStore:
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = TextStore()
+    return _default_store
+
+
+############################################
+# PER-SESSION QUIZ STATE
+############################################
+
+def _intern(text) -> str:
+    return sys.intern(str(text))
+
+
+class QuizState:
+    """Everything a session keeps about its document and its quiz, in one slotted object.
+
+    Strings are interned, so sessions served the same quiz (cache, bank)
+    share them; the answer key is a small int array of option indices; the
+    extracted text lives in the process-wide TextStore and is only
+    referenced here. The grader and the text are "payloads": they can be
+    released when the process runs short of memory, and are rebuilt on
+    demand (the text from the extraction cache or the upload).
+    """
+
+    __slots__ = ("file_id", "parse_method", "text_key", "document_id", "passages_key",
+                 "quiz_type", "questions", "alternatives", "answer_key", "references",
+                 "_grader", "last_used", "_lock", "__weakref__")
+
+    def __init__(self):
+        self.file_id = self.parse_method = self.text_key = None
+        self.document_id = self.passages_key = None
+        self.quiz_type = None
+        self.questions = ()
+        self.alternatives = ()
+        self.answer_key = np.empty(0, dtype=np.int8)
+        self.references = ()
+        self._grader = None
+        self.last_used = time.monotonic()
+        # The budget releases payloads from other sessions' script threads
+        self._lock = threading.Lock()
+        get_session_registry().track(self)
+
+    def __del__(self):
+        # Sessions that end give their reference to the shared text back
+        store = _default_store
+        if store is not None:
+            store.release(self.text_key)
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    # -- document --------------------------------------------------------
+
+    def set_document(self, file_id: str, parse_method: str, text_key: str, text: str,
+                     document_id: str, passages_key: str):
+        store = get_text_store()
+        with self._lock:
+            previous = self.text_key
+            self.text_key = store.acquire(text_key, text)
+            store.release(previous)
+        self.file_id, self.parse_method = file_id, parse_method
+        self.document_id, self.passages_key = document_id, passages_key
+
+    def document_text(self, file_id: str, parse_method: str) -> Optional[str]:
+        """Pinned text of this upload, or None if it is another upload or the text was released."""
+        if self.file_id != file_id or self.parse_method != parse_method:
+            return None
+        with self._lock:
+            return get_text_store().get(self.text_key)
+
+    # -- quiz ------------------------------------------------------------
+
+    def set_quiz(self, quiz, quiz_type: str):
+        self.quiz_type = quiz_type
+        self.questions = tuple(_intern(question) for question in quiz.questions)
+        if quiz_type == "multiple-choice":
+            self.alternatives = tuple(tuple(_intern(option) for option in options) for options in quiz.alternatives)
+        else:
+            self.alternatives = ()
+        if quiz_type == "open-ended":
+            self.answer_key = np.empty(0, dtype=np.int8)
+            self.references = tuple(_intern(answer) for answer in quiz.answers)
+        else:
+            self.answer_key = normalize_answer_key(quiz.answers, self.alternatives or None).astype(np.int8)
+            self.references = ()
+        self._grader = None
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def options(self, i: int) -> Sequence[str]:
+        return self.alternatives[i] if self.quiz_type == "multiple-choice" else TRUE_FALSE_OPTIONS
+
+    def correct_answer(self, i: int) -> Optional[str]:
+        """Text of the expected answer to question i, or None if the key matched no option."""
+        if self.quiz_type == "open-ended":
+            return self.references[i]
+        index = int(self.answer_key[i])
+        return None if index == UNANSWERED else self.options(i)[index]
+
+    def grader(self) -> OpenEndedGrader:
+        # References are vectorized once per quiz, not at every submission
+        with self._lock:
+            if self._grader is None:
+                self._grader = OpenEndedGrader(self.references)
+            return self._grader
+
+    # -- memory ----------------------------------------------------------
+
+    def payload_bytes(self) -> int:
+        grader = self._grader
+        return grader.nbytes if grader is not None else 0
+
+    def release_payloads(self):
+        """Drop the grader and the text reference; safe to call from another session's thread."""
+        with self._lock:
+            self._grader = None
+            get_text_store().release(self.text_key)
+            self.text_key = None
+
+
+############################################
+# PER-PROCESS MEMORY BUDGET
+############################################
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+# Sessions used more recently than this keep their payloads, whatever the budget
+MIN_IDLE_SECONDS = 60.0
+
+
+class SessionRegistry:
+    """Keeps the payloads of all sessions of the process under a memory budget.
+
+    The budget covers the texts in memory, whether the sessions' shared ones
+    or the extraction cache's memory tier (often the same objects, counted
+    once), plus the sessions' graders. Over budget, the extraction cache's
+    memory tier is emptied first, oldest entries first, but only of entries
+    already on disk (none without MINDBRIDGE_CACHE_DIR): the others would
+    have to be extracted again. Then the sessions idle for the longest
+    release their payloads.
+    """
+
+    def __init__(self, budget_bytes: int, min_idle_seconds: float = MIN_IDLE_SECONDS):
+        self.budget_bytes = budget_bytes
+        self.min_idle_seconds = min_idle_seconds
+        self._states = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def track(self, state: QuizState):
+        with self._lock:
+            self._states.add(state)
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            states = list(self._states)
+        texts = {id(text): text for text in get_text_store().texts() + get_extraction_cache().memory_texts()}
+        return (sum(sys.getsizeof(text) for text in texts.values())
+                + sum(state.payload_bytes() for state in states))
+
+    def enforce(self) -> int:
+        """Release the payloads of idle sessions until under budget; returns how many were released."""
+        used = self.memory_bytes()
+        if used <= self.budget_bytes:
+            return 0
+        extraction_cache = get_extraction_cache()
+        while used > self.budget_bytes and extraction_cache.evict_oldest():
+            used = self.memory_bytes()
+        with self._lock:
+            states = sorted(self._states, key=lambda state: state.last_used)
+        released = 0
+        now = time.monotonic()
+        for state in states:
+            if used <= self.budget_bytes or now - state.last_used < self.min_idle_seconds:
+                break
+            if state.text_key is None and state.payload_bytes() == 0:
+                continue
+            state.release_payloads()
+            released += 1
+            used = self.memory_bytes()
+        self.evictions += released
+        return released
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = len(self._states)
+        return {"sessions": sessions, "texts": len(get_text_store()),
+                "memory_mb": self.memory_bytes() / 2 ** 20, "budget_mb": self.budget_bytes / 2 ** 20,
+                "evictions": self.evictions}
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_session_registry() -> SessionRegistry:
+    """Process-wide registry; the budget is MINDBRIDGE_SESSION_MEMORY_MB (default 256)."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            budget_mb = float(os.environ.get("MINDBRIDGE_SESSION_MEMORY_MB", DEFAULT_MEMORY_BUDGET_MB))
+            _default_registry = SessionRegistry(int(budget_mb * 2 ** 20))
+    return _default_registry
@@ -1,9 +1,12 @@
-from langchain_core.prompts import ChatPromptTemplate
+from lazy_imports import lazy_module
+
+# Templates are built on first request: langchain_core is not needed before that
+prompts = lazy_module("langchain_core.prompts")
 
 #------------------------------------------------
 # Francais
 def create_true_false_template_fr():
-    prompt = ChatPromptTemplate.from_messages([
+    prompt = prompts.ChatPromptTemplate.from_messages([
         (
             'system',
             "Vous êtes un moteur de quiz qui génère des questions Vrai/Faux avec des réponses conformément aux spécifications de l'utilisateur."
@@ -15,7 +18,7 @@ def create_true_false_template_fr():
     ])
     return prompt
 def create_open_ended_template_fr():
-    prompt = ChatPromptTemplate.from_messages([
+    prompt = prompts.ChatPromptTemplate.from_messages([
         (
             'system',
             "Vous êtes un moteur de quiz qui génère des questions ouvertes avec des réponses conformément aux spécifications de l'utilisateur."
@@ -27,7 +30,7 @@ def create_open_ended_template_fr():
     ])
     return prompt
 def create_multiple_choice_template_fr():
-    prompt = ChatPromptTemplate.from_messages([
+    prompt = prompts.ChatPromptTemplate.from_messages([
         (
             'system',
             "Vous êtes un moteur de quiz qui génère des questions à choix multiples avec des réponses conformément aux spécifications de l'utilisateur."
@@ -42,7 +45,7 @@ def create_multiple_choice_template_fr():
 
 # Arabic
 def create_open_ended_template_ar():
-    prompt = ChatPromptTemplate.from_messages([
+    prompt = prompts.ChatPromptTemplate.from_messages([
         (
             'system',
             "أنت محرك اختبارات (quiz) يقوم بإنشاء أسئلة مفتوحة النهاية مع إجابات وفقًا لمتطلبات المستخدم."
@@ -54,7 +57,7 @@ def create_open_ended_template_ar():
     ])
     return prompt
 def create_true_false_template_ar():
-    prompt = ChatPromptTemplate.from_messages([
+    prompt = prompts.ChatPromptTemplate.from_messages([
         (
             'system',
             "أنت محرك اختبارات (quiz) يقوم بإنشاء أسئلة صحيحة/خاطئة مع إجابات وفقًا لمتطلبات المستخدم."
@@ -66,7 +69,7 @@ def create_true_false_template_ar():
     ])
     return prompt
 def create_multiple_choice_template_ar():
-    prompt = ChatPromptTemplate.from_messages([
+    prompt = prompts.ChatPromptTemplate.from_messages([
         (
             'system',
             "أنت محرك اختبارات (quiz) يقوم بإنشاء أسئلة متعددة الخيارات مع إجابات وفقًا لمتطلبات المستخدم."
@@ -81,7 +84,7 @@ def create_multiple_choice_template_ar():
 
 # English
 def create_multiple_choice_template_en():
-    prompt = ChatPromptTemplate.from_messages([
+    prompt = prompts.ChatPromptTemplate.from_messages([
         (
             'system',
             "You are a quiz engine that generates multiple-choice questions with answers according to user input specifications."
@@ -93,7 +96,7 @@ def create_multiple_choice_template_en():
     ])
     return prompt
 def create_true_false_template_en():
-    prompt = ChatPromptTemplate.from_messages([
+    prompt = prompts.ChatPromptTemplate.from_messages([
         (
             'system',
             "You are a quiz engine that generates true-false questions with answers according to user input specifications."
@@ -105,7 +108,7 @@ def create_true_false_template_en():
     ])
     return prompt
 def create_open_ended_template_en():
-    prompt = ChatPromptTemplate.from_messages([
+    prompt = prompts.ChatPromptTemplate.from_messages([
         (
             'system',
             "You are a quiz engine that generates open-ended questions with answers according to user input specifications."
@@ -118,16 +121,44 @@ def create_open_ended_template_en():
     return prompt
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
+#------------------------------------------------
+# Registry (quiz_type, lang) -> template
+# Templates are built once, on first use, then shared by every request.
+FALLBACK_LANGUAGE = "en"
+FALLBACK_QUIZ_TYPE = "open-ended"
+
+_template_factories = {}
+_templates = {}
+
+
+def register_template(quiz_type, lang, factory):
+    """Register (or replace) the factory building the template for a quiz type and language."""
+    _template_factories[(quiz_type, lang)] = factory
+    _templates.pop((quiz_type, lang), None)
+
+
+def get_template(quiz_type, lang):
+    """Ready-built template for (quiz_type, lang).
+
+    Unknown languages fall back to English, unknown quiz types to open-ended.
+    """
+    if (quiz_type, lang) not in _template_factories:
+        if (quiz_type, FALLBACK_LANGUAGE) not in _template_factories:
+            quiz_type = FALLBACK_QUIZ_TYPE
+        if (quiz_type, lang) not in _template_factories:
+            lang = FALLBACK_LANGUAGE
+
+    key = (quiz_type, lang)
+    template = _templates.get(key)
+    if template is None:
+        template = _templates[key] = _template_factories[key]()
+    return template
+
+
+for _lang, _factories in {
+    "fr": (create_multiple_choice_template_fr, create_true_false_template_fr, create_open_ended_template_fr),
+    "ar": (create_multiple_choice_template_ar, create_true_false_template_ar, create_open_ended_template_ar),
+    "en": (create_multiple_choice_template_en, create_true_false_template_en, create_open_ended_template_en),
+}.items():
+    for _quiz_type, _factory in zip(["multiple-choice", "true-false", "open-ended"], _factories):
+        register_template(_quiz_type, _lang, _factory)
@@ -0,0 +1,122 @@
+import time
+from typing import Iterator, List, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+
+############################################
+# PER-QUESTION SCHEMAS FOR STREAMING
+############################################
+# The quiz schemas keep questions, alternatives and answers in parallel lists,
+# so a question is only complete once the model reaches its answer at the very
+# end of the reply. For streaming, the model writes one object per question
+# instead, and each object is complete as soon as the next one starts.
+
+class MultipleChoiceQuestion(BaseModel):
+    question: str = Field(description="The quiz question")
+    alternatives: List[str] = Field(description="The alternatives for the question")
+    answer: str = Field(description="The correct alternative")
+
+
+class TrueFalseQuestion(BaseModel):
+    question: str = Field(description="The quiz question")
+    answer: str = Field(description="The answer to the question as True or False only.")
+
+
+class OpenEndedQuestion(BaseModel):
+    question: str = Field(description="The quiz question")
+    answer: str = Field(description="The expected answer")
+
+
+class StreamedMultipleChoiceQuiz(BaseModel):
+    quiz_text: str = Field(description="The quiz text")
+    questions: List[MultipleChoiceQuestion] = Field(description="The quiz questions, each with its alternatives and answer")
+
+
+class StreamedTrueFalseQuiz(BaseModel):
+    quiz_text: str = Field(description="The quiz text")
+    questions: List[TrueFalseQuestion] = Field(description="The quiz questions, each with its answer")
+
+
+class StreamedOpenEndedQuiz(BaseModel):
+    questions: List[OpenEndedQuestion] = Field(description="The quiz questions, each with its answer")
+
+
+def streamed_schema_for(schema):
+    """Per-question streaming counterpart of one of the quiz schemas."""
+    if "alternatives" in schema.model_fields:
+        return StreamedMultipleChoiceQuiz
+    if "True or False" in (schema.model_fields["answers"].description or ""):
+        return StreamedTrueFalseQuiz
+    return StreamedOpenEndedQuiz
+
+
+############################################
+# STREAMING GENERATION
+############################################
+
+class QuizStream:
+    """Iterates over the questions of a quiz as the model writes them.
+
+    After iteration, `quiz` holds the result converted to `schema`, and
+    `time_to_first_question` / `total_time` the timings in seconds.
+    """
+
+    def __init__(self, prompt_template, llm, schema, inputs: dict):
+        self.schema = schema
+        self.inputs = inputs
+        self.streamed_schema = streamed_schema_for(schema)
+        self.item_schema = self.streamed_schema.model_fields["questions"].annotation.__args__[0]
+        # A JSON-schema dict (not the pydantic class) makes the output parser
+        # yield partial objects while the reply streams in.
+        self.chain = prompt_template | llm.with_structured_output(
+            self.streamed_schema.model_json_schema(), method="json_schema"
+        )
+        self.items = []
+        self.quiz_text = ""
+        self.quiz = None
+        self.time_to_first_question: Optional[float] = None
+        self.total_time: Optional[float] = None
+
+    def _complete(self, partial_items, final: bool):
+        # Every object but the last is complete; the last one once the stream ends
+        ready = partial_items if final else partial_items[:-1]
+        for raw in ready[len(self.items):]:
+            try:
+                self.items.append(self.item_schema.model_validate(raw))
+            except ValidationError:
+                # Keep positions aligned; malformed questions are dropped at the end
+                self.items.append(None)
+            yield self.items[-1]
+
+    def __iter__(self) -> Iterator[BaseModel]:
+        start = time.perf_counter()
+        partial = {}
+        for partial in self.chain.stream(self.inputs):
+            for item in self._complete(partial.get("questions") or [], final=False):
+                if item is not None:
+                    if self.time_to_first_question is None:
+                        self.time_to_first_question = time.perf_counter() - start
+                    yield item
+        for item in self._complete(partial.get("questions") or [], final=True):
+            if item is not None:
+                if self.time_to_first_question is None:
+                    self.time_to_first_question = time.perf_counter() - start
+                yield item
+
+        self.quiz_text = partial.get("quiz_text") or ""
+        self.quiz = to_quiz(self.schema, [item for item in self.items if item is not None], self.quiz_text)
+        self.total_time = time.perf_counter() - start
+
+
+def to_quiz(schema, items, quiz_text: str = ""):
+    """Convert per-question objects into the parallel-list `schema`."""
+    fields = {
+        "questions": [item.question for item in items],
+        "answers": [item.answer for item in items],
+    }
+    if "alternatives" in schema.model_fields:
+        fields["alternatives"] = [item.alternatives for item in items]
+    if "quiz_text" in schema.model_fields:
+        fields["quiz_text"] = quiz_text
+    return schema(**fields)
@@ -0,0 +1,28 @@
+import json
+import shutil
+from pathlib import Path
+
+from batch_quiz import main
+
+
+def test_batch_writes_one_result_per_pdf_with_timings(tmp_path):
+    input_dir, output_dir = tmp_path / "pdfs", tmp_path / "quizzes"
+    input_dir.mkdir()
+    for name in ["cours1.pdf", "cours2.pdf"]:
+        shutil.copy(Path(__file__).parent / "temp_uploaded.pdf", input_dir / name)
+    (input_dir / "notes.txt").write_text("ignored")
+
+    exit_code = main([str(input_dir), str(output_dir), "--quiz-type", "true-false",
+                      "--num-questions", "4", "--fake-llm", "--fake-latency", "0",
+                      "--metrics-file", str(tmp_path / "metrics.prom")])
+
+    assert exit_code == 0
+    assert sorted(p.name for p in output_dir.iterdir()) == ["cours1.json", "cours2.json"]
+    result = json.loads((output_dir / "cours1.json").read_text(encoding="utf-8"))
+    assert result["language"] == "ar"
+    assert len(result["quiz"]["questions"]) == 4
+    assert set(result["quiz"]["answers"]) <= {"True", "False"}
+    assert {"extraction", "detection", "llm", "total"} <= set(result["timings"])
+    llm_span = next(span for span in result["spans"] if span["stage"] == "llm")
+    assert llm_span["tokens_in"] > 0 and llm_span["tokens_out"] > 0
+    assert 'mindbridge_stage_seconds_count{stage="extraction"}' in (tmp_path / "metrics.prom").read_text()
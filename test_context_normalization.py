@@ -0,0 +1,57 @@
+import pymupdf as fitz
+
+from context_normalization import is_page_number, normalize_page_texts, normalize_pages, normalize_text
+from quiz_multiple_lang import extract_document_from_pdf
+
+TOPICS = ["la photosynthèse", "la respiration", "la mitose", "la méiose", "l'osmose", "la digestion"]
+
+
+def course_pages():
+    return [f"Biologie cellulaire — Chapitre 2\n\n{topic.capitalize()}   est étudiée  ici, avec une connais-\n"
+            f"sance précise de {topic}.\n\n\n\nÀ retenir : {topic}.\n- {i + 1} -\n"
+            for i, topic in enumerate(TOPICS)]
+
+
+def test_running_headers_page_numbers_and_hyphenation_are_removed():
+    document = normalize_pages(course_pages())
+
+    assert "Biologie cellulaire" not in document.text and "- 3 -" not in document.text
+    assert "La mitose est étudiée ici, avec une connaissance\nprécise de la mitose.\n\nÀ retenir : la mitose." \
+        in document.text
+    assert document.pages == 6 and document.lines_removed == 12
+    assert 0 < document.tokens_after < document.tokens_before
+    assert document.tokens_saved == document.tokens_before - document.tokens_after
+
+
+def test_body_text_and_single_texts_are_kept():
+    # A line repeated on two pages of six is not a running header
+    pages = course_pages()
+    pages[0] += "Définition clé\n"
+    pages[4] += "Définition clé\n"
+    assert normalize_pages(pages).text.count("Définition clé") == 2
+
+    assert normalize_text("Un  texte\tcollé sans pages.\n\n\n\nFin - 12.").text == \
+        "Un texte collé sans pages.\n\nFin - 12."
+    assert not is_page_number("Chapitre 12") and is_page_number("Page 3 of 10")
+
+
+def test_arabic_text_is_not_damaged():
+    body = ["التمثيل الضوئي يحوّل الضوء إلى طاقة‌ كيميائية -\nوهي عملية حيوية",
+            "تنقسم الخلية إلى خليتين\nمتطابقتين وراثياً", "يحدث التنفس الخلوي في\nالميتوكوندريا"]
+    pages = [f"علم الأحياء الخلوي\n{text}\nصفحة {number} من ٣\n" for text, number in zip(body, "١٢٣")]
+
+    assert normalize_page_texts(pages) == body
+
+
+def test_hyphenation_across_pages_and_pdf_extraction():
+    pages = normalize_page_texts(["Une phrase coupée en fin de pa-", "ge continue ici."])
+    assert pages == ["Une phrase coupée en fin de page", "continue ici."]
+
+    doc = fitz.open()
+    for i in range(4):
+        page = doc.new_page()
+        page.insert_text((72, 40), "Cours de biologie")
+        page.insert_text((72, 100), f"Contenu propre à la page {'ABCD'[i]}.")
+        page.insert_text((300, 800), str(i + 1))
+    document = extract_document_from_pdf(doc.tobytes())
+    assert document.text == "\n".join(f"Contenu propre à la page {letter}." for letter in "ABCD")
@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import dedup_index
+from dedup_index import NearDuplicateIndex, filter_quiz
+from quiz_multiple_lang import QuizTrueFalse
+
+
+def test_paraphrase_is_found_and_unrelated_question_is_not():
+    index = NearDuplicateIndex()
+    first = index.add("Quel est le rôle de la chlorophylle dans la photosynthèse des plantes vertes ?")
+    index.add("En quelle année la Révolution française a-t-elle commencé ?")
+
+    matches = index.query("Quel est le rôle de la chlorophylle dans la photosynthèse des plantes ?")
+    assert [doc_id for doc_id, _ in matches] == [first]
+    assert index.query("Qui a écrit Les Misérables ?") == []
+
+
+def test_queries_span_sorted_segments_and_tail(monkeypatch):
+    monkeypatch.setattr(dedup_index, "TAIL_SIZE", 8)
+    index = NearDuplicateIndex()
+    ids = [index.add(f"Question numéro {i} sur le chapitre {i * 3} du cours de biologie") for i in range(20)]
+    assert len(index) == 20
+    for i in [0, 9, 19]:
+        assert ids[i] in [doc_id for doc_id, _ in index.query(f"Question numéro {i} sur le chapitre {i * 3} du cours de biologie")]
+
+
+def test_filter_quiz_flags_or_rejects_repeats():
+    index = NearDuplicateIndex()
+    first = QuizTrueFalse(quiz_text="Quiz", questions=["La Terre est ronde ?", "Le Soleil est une étoile ?"],
+                          answers=["True", "True"])
+    quiz, flagged, removed = filter_quiz(index, first)
+    assert flagged == [] and removed == 0 and quiz is first
+
+    second = QuizTrueFalse(quiz_text="Quiz", questions=["Le Soleil est une étoile ?", "La Lune est un satellite ?"],
+                           answers=["True", "True"])
+    filtered = filter_quiz(index, second, reject=True)
+    assert filtered.flagged == [] and filtered.removed == 1
+    assert filtered.quiz.questions == ["La Lune est un satellite ?"] and filtered.quiz.answers == ["True"]
+
+    # Removing would leave fewer questions than asked for: the duplicates are flagged instead
+    filtered = filter_quiz(index, second, reject=True, min_questions=2)
+    assert filtered.quiz is second and filtered.flagged == [0, 1] and filtered.removed == 0
+
+
+def test_filtering_is_scoped_and_a_quiz_does_not_match_itself():
+    index = NearDuplicateIndex()
+    quiz = QuizTrueFalse(quiz_text="Quiz", questions=["La Terre est ronde ?", "Le Soleil est une étoile ?"],
+                         answers=["True", "True"])
+    assert filter_quiz(index, quiz, reject=True, scope=("pdf-a", "true-false"), source="key-1").removed == 0
+    # Served again from the cache, or asked on another document or quiz type
+    assert filter_quiz(index, quiz, reject=True, scope=("pdf-a", "true-false"), source="key-1").removed == 0
+    assert filter_quiz(index, quiz, reject=True, scope=("pdf-a", "multiple-choice"), source="key-2").removed == 0
+    assert filter_quiz(index, quiz, reject=True, scope=("pdf-b", "true-false"), source="key-3").removed == 0
+    # Another generation for the same document and type does match, but is never emptied
+    filtered = filter_quiz(index, quiz, reject=True, scope=("pdf-a", "true-false"), source="key-4")
+    assert filtered.removed == 1 and filtered.flagged == [0] and len(filtered.quiz.questions) == 1
+
+
+def test_concurrent_sessions_store_a_question_once():
+    index = NearDuplicateIndex()
+    barrier = threading.Barrier(8)
+
+    def add(session):
+        barrier.wait()
+        return index.add_if_new("Quelle est la capitale de la France ?", scope="pdf-a", source=session)[0]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        added = list(pool.map(add, range(8)))
+    assert added.count(True) == 1 and len(index) == 1
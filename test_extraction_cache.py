@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from extraction_cache import ExtractionCache, document_key
+
+
+def test_document_key_depends_on_bytes_and_method():
+    assert document_key(b"abc", "pymupdf") == document_key(b"abc", "pymupdf")
+    assert document_key(b"abc", "pymupdf") != document_key(b"abc", "llamaparse")
+    assert document_key(b"abc", "pymupdf") != document_key(b"abd", "pymupdf")
+
+
+def test_extracts_once_per_key():
+    cache = ExtractionCache(max_entries=2)
+    calls = []
+
+    def extract():
+        calls.append(1)
+        return "texte"
+
+    assert cache.get_or_extract("k", extract) == "texte"
+    assert cache.get_or_extract("k", extract) == "texte"
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_memory_tier_is_lru():
+    cache = ExtractionCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+
+
+def test_disk_tier_survives_restart_and_evicts_by_size(tmp_path):
+    cache = ExtractionCache(disk_dir=str(tmp_path), max_disk_bytes=10)
+    cache.put("a", "12345")
+    cache.put("b", "67890")
+    assert ExtractionCache(disk_dir=str(tmp_path)).get("a") == "12345"
+
+    cache.put("c", "abcde")
+    restarted = ExtractionCache(disk_dir=str(tmp_path))
+    assert restarted.get("c") == "abcde"
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_failed_extraction_releases_its_key_lock():
+    cache = ExtractionCache()
+
+    def broken():
+        raise RuntimeError("PDF illisible")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_extract("k", broken)
+    assert cache._key_locks == {} and cache.misses == 1
+    assert cache.get_or_extract("k", lambda: "texte") == "texte"
+
+
+def test_counters_are_exact_under_concurrent_sessions():
+    cache = ExtractionCache()
+    cache.put("k", "texte")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: cache.get_or_extract("k", str), range(2000)))
+    assert (cache.hits, cache.misses) == (2000, 0)
+
+
+def test_a_failed_extraction_never_lets_two_run_at_once():
+    cache = ExtractionCache()
+    guard = threading.Lock()
+    state = {"calls": 0, "active": 0, "peak": 0}
+
+    def extract():
+        with guard:
+            state["calls"] += 1
+            first = state["calls"] == 1
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.05)
+        with guard:
+            state["active"] -= 1
+        if first:
+            raise RuntimeError("PDF illisible")
+        return "texte"
+
+    def session(i):
+        # Arrivals spread over the first failure and the retry that follows it
+        time.sleep(i * 0.01)
+        try:
+            return cache.get_or_extract("k", extract)
+        except RuntimeError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        texts = list(pool.map(session, range(10)))
+    assert state["peak"] == 1 and state["calls"] == 2
+    assert texts[0] is None and texts[1:] == ["texte"] * 9
+    assert cache._key_locks == {}
+
+
+def test_disk_entry_evicted_while_read_is_still_served(tmp_path, monkeypatch):
+    cache = ExtractionCache(disk_dir=str(tmp_path))
+    cache.put("k", "texte")
+    cache.clear()
+
+    def evicted(path, times):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert cache.get("k") == "texte"
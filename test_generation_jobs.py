@@ -0,0 +1,74 @@
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from generation_jobs import CANCELLED, DONE, FAILED, QUEUED, JobQueue, QueueFull
+
+
+def _wait(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not job.done and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job.status
+
+
+def test_identical_inflight_generations_run_once():
+    queue = JobQueue(max_workers=2)
+    release, calls = threading.Event(), []
+
+    def generate(job):
+        calls.append(job.id)
+        release.wait(5)
+        return "quiz"
+
+    first = queue.submit("cache-key", generate)
+    second = queue.submit("cache-key", generate)
+    assert second is first and first.watchers == 2
+
+    # One session walking away does not cancel the other's generation
+    assert queue.cancel(first.id) is False
+    release.set()
+    assert _wait(first) == DONE and first.result == "quiz"
+    assert len(calls) == 1 and queue.stats()["deduplicated"] == 1
+
+    # Once finished, the same key generates again
+    third = queue.submit("cache-key", generate)
+    assert third is not first and _wait(third) == DONE
+
+
+def test_cancelled_jobs_stop_queued_or_running():
+    queue = JobQueue(max_workers=1)
+    started, pending = threading.Event(), concurrent.futures.Future()
+
+    def generate(job):
+        started.set()
+        job.report(0.5, "Génération…")
+        return job.wait(pending, poll_interval=0.01)
+
+    running = queue.submit("a", generate)
+    queued = queue.submit("b", generate)
+    assert started.wait(5) and queued.status == QUEUED
+
+    assert queue.cancel(queued.id) and queued.status == CANCELLED
+    assert queue.cancel(running.id)
+    assert _wait(running) == CANCELLED and pending.cancelled()
+    assert running.progress == 0.5 and running.message == "Génération…"
+
+
+def test_failures_are_captured_and_the_queue_is_bounded():
+    queue = JobQueue(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    def fail(job):
+        raise ValueError("réponse invalide")
+
+    failed = queue.submit("bad", fail)
+    assert _wait(failed) == FAILED and isinstance(failed.error, ValueError)
+
+    for key in ("a", "b"):
+        queue.submit(key, lambda job: release.wait(5))
+    with pytest.raises(QueueFull):
+        queue.submit("c", lambda job: None)
+    release.set()
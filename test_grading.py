@@ -0,0 +1,39 @@
+import numpy as np
+
+from grading import UNANSWERED, encode_submissions, grade, grade_answers, normalize_answer_key
+
+ALTERNATIVES = [["a) Paris", "b) Lyon", "c) Nice"], ["Mars", "Vénus"], ["Rouge", "Vert", "Bleu"]]
+
+
+def test_answer_key_accepts_text_letters_and_true_false_variants():
+    key = normalize_answer_key(["Paris", "B)", "bleu "], ALTERNATIVES)
+    assert key.tolist() == [0, 1, 2]
+    assert normalize_answer_key(["Jaune"], [["Rouge", "Vert"]]).tolist() == [UNANSWERED]
+    assert normalize_answer_key(["true", "FALSE", "Vrai", "خطأ"]).tolist() == [0, 1, 0, 1]
+
+
+def test_scores_and_item_statistics():
+    report = grade_answers(
+        ["Paris", "b", "Bleu"],
+        [["a) Paris", "Vénus", "Bleu"], ["b) Lyon", "Vénus", "Bleu"], ["a) Paris", "Mars", None]],
+        ALTERNATIVES,
+    )
+    assert report.scores.tolist() == [3, 2, 1]
+    assert report.difficulty.tolist() == [2 / 3, 2 / 3, 2 / 3]
+    assert report.option_counts.tolist() == [[2, 1, 0], [1, 2, 0], [0, 0, 2]]
+    # Q3 is answered right by the strongest students, Q1 by the weakest one too
+    assert report.discrimination[2] > 0 > report.discrimination[0]
+
+
+def test_bulk_grading_matches_a_python_loop():
+    rng = np.random.default_rng(0)
+    key = rng.integers(0, 4, size=20)
+    responses = rng.integers(-1, 4, size=(5000, 20))
+    report = grade(key, responses)
+    expected = [sum(int(r == k) for r, k in zip(row, key)) for row in responses.tolist()]
+    assert report.scores.tolist() == expected
+    assert report.option_counts.sum() == (responses >= 0).sum()
+
+
+def test_encoding_a_single_true_false_submission():
+    assert encode_submissions([["True", "false", ""]]).tolist() == [[0, 1, UNANSWERED]]
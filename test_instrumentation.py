@@ -0,0 +1,87 @@
+import json
+import logging
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import instrumentation
+from instrumentation import Metrics, Trace, get_metrics
+
+
+def test_spans_record_time_attributes_and_errors(caplog):
+    trace = Trace("test")
+    with caplog.at_level(logging.INFO, logger="instrumentation"):
+        with trace.span("llm", model="fake") as span:
+            span["tokens_in"] = 120
+            span["cache_hit"] = False
+        with pytest.raises(ValueError):
+            with trace.span("extraction"):
+                raise ValueError("bad pdf")
+
+    assert [record["stage"] for record in trace.spans] == ["llm", "extraction"]
+    assert trace.spans[0]["tokens_in"] == 120 and trace.spans[1]["error"] == "ValueError"
+    assert set(trace.timings()) == {"llm", "extraction"}
+    logged = [json.loads(record.getMessage()) for record in caplog.records]
+    assert logged[0]["stage"] == "llm" and logged[0]["trace"] == trace.trace_id
+    assert get_metrics().render().count('stage="llm"') > 0
+
+
+def test_prometheus_text_and_atomic_write(tmp_path):
+    metrics = Metrics()
+    metrics.observe({"stage": "llm", "duration_s": 0.3, "tokens_in": 100, "tokens_out": 40, "cache_hit": True})
+    metrics.observe({"stage": "llm", "duration_s": 3.0, "tokens_in": 50, "cache_hit": False})
+    text = metrics.render()
+
+    assert 'mindbridge_stage_seconds_bucket{stage="llm",le="0.25"} 0' in text
+    assert 'mindbridge_stage_seconds_bucket{stage="llm",le="0.5"} 1' in text
+    assert 'mindbridge_stage_seconds_bucket{stage="llm",le="+Inf"} 2' in text
+    assert 'mindbridge_tokens_total{stage="llm",direction="input"} 150' in text
+    assert 'mindbridge_cache_total{stage="llm",result="hit"} 1' in text
+
+    path = metrics.write(str(tmp_path / "metrics" / "mindbridge.prom"))
+    assert open(path).read() == text
+    assert [p.name for p in (tmp_path / "metrics").iterdir()] == ["mindbridge.prom"]
+
+
+def test_metrics_file_is_rewritten_at_most_once_per_interval(tmp_path, monkeypatch):
+    monkeypatch.setenv("MINDBRIDGE_METRICS_FILE", str(tmp_path / "mindbridge.prom"))
+    metrics = Metrics()
+    assert metrics.write_if_due(interval=60) == str(tmp_path / "mindbridge.prom")
+    assert metrics.write_if_due(interval=60) is None
+    assert metrics.write_if_due(interval=0) is not None
+
+
+def test_json_logs_handler_is_attached_once(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_json_handler", None)
+    span_logger = logging.getLogger("instrumentation")
+    before = list(span_logger.handlers)
+    instrumentation.enable_json_logs()
+    instrumentation.enable_json_logs()
+    added = [handler for handler in span_logger.handlers if handler not in before]
+    assert len(added) == 1
+    span_logger.removeHandler(added[0])
+
+
+def test_a_rerun_inside_a_span_is_not_an_error():
+    def script():
+        import streamlit as st
+
+        from instrumentation import Trace
+
+        st.session_state.setdefault("runs", 0)
+        st.session_state.setdefault("spans", [])
+        st.session_state.runs += 1
+        trace = Trace("test")
+        try:
+            with trace.span("rerun_test"):
+                if st.session_state.runs == 1:
+                    st.rerun()
+        finally:
+            st.session_state.spans += trace.spans
+
+    at = AppTest.from_function(script).run()
+
+    assert at.session_state.runs == 2 and not at.exception
+    assert [record["stage"] for record in at.session_state.spans] == ["rerun_test", "rerun_test"]
+    assert not any("error" in record for record in at.session_state.spans)
+    assert "mindbridge_stage_errors_total{stage=\"rerun_test\"}" not in get_metrics().render()
@@ -1,5 +1,8 @@
 from langdetect import detect
 
+from language_detection import SAMPLE_CHARS, SAMPLE_WINDOWS, sample_text
+from language_detection import detect_language as detect_language_sampled
+
 def detect_language(text: str) -> str:
     """
     Détecte la langue du texte fourni.
@@ -7,23 +10,48 @@ def detect_language(text: str) -> str:
     """
     return detect(text)
 
+TEXTE_FR = "Bonjour, comment allez-vous? Je suis ravi de vous rencontrer."
+TEXTE_EN = "Hello, how are you? I am happy to meet you."
+TEXTE_AR = "مرحبا كيف حالك؟ أنا سعيد بلقائك."
+
 # Tests avec différentes langues
 def test_language_detection():
     # Test en français
-    texte_fr = "Bonjour, comment allez-vous? Je suis ravi de vous rencontrer."
+    texte_fr = TEXTE_FR
     print(f"Texte français: '{texte_fr}'")
     print(f"Langue détectée: {detect_language(texte_fr)}\n")
 
     # Test en anglais
-    texte_en = "Hello, how are you? I am happy to meet you."
+    texte_en = TEXTE_EN
     print(f"Texte anglais: '{texte_en}'")
     print(f"Langue détectée: {detect_language(texte_en)}\n")
 
     # Test en arabe
-    texte_ar = "مرحبا كيف حالك؟ أنا سعيد بلقائك."
+    texte_ar = TEXTE_AR
     print(f"Texte arabe: '{texte_ar}'")
     print(f"Langue détectée: {detect_language(texte_ar)}\n")
 
+# Détecteur échantillonné sur des textes longs (~1 Mo)
+def test_sampled_language_detection():
+    for texte, langue in [(TEXTE_FR, "fr"), (TEXTE_EN, "en"), (TEXTE_AR, "ar")]:
+        texte_long = " ".join([texte] * 16000)
+        assert detect_language_sampled(texte_long) == langue
+        # Même résultat à chaque appel (graine fixe + cache)
+        assert detect_language_sampled(texte_long) == langue
+
+    # Formes de présentation arabes, comme extraites par PyMuPDF
+    assert detect_language_sampled("اﻟﺪورة - اﻟﻠﻐﻮﻳﺔ اﻟﺪروس «إﻋﺪادي اﻷوﻟﻰ :اﻟﻌﺮﺑﻴﺔ اﻟﻠﻐﺔ") == "ar"
+
+# Textes sans espaces (chinois, japonais, thaï) : toutes les fenêtres comptent
+def test_sampling_text_without_spaces():
+    texte_zh = ("光合作用是植物利用光能把二氧化碳和水转化为有机物并释放氧气的过程。"
+                "叶绿体是进行光合作用的主要场所，其中含有叶绿素。"
+                "这个过程为地球上几乎所有生物提供了能量和食物来源。"
+                "科学家们一直在研究如何提高农作物的光合效率。") * 300
+    echantillon = sample_text(texte_zh)
+    assert len(echantillon) >= SAMPLE_CHARS - SAMPLE_WINDOWS
+    assert detect_language_sampled(texte_zh) == "zh-cn"
+
 if __name__ == "__main__":
     print("=== Test de détection de langue ===")
-    test_language_detection() 
\ No newline at end of file
+    test_language_detection()
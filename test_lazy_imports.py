@@ -0,0 +1,36 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from lazy_imports import lazy_module
+
+
+def test_module_is_imported_on_first_attribute_access(tmp_path, monkeypatch):
+    (tmp_path / "lazy_target.py").write_text("VALUE = 42\nFLAGS = []\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    configured = []
+
+    module = lazy_module("lazy_target", on_import=lambda m: configured.append(m.__name__))
+    assert "lazy_target" not in sys.modules and not configured
+
+    assert module.VALUE == 42
+    assert module.FLAGS is sys.modules["lazy_target"].FLAGS
+    assert configured == ["lazy_target"]
+    monkeypatch.delitem(sys.modules, "lazy_target")
+
+
+def test_app_import_defers_the_llm_and_pdf_stacks():
+    code = ("import sys, quiz_multiple_lang\n"
+            "print(sorted(m for m in ['langchain_openai', 'langchain_core', 'aiohttp', 'pymupdf', 'langdetect'] "
+            "if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_batch_cli_import_defers_the_openai_stack():
+    # --fake-llm runs never need it
+    code = "import sys, batch_quiz\nprint('langchain_openai' in sys.modules, 'openai' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False False"
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import llamaparse_client
+from llamaparse_client import LlamaParseClient, LlamaParseError, parse_pdf_bytes
+from llm_clients import run_coroutine
+
+
+def make_stand_in_server(polls_before_success=2, fail_uploads=False):
+    """Local stand-in for the LlamaParse upload / status / result routes."""
+    jobs = {}
+    stats = {"in_flight": 0, "max_in_flight": 0}
+
+    async def upload(request):
+        assert request.headers["Authorization"] == "Bearer test-key"
+        if fail_uploads:
+            return web.json_response({"detail": "quota exceeded"}, status=429)
+        form = await request.post()
+        job_id = f"job-{len(jobs)}"
+        data = form["file"].file.read()
+        jobs[job_id] = {"polls": 0, "text": data.decode()}
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        return web.json_response({"id": job_id, "status": "PENDING"})
+
+    async def status(request):
+        job = jobs[request.match_info["job_id"]]
+        job["polls"] += 1
+        if job["text"] == "broken":
+            return web.json_response({"id": request.match_info["job_id"], "status": "ERROR",
+                                      "error_message": "unreadable PDF"})
+        done = job["polls"] > polls_before_success
+        return web.json_response({"id": request.match_info["job_id"], "status": "SUCCESS" if done else "PENDING"})
+
+    async def result(request):
+        stats["in_flight"] -= 1
+        return web.json_response({"text": f"parsed: {jobs[request.match_info['job_id']]['text']}"})
+
+    app = web.Application()
+    app.router.add_post("/api/parsing/upload", upload)
+    app.router.add_get("/api/parsing/job/{job_id}", status)
+    app.router.add_get("/api/parsing/job/{job_id}/result/text", result)
+    return TestServer(app), stats
+
+
+def run_against_stand_in(scenario, **client_options):
+    async def run():
+        server, stats = make_stand_in_server()
+        async with server:
+            base_url = str(server.make_url("")).rstrip("/")
+            async with LlamaParseClient("test-key", base_url=base_url, poll_interval=0.01,
+                                        **client_options) as client:
+                return await scenario(client), stats
+
+    return asyncio.run(run())
+
+
+def test_parses_several_documents_concurrently_within_limit():
+    progress = []
+    documents = [(f"doc {i}".encode(), f"doc{i}.pdf") for i in range(6)]
+
+    texts, stats = run_against_stand_in(
+        lambda client: client.parse_many(documents, lambda message, fraction: progress.append(fraction)),
+        max_concurrency=2,
+    )
+
+    assert texts == [f"parsed: doc {i}" for i in range(6)]
+    assert stats["max_in_flight"] == 2
+    assert progress[-1] == 1.0
+    assert progress == sorted(progress)
+
+
+def test_failed_job_raises():
+    async def scenario(client):
+        try:
+            await client.parse(b"broken")
+        except LlamaParseError as err:
+            return str(err)
+
+    message, _ = run_against_stand_in(scenario)
+    assert "unreadable PDF" in message
+
+
+def test_job_that_never_finishes_times_out():
+    async def run():
+        server, _ = make_stand_in_server(polls_before_success=10 ** 6)
+        async with server:
+            base_url = str(server.make_url("")).rstrip("/")
+            async with LlamaParseClient("test-key", base_url=base_url, poll_interval=0.01,
+                                        max_poll_interval=0.01, timeout=0.1) as client:
+                with pytest.raises(LlamaParseError, match="Timeout"):
+                    await client.parse(b"slow")
+
+    asyncio.run(run())
+
+
+def with_shared_stand_in(monkeypatch, test, **server_options):
+    # parse_pdf_bytes against the stand-in, on the process-wide loop and session
+    monkeypatch.setattr(llamaparse_client, "_shared_session", None)
+    server, stats = make_stand_in_server(**server_options)
+    run_coroutine(server.start_server())
+    try:
+        return test(str(server.make_url("")).rstrip("/"), stats)
+    finally:
+        run_coroutine(llamaparse_client._shared_session.close())
+        run_coroutine(server.close())
+
+
+def test_sync_entry_point_relays_every_update_and_errors(monkeypatch):
+    def test(base_url, stats):
+        progress = []
+        text = parse_pdf_bytes(b"doc", "test-key", on_progress=lambda *update: progress.append(update),
+                               base_url=base_url, poll_interval=0.01)
+        assert text == "parsed: doc"
+        # The last update is posted just before the parse completes: it must not be lost
+        assert progress[0] == ("uploading", 0.0) and progress[-1] == ("done", 1.0)
+
+    with_shared_stand_in(monkeypatch, test)
+
+    def failing(base_url, stats):
+        with pytest.raises(LlamaParseError, match="429"):
+            parse_pdf_bytes(b"doc", "test-key", base_url=base_url, poll_interval=0.01)
+
+    with_shared_stand_in(monkeypatch, failing, fail_uploads=True)
+
+
+def test_parses_from_all_callers_share_one_limit(monkeypatch):
+    monkeypatch.setattr(llamaparse_client, "MAX_CONCURRENT_PARSES", 2)
+
+    def test(base_url, stats):
+        progress = []
+
+        def parse(i):
+            return parse_pdf_bytes(f"doc {i}".encode(), "test-key", f"doc{i}.pdf",
+                                   lambda message, fraction: progress.append(threading.current_thread().name),
+                                   base_url=base_url, poll_interval=0.01)
+
+        # One caller per session: each would have had its own limit before
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            texts = list(pool.map(parse, range(5)))
+
+        assert texts == [f"parsed: doc {i}" for i in range(5)]
+        assert stats["max_in_flight"] == 2
+        # Progress is reported on the callers' threads, not the event loop's
+        assert progress and all(name.startswith("ThreadPoolExecutor") for name in progress)
+
+    with_shared_stand_in(monkeypatch, test)
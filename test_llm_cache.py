@@ -0,0 +1,69 @@
+import time
+
+from llm_cache import QuizResponseCache, make_key
+from quiz_multiple_lang import QuizOpenEnded
+from quiz_templates_miltiple_lang import get_template
+
+
+def make_quiz(question):
+    return QuizOpenEnded(questions=[question], answers=["réponse"])
+
+
+def test_key_covers_template_and_inputs():
+    template = get_template("open-ended", "fr")
+    key = make_key(template, quiz_context="texte", num_questions=3, temperature=0.0)
+    assert key == make_key(template, quiz_context="texte", num_questions=3, temperature=0.0)
+    assert key != make_key(template, quiz_context="texte", num_questions=4, temperature=0.0)
+    assert key != make_key(get_template("open-ended", "en"), quiz_context="texte", num_questions=3, temperature=0.0)
+
+
+def test_hit_after_miss_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = QuizResponseCache(path)
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return make_quiz("Q ?")
+
+    assert cache.get_or_generate("k", QuizOpenEnded, generate) == make_quiz("Q ?")
+    assert cache.get_or_generate("k", QuizOpenEnded, generate) == make_quiz("Q ?")
+    assert QuizResponseCache(path).get_or_generate("k", QuizOpenEnded, generate) == make_quiz("Q ?")
+    assert len(calls) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "bypassed": 0, "entries": 1}
+
+
+def test_creative_temperature_bypasses_unless_enabled(tmp_path):
+    cache = QuizResponseCache(str(tmp_path / "cache.sqlite3"))
+    cache.get_or_generate("k", QuizOpenEnded, lambda: make_quiz("A ?"), temperature=0.8)
+    cache.get_or_generate("k", QuizOpenEnded, lambda: make_quiz("B ?"), temperature=0.8)
+    assert cache.stats()["bypassed"] == 2 and cache.stats()["entries"] == 0
+
+    cache.get_or_generate("k", QuizOpenEnded, lambda: make_quiz("C ?"), temperature=0.8, cache_creative=True)
+    cached = cache.get_or_generate("k", QuizOpenEnded, lambda: make_quiz("D ?"), temperature=0.8, cache_creative=True)
+    assert cached.questions == ["C ?"]
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    cache = QuizResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+    expiring = QuizResponseCache(str(tmp_path / "ttl.sqlite3"), ttl_seconds=0.05)
+    expiring.put("a", "1")
+    time.sleep(0.1)
+    assert expiring.get("a") is None
+
+
+def test_payload_of_an_older_schema_is_replaced(tmp_path):
+    cache = QuizResponseCache(str(tmp_path / "cache.sqlite3"))
+    # Written before the question models changed: answers missing
+    cache.put("k", '{"questions": ["Q ?"], "reponses": ["réponse"]}')
+
+    assert cache.get_or_generate("k", QuizOpenEnded, lambda: make_quiz("Q ?")) == make_quiz("Q ?")
+    assert cache.get_or_generate("k", QuizOpenEnded, lambda: make_quiz("Autre ?")) == make_quiz("Q ?")
+    assert (cache.hits, cache.misses) == (1, 1)
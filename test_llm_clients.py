@@ -0,0 +1,42 @@
+import asyncio
+import os
+from collections import OrderedDict
+
+import llm_clients
+from llm_clients import get_chat_model, run_coroutine
+
+
+def test_pooled_client_per_key_and_model_with_per_call_temperature():
+    cold = get_chat_model("sk-test-a", "gpt-4o", 0.0)
+    warm = get_chat_model("sk-test-a", "gpt-4o", 0.8)
+    assert (cold.temperature, warm.temperature) == (0.0, 0.8)
+    assert warm.root_client is cold.root_client
+    assert warm.root_async_client is cold.root_async_client
+
+    other_key = get_chat_model("sk-test-b", "gpt-4o")
+    assert other_key.root_client is not cold.root_client
+    assert other_key.openai_api_key.get_secret_value() == "sk-test-b"
+    assert os.environ.get("OPENAI_API_KEY") != "sk-test-b"
+
+
+def test_run_coroutine_reuses_one_loop():
+    async def current_loop():
+        await asyncio.sleep(0)
+        return asyncio.get_running_loop()
+
+    assert run_coroutine(current_loop()) is run_coroutine(current_loop())
+
+
+def test_least_recently_used_clients_are_dropped(monkeypatch):
+    monkeypatch.setattr(llm_clients, "MAX_CHAT_MODELS", 2)
+    monkeypatch.setattr(llm_clients, "_chat_models", OrderedDict())
+    first = get_chat_model("sk-test-1")
+    get_chat_model("sk-test-2")
+    assert get_chat_model("sk-test-1").root_client is first.root_client
+    get_chat_model("sk-test-3")
+
+    assert len(llm_clients._chat_models) == 2
+    # sk-test-2 was the least recently used: only its client was rebuilt
+    assert get_chat_model("sk-test-1").root_client is first.root_client
+    assert get_chat_model("sk-test-2").openai_api_key.get_secret_value() == "sk-test-2"
+    assert len(llm_clients._chat_models) == 2
@@ -0,0 +1,68 @@
+import numpy as np
+from langchain_core.runnables import RunnableLambda
+
+from open_ended_grading import AnswerJudgement, OpenEndedGrader, escalate_borderline, normalize_answer
+
+REFERENCES = ["La photosynthèse transforme la lumière en énergie chimique",
+              "Paris est la capitale de la France",
+              "Napoléon Bonaparte"]
+
+
+def test_normalization_per_language():
+    assert normalize_answer("L'Énergie  CHIMIQUE !", "fr") == "energie chimique"
+    assert normalize_answer("The Sun is a star", "en") == "sun star"
+    assert normalize_answer("تَتَحَوَّلُ الطاقةُ إلى طاقة كيميائيّة", "ar") == "تتحول الطاقه طاقه كيمياييه"
+
+
+def test_batch_grading_matches_one_student_at_a_time():
+    grader = OpenEndedGrader(REFERENCES, "fr")
+    submissions = [["la photosynthese transforme la lumiere en energie", "Paris", "Napoleon"],
+                   ["les volcans crachent du magma", "Lyon", "Bonaparte, Napoléon"],
+                   ["", None]]
+    report = grader.grade(submissions)
+
+    assert report.correct.tolist() == [[True, False, True], [False, False, True], [False, False, False]]
+    assert report.borderline[0, 1] and not report.borderline[1, 0]
+    assert report.scores.tolist() == [2, 1, 0]
+    for s, submission in enumerate(submissions):
+        assert np.allclose(grader.similarity([submission])[0], report.similarity[s])
+
+
+def test_only_borderline_answers_are_escalated():
+    asked = []
+
+    class JudgeModel:
+        def with_structured_output(self, schema):
+            assert schema is AnswerJudgement
+
+            def judge(prompt):
+                asked.append(prompt.to_string())
+                return AnswerJudgement(correct=True)
+            return RunnableLambda(judge)
+
+    submissions = [["la photosynthese transforme la lumiere en energie", "Paris", "Napoleon"]]
+    grader = OpenEndedGrader(REFERENCES, "fr")
+    report = escalate_borderline(grader.grade(submissions), ["Q1", "Q2", "Q3"], REFERENCES, submissions, JudgeModel())
+    assert len(asked) == 1 and "Student answer: Paris" in asked[0]
+    assert report.scores.tolist() == [3] and not report.borderline.any()
+
+
+def test_grader_memory_scales_with_the_references():
+    grader = OpenEndedGrader(REFERENCES, "fr")
+    # IDF weights for the references' n-grams only, not the whole hash space
+    assert grader.nbytes < 8 * 1024
+
+
+def test_failed_judgements_keep_the_lexical_verdict():
+    def judge(prompt):
+        raise RuntimeError("API error")
+
+    class FailingModel:
+        def with_structured_output(self, schema):
+            return RunnableLambda(judge)
+
+    submissions = [["la photosynthese transforme la lumiere en energie", "Paris", "Napoleon"]]
+    grader = OpenEndedGrader(REFERENCES, "fr")
+    lexical = grader.grade(submissions)
+    report = escalate_borderline(lexical, ["Q1", "Q2", "Q3"], REFERENCES, submissions, FailingModel())
+    assert report.scores.tolist() == lexical.scores.tolist() and report.borderline[0, 1]
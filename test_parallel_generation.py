@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+from langchain_core.runnables import RunnableLambda
+
+from parallel_generation import generate_chunked, merge_quizzes, split_context
+from quiz_multiple_lang import QuizMultipleChoice, QuizOpenEnded
+from token_counting import count_tokens
+
+
+def test_split_context_respects_budget_and_order():
+    text = "\n\n".join(f"Paragraphe {i} " + "mot " * 50 for i in range(40))
+    chunks = split_context(text, max_tokens=200)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 200 for chunk in chunks)
+    assert chunks[0].startswith("Paragraphe 0 ") and "Paragraphe 39 " in chunks[-1]
+    assert split_context("court", max_tokens=200) == ["court"]
+
+
+def test_merge_round_robin_without_duplicates():
+    first = QuizOpenEnded(questions=["Q1 ?", "Q2 ?"], answers=["A1", "A2"])
+    second = QuizOpenEnded(questions=["q1", "Q3 ?"], answers=["A1", "A3"])
+    merged = merge_quizzes(QuizOpenEnded, [first, second], 3)
+    assert merged.questions == ["Q1 ?", "Q2 ?", "Q3 ?"]
+    assert merged.answers == ["A1", "A2", "A3"]
+
+
+def test_chunks_are_generated_concurrently():
+    async def fake_model(inputs):
+        await asyncio.sleep(0.2)
+        chunk_id = inputs["quiz_context"].split()[0]
+        return QuizMultipleChoice(
+            quiz_text="Quiz",
+            questions=[f"{chunk_id} question {i}" for i in range(inputs["num_questions"])],
+            alternatives=[["a", "b"]] * inputs["num_questions"],
+            answers=["a"] * inputs["num_questions"],
+        )
+
+    context = "\n\n".join(f"chunk{i} " + "texte " * 300 for i in range(6))
+    progress = []
+    start = time.perf_counter()
+    # One call per question: each of the six chunks gets its own call
+    quiz = generate_chunked(RunnableLambda(fake_model), QuizMultipleChoice, context, 6, max_tokens=400,
+                            shard_size=1, on_progress=lambda done, total: progress.append((done, total)))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.6
+    total = progress[-1][1]
+    assert progress == [(i, total) for i in range(1, total + 1)]
+    assert len(quiz.questions) == len(quiz.alternatives) == len(quiz.answers) == 6
+    assert len({question.split()[0] for question in quiz.questions}) == 6
+
+
+def test_many_questions_are_sharded_and_deduplicated():
+    calls = []
+
+    async def fake_model(inputs):
+        calls.append(inputs["num_questions"])
+        await asyncio.sleep(0.2)
+        sentences = [s for s in inputs["quiz_context"].split(".") if s.strip()]
+        # Every shard also returns the same paraphrased question
+        questions = [f"Que dit le texte sur {s.strip()} ?" for s in sentences][:inputs["num_questions"] - 1]
+        questions.insert(0, "Quel est le sujet principal du document ?")
+        return QuizOpenEnded(questions=questions, answers=["..."] * len(questions))
+
+    context = " ".join(f"Le fait numéro {i} concerne la matière {i * 7}." for i in range(500))
+    start = time.perf_counter()
+    quiz = generate_chunked(RunnableLambda(fake_model), QuizOpenEnded, context, 40)
+    elapsed = time.perf_counter() - start
+
+    assert len(calls) >= 8 and max(calls) <= 10
+    assert elapsed < 0.2 * 3
+    assert len(quiz.questions) == 40
+    assert quiz.questions.count("Quel est le sujet principal du document ?") == 1
+
+
+def test_fan_out_follows_the_question_count_not_the_context_length():
+    calls = []
+
+    async def fake_model(inputs):
+        calls.append(inputs["num_questions"])
+        await asyncio.sleep(0.1)
+        # Questions on the first sentences of the slice, in order
+        sentences = [s for s in inputs["quiz_context"].split(".") if s.strip()]
+        questions = [f"Que dit le texte sur {s.strip()} ?" for s in sentences][:inputs["num_questions"]]
+        return QuizOpenEnded(questions=questions, answers=["..."] * len(questions))
+
+    # Short context (~800 tokens), many questions: ten calls of at most eight questions,
+    # on rotations of the context so that they do not all ask the same ones
+    short = " ".join(f"Le fait {i} porte sur la notion {i * 7}." for i in range(80))
+    assert count_tokens(short) < 1000
+    quiz = generate_chunked(RunnableLambda(fake_model), QuizOpenEnded, short, 50)
+    assert len(calls) == 10 and max(calls) <= 8
+    assert len(quiz.questions) == 50
+
+    # Long context, few questions: a single call, not one per chunk
+    calls.clear()
+    long = "\n\n".join(f"Paragraphe {i}. " + "Une phrase de texte. " * 60 for i in range(12))
+    generate_chunked(RunnableLambda(fake_model), QuizOpenEnded, long, 3, max_tokens=400)
+    assert len(calls) == 1
+
+
+def test_near_duplicates_are_merged():
+    first = QuizOpenEnded(questions=["Quelle est la capitale de la France ?"], answers=["Paris"])
+    second = QuizOpenEnded(questions=["Quelle est donc la capitale de la France ?", "Qui a écrit Candide ?"],
+                           answers=["Paris", "Voltaire"])
+    merged = merge_quizzes(QuizOpenEnded, [first, second], 5)
+    assert merged.questions == ["Quelle est la capitale de la France ?", "Qui a écrit Candide ?"]
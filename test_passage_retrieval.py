@@ -0,0 +1,71 @@
+import pymupdf as fitz
+import pytest
+
+from passage_retrieval import (BM25Index, IndexCache, parse_page_ranges, passages_from_pages,
+                               passages_from_text, select_context)
+from pdf_extraction import iter_pages
+from token_counting import count_tokens
+
+CHAPTERS = ["photosynthèse chlorophylle lumière", "mitose chromosomes division", "volcan magma éruption"]
+
+
+def make_textbook(pages_per_chapter=40):
+    doc = fitz.open()
+    for chapter in CHAPTERS:
+        for i in range(pages_per_chapter):
+            page = doc.new_page()
+            body = f"Leçon {i} : {chapter}. " + "Texte général du manuel scolaire. " * 20
+            page.insert_textbox(fitz.Rect(40, 40, 560, 800), body, fontsize=9)
+    return doc.tobytes()
+
+
+def test_topic_selects_an_order_of_magnitude_fewer_tokens():
+    data = make_textbook()
+    full_text = "".join(text for _, text in iter_pages(data))
+    index = BM25Index(passages_from_pages(iter_pages(data)))
+
+    context = select_context(index, topic="eruption volcan", max_tokens=count_tokens(full_text) // 10)
+    assert context and count_tokens(context) * 10 <= count_tokens(full_text)
+    assert "volcan" in context and "mitose" not in context and "photosynth" not in context
+
+    best, _ = index.search("chromosomes")[0]
+    assert "mitose" in index.passages[best].text
+
+
+def test_page_range_and_budget():
+    index = BM25Index(passages_from_pages(iter_pages(make_textbook(pages_per_chapter=5))))
+    context = select_context(index, pages=parse_page_ranges("6-7"), max_tokens=10000)
+    assert "Leçon 0 : mitose" in context and "Leçon 1 : mitose" in context
+    assert "photosynthèse" not in context and "Leçon 2" not in context
+
+    short = select_context(index, max_tokens=300)
+    assert 0 < count_tokens(short) <= 300 and short.startswith("Leçon 0 : photosynthèse")
+
+
+def test_parse_page_ranges():
+    assert parse_page_ranges("3-5, 9,7-6") == {3, 4, 5, 6, 7, 9}
+    assert parse_page_ranges("") == set()
+    with pytest.raises(ValueError):
+        parse_page_ranges("3-x")
+    # Ranges are checked against the page count before being expanded
+    with pytest.raises(ValueError):
+        parse_page_ranges("1-999999999")
+    with pytest.raises(ValueError):
+        parse_page_ranges("0, 2")
+    with pytest.raises(ValueError):
+        parse_page_ranges("10-12", page_count=11)
+    assert parse_page_ranges("10-11", page_count=11) == {10, 11}
+
+
+def test_index_is_built_once_per_document():
+    cache = IndexCache(max_entries=1)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return passages_from_text("Le soleil brille.\n\nLa lune éclaire.")
+
+    assert cache.get_or_build("doc", build) is cache.get_or_build("doc", build)
+    cache.get_or_build("other", build)
+    cache.get_or_build("doc", build)
+    assert len(builds) == 3
@@ -0,0 +1,59 @@
+import sys
+import types
+
+import pymupdf as fitz
+
+import pdf_extraction
+from pdf_extraction import extract_text_parallel, extract_text_serial, iter_pages, page_ranges
+
+
+def make_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page numéro {i + 1}")
+    return doc.tobytes()
+
+
+def test_page_ranges_cover_every_page_in_order():
+    assert page_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert page_ranges(2, 8) == [(0, 1), (1, 2)]
+
+
+def test_parallel_matches_serial_in_page_order():
+    data = make_pdf(12)
+    text = extract_text_parallel(data, workers=2, min_pages=0)
+    assert text == extract_text_serial(data)
+    assert text.index("Page numéro 2\n") < text.index("Page numéro 11\n")
+
+
+def test_short_documents_fall_back_to_serial():
+    data = make_pdf(3)
+    assert extract_text_parallel(data, workers=4) == extract_text_serial(data)
+
+
+def test_iter_pages_streams_numbered_pages_from_buffer_or_path(tmp_path):
+    data = make_pdf(4)
+    pages = list(iter_pages(memoryview(data)))
+    assert [number for number, _ in pages] == [1, 2, 3, 4]
+    assert pages[2][1].strip() == "Page numéro 3"
+
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(data)
+    assert list(iter_pages(str(path), start=1, stop=3)) == pages[1:3]
+
+
+def test_pool_workers_do_not_rerun_the_script_running_as_main(monkeypatch, tmp_path):
+    # What Streamlit does while a script runs: the app is the __main__ module
+    script = tmp_path / "app.py"
+    script.write_text("raise SystemExit('the app script ran in a worker')\n")
+    app_main = types.ModuleType("__main__")
+    app_main.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, "__main__", app_main)
+    monkeypatch.setattr(pdf_extraction, "_pool", None)
+    monkeypatch.setattr(pdf_extraction, "POOL_WORKERS", 2)
+
+    data = make_pdf(8)
+    try:
+        assert extract_text_parallel(data, workers=2, min_pages=0) == extract_text_serial(data)
+    finally:
+        pdf_extraction._pool.terminate()
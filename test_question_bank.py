@@ -0,0 +1,40 @@
+from question_bank import QuestionBank
+from quiz_multiple_lang import QuizMultipleChoice, QuizOpenEnded
+
+
+def _quiz(start, count):
+    return QuizMultipleChoice(
+        quiz_text="Quiz",
+        questions=[f"Question {i} sur la photosynthèse ?" if i % 2 else f"Question {i} sur la respiration ?"
+                   for i in range(start, start + count)],
+        alternatives=[[f"a{i}", f"b{i}"] for i in range(start, start + count)],
+        answers=[f"a{i}" for i in range(start, start + count)],
+    )
+
+
+def test_serves_only_when_enough_questions_are_stored(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite3"))
+    assert bank.add_quiz("pdf-doc", "fr", "multiple-choice", _quiz(0, 3)) == 3
+    assert bank.serve("pdf-doc", "multiple-choice", QuizMultipleChoice, 5, "fr") is None
+
+    # Re-adding the same questions stores nothing new
+    assert bank.add_quiz("pdf-doc", "fr", "multiple-choice", _quiz(0, 5)) == 2
+    quiz = bank.serve("pdf-doc", "multiple-choice", QuizMultipleChoice, 5, "fr")
+    assert sorted(quiz.answers) == [f"a{i}" for i in range(5)]
+    for question, alternatives, answer in zip(quiz.questions, quiz.alternatives, quiz.answers):
+        assert alternatives == [answer, "b" + answer[1:]]
+
+    assert bank.serve("other-doc", "multiple-choice", QuizMultipleChoice, 1) is None
+    assert bank.serve("pdf-doc", "multiple-choice", QuizMultipleChoice, 1, "en") is None
+    assert bank.serve("pdf-doc", "open-ended", QuizOpenEnded, 1) is None
+
+
+def test_topic_ranks_matching_questions_first(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite3"))
+    bank.add_quiz("pdf-doc", "fr", "multiple-choice", _quiz(0, 10))
+    quiz = bank.serve("pdf-doc", "multiple-choice", QuizMultipleChoice, 5, topic="photosynthese")
+    assert all("photosynthèse" in question for question in quiz.questions)
+
+    results = bank.search('respiration "OR')
+    assert len(results) == 5 and all("respiration" in r["question"] for r in results)
+    assert bank.stats() == {"questions": 10, "documents": 1, "served": 1}
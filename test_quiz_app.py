@@ -0,0 +1,98 @@
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import dedup_index
+import extraction_cache
+import llm_cache
+import llm_clients
+import question_bank
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+from mock_openai_server import MockOpenAIServer  # noqa: E402
+
+APP = str(Path(__file__).parent / "quiz_multiple_lang.py")
+
+
+@pytest.fixture
+def app_env(tmp_path, monkeypatch):
+    # Caches and bank of their own, and the mock server instead of OpenAI
+    monkeypatch.setenv("MINDBRIDGE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(extraction_cache, "_default_cache", None)
+    monkeypatch.setattr(llm_cache, "_default_cache", None)
+    monkeypatch.setattr(question_bank, "_default_bank", None)
+    monkeypatch.setattr(dedup_index, "_default_index", None)
+    # Clients built for another test's mock server
+    monkeypatch.setattr(llm_clients, "_chat_models", OrderedDict())
+    server = MockOpenAIServer(latency=0.0).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    yield
+    server.stop()
+
+
+def generate(at):
+    at.button[0].click().run()
+    # Generation runs on the job queue: rerun, as the polling fragment would, until it is over
+    deadline = time.monotonic() + 30
+    while "generation" in at.session_state and time.monotonic() < deadline:
+        time.sleep(0.05)
+        at.run()
+    assert not at.exception
+
+
+def upload(at, pdf):
+    at.sidebar.text_input[0].input("sk-test")
+    at.file_uploader[0].set_value(("cours.pdf", pdf, "application/pdf"))
+    at.run()
+
+
+def test_answering_reruns_the_quiz_without_extracting_again(app_env):
+    pdf = (Path(__file__).parent / "temp_uploaded.pdf").read_bytes()
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    upload(at, pdf)
+    assert at.session_state["stage_spans"]["upload_read"]["bytes"] == len(pdf)
+    upload_trace = at.session_state["stage_spans"]["upload_read"]["trace"]
+
+    at.selectbox[0].set_value("true-false")
+    generate(at)
+    assert len(at.form) == 1 and len(at.session_state["quiz"])
+
+    for i in range(len(at.session_state["quiz"])):
+        at.radio(key=f"question_{i}").set_value("True")
+    at.form_submit_button[0].click().run()
+    assert not at.exception
+    assert any("Your score is" in md.value for md in at.markdown)
+    spans = at.session_state["stage_spans"]
+    assert spans["grading"]["pipeline"] == "quiz_fragment"
+    # The extraction result is pinned in the session: the upload was not read again
+    assert spans["upload_read"]["trace"] == upload_trace
+
+
+def test_removing_duplicates_shortens_the_quiz_but_not_the_cached_one(app_env):
+    pdf = (Path(__file__).parent / "temp_uploaded.pdf").read_bytes()
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    upload(at, pdf)
+
+    def policy():
+        return next(box for box in at.sidebar.selectbox if box.label.startswith("Questions proches"))
+
+    generate(at)
+    first = list(at.session_state["quiz"].questions)
+    # The mock model asks the same first questions whatever their number
+    next(box for box in at.number_input if box.label == "Number of questions").set_value(len(first) + 2)
+    policy().set_value("Retirer")
+    generate(at)
+    shortened = at.session_state["quiz"].questions
+    assert 1 <= len(shortened) < len(first) + 2
+    assert not set(shortened) & set(first)
+    assert any("ont été retirées" in info.value for info in at.info)
+
+    # Served from the cache: the model's quiz, not a filtered copy
+    policy().set_value("Signaler")
+    generate(at)
+    assert len(at.session_state["quiz"]) == len(first) + 2
+    assert llm_cache.get_quiz_cache().hits == 1
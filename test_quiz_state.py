@@ -0,0 +1,109 @@
+import threading
+
+import numpy as np
+
+import extraction_cache
+import quiz_state
+from extraction_cache import ExtractionCache
+from quiz_multiple_lang import QuizMultipleChoice, QuizOpenEnded, QuizTrueFalse
+from quiz_state import QuizState, SessionRegistry, TextStore
+
+
+def _fresh(monkeypatch, budget_bytes=10 ** 9):
+    monkeypatch.setattr(quiz_state, "_default_store", TextStore())
+    monkeypatch.setattr(extraction_cache, "_default_cache", ExtractionCache())
+    monkeypatch.setattr(quiz_state, "_default_registry", SessionRegistry(budget_bytes, min_idle_seconds=0))
+
+
+def test_answers_are_stored_as_option_indices(monkeypatch):
+    _fresh(monkeypatch)
+    state = QuizState()
+    state.set_quiz(QuizMultipleChoice(quiz_text="Quiz", questions=["Q1", "Q2"],
+                                      alternatives=[["a) Paris", "b) Lyon"], ["Oui", "Non"]],
+                                      answers=["b", "Peut-être"]), "multiple-choice")
+    assert state.answer_key.dtype == np.int8 and state.answer_key.tolist() == [1, -1]
+    assert state.correct_answer(0) == "b) Lyon" and state.correct_answer(1) is None
+
+    state.set_quiz(QuizTrueFalse(quiz_text="Quiz", questions=["Q"], answers=["Vrai"]), "true-false")
+    assert state.options(0) == ["True", "False"] and state.correct_answer(0) == "True"
+
+
+def test_sessions_share_interned_strings_and_texts(monkeypatch):
+    _fresh(monkeypatch)
+    quiz = QuizOpenEnded(questions=["".join(["Qu'est-ce que", " la photosynthèse ?"])],
+                         answers=["La conversion de la lumière en énergie chimique"])
+    first, second = QuizState(), QuizState()
+    for state in (first, second):
+        state.set_quiz(QuizOpenEnded(**quiz.model_dump()), "open-ended")
+        state.set_document("file-1", "pymupdf", "pymupdf-abc", "texte " * 1000, "pdf-abc", "passages-abc")
+    assert first.questions[0] is second.questions[0]
+    assert first.document_text("file-1", "pymupdf") is second.document_text("file-1", "pymupdf")
+    assert first.document_text("file-2", "pymupdf") is None
+    assert len(quiz_state.get_text_store()) == 1
+
+    first.release_payloads()
+    assert len(quiz_state.get_text_store()) == 1
+    del state, second  # a session that ends gives its reference back
+    assert len(quiz_state.get_text_store()) == 0
+
+
+def test_budget_releases_the_idlest_sessions_first(monkeypatch):
+    _fresh(monkeypatch)
+    states = []
+    for i in range(3):
+        state = QuizState()
+        state.set_quiz(QuizOpenEnded(questions=["Q"], answers=[f"réponse numéro {i}"]), "open-ended")
+        state.grader()
+        state.last_used = i
+        states.append(state)
+
+    registry = quiz_state.get_session_registry()
+    registry.budget_bytes = states[2].payload_bytes() * 3 // 2
+    assert registry.enforce() == 2
+    assert [state.payload_bytes() > 0 for state in states] == [False, False, True]
+    # A released grader is rebuilt on demand
+    assert states[0].grader().grade([["réponse numéro 0"]]).correct.all()
+
+
+def test_budget_covers_the_extraction_cache_memory_tier(monkeypatch, tmp_path):
+    _fresh(monkeypatch, budget_bytes=3 * 2 ** 20)
+    monkeypatch.setattr(extraction_cache, "_default_cache", ExtractionCache(disk_dir=str(tmp_path)))
+    cache = extraction_cache.get_extraction_cache()
+    shared, cached_only = "a" * 2 ** 20, "b" * 2 ** 20
+    cache.put("pymupdf-shared", shared)
+    cache.put("pymupdf-cached", cached_only)
+    state = QuizState()
+    state.set_document("file-1", "pymupdf", "pymupdf-shared", shared, "pdf-1", "passages-1")
+    registry = quiz_state.get_session_registry()
+    # The text the session and the cache share is counted once
+    assert 2 * 2 ** 20 <= registry.memory_bytes() < 3 * 2 ** 20
+
+    registry.budget_bytes = 2 ** 20 // 2
+    registry.enforce()
+    # The cache's memory tier goes first (it is on disk), then the idle session's text
+    assert cache.memory_texts() == [] and state.text_key is None
+    assert registry.memory_bytes() < 2 ** 20 // 2
+    assert cache.get("pymupdf-cached") == cached_only
+
+
+def test_budget_keeps_texts_the_extraction_cache_only_has_in_memory(monkeypatch):
+    _fresh(monkeypatch, budget_bytes=2 ** 20 // 2)
+    cache = extraction_cache.get_extraction_cache()
+    cache.put("llamaparse-abc", "c" * 2 ** 20)
+    # Without a disk tier, evicting would mean parsing (and paying for) the document again
+    quiz_state.get_session_registry().enforce()
+    assert cache.get("llamaparse-abc") is not None
+
+
+def test_payloads_released_from_another_thread_are_released_once(monkeypatch):
+    _fresh(monkeypatch)
+    owner, other = QuizState(), QuizState()
+    for state in (owner, other):
+        state.set_document("file-1", "pymupdf", "pymupdf-abc", "texte " * 100, "pdf-1", "passages-1")
+    threads = [threading.Thread(target=owner.release_payloads) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # The other session's reference to the shared text is untouched
+    assert other.document_text("file-1", "pymupdf") == "texte " * 100
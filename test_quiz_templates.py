@@ -0,0 +1,32 @@
+from langchain_core.prompts import ChatPromptTemplate
+
+import quiz_templates_miltiple_lang
+from quiz_templates_miltiple_lang import get_template, register_template
+
+
+def test_templates_are_built_once_and_shared():
+    template = get_template("true-false", "fr")
+    assert get_template("true-false", "fr") is template
+    assert "Vrai/Faux" in template.format(num_questions=3, quiz_context="...")
+
+
+def test_fallbacks_to_english_and_open_ended():
+    assert get_template("multiple-choice", "de") is get_template("multiple-choice", "en")
+    assert get_template("fill-in-the-blank", "ar") is get_template("open-ended", "ar")
+
+
+def test_registering_a_new_language(monkeypatch):
+    # Registry of its own: "es" must not leak into the other tests' fallbacks
+    monkeypatch.setattr(quiz_templates_miltiple_lang, "_template_factories",
+                        dict(quiz_templates_miltiple_lang._template_factories))
+    monkeypatch.setattr(quiz_templates_miltiple_lang, "_templates", dict(quiz_templates_miltiple_lang._templates))
+
+    def create_open_ended_template_es():
+        return ChatPromptTemplate.from_messages([
+            ("system", "Eres un motor de cuestionarios."),
+            ("human", "Crea un cuestionario con {num_questions} preguntas: {quiz_context}"),
+        ])
+
+    register_template("open-ended", "es", create_open_ended_template_es)
+    assert "cuestionario" in get_template("open-ended", "es").format(num_questions=2, quiz_context="...")
+    assert get_template("true-false", "es") is get_template("true-false", "en")
@@ -0,0 +1,24 @@
+from fake_llm import FakeQuizChatModel
+from quiz_multiple_lang import QuizMultipleChoice, QuizTrueFalse
+from quiz_templates_miltiple_lang import get_template
+from streaming_quiz import QuizStream, StreamedTrueFalseQuiz, streamed_schema_for
+
+CONTEXT = "Le soleil est une étoile. La Terre tourne autour du soleil. La Lune éclaire la nuit. Mars est rouge."
+
+
+def test_questions_arrive_before_the_reply_ends():
+    stream = QuizStream(get_template("multiple-choice", "fr"), FakeQuizChatModel(latency=0.4),
+                        QuizMultipleChoice, {"num_questions": 4, "quiz_context": CONTEXT})
+    questions = [item.question for item in stream]
+
+    assert questions == stream.quiz.questions
+    assert len(stream.quiz.alternatives) == len(stream.quiz.answers) == 4
+    assert stream.time_to_first_question < stream.total_time / 2
+
+
+def test_true_false_schema_mapping():
+    assert streamed_schema_for(QuizTrueFalse) is StreamedTrueFalseQuiz
+    stream = QuizStream(get_template("true-false", "fr"), FakeQuizChatModel(),
+                        QuizTrueFalse, {"num_questions": 3, "quiz_context": CONTEXT})
+    list(stream)
+    assert stream.quiz.answers == ["True", "False", "True"]
@@ -0,0 +1,50 @@
+import logging
+from typing import List
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+
+############################################
+# TOKEN COUNTING (tiktoken)
+############################################
+
+MODEL_NAME = "gpt-4o"
+
+# Used when the tiktoken vocabulary cannot be loaded (it is downloaded on first
+# use, so offline hosts do not have it): a rough characters-per-token ratio.
+APPROX_CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+
+
+def get_encoding():
+    """The model's tiktoken encoding, or None if it cannot be loaded."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            _encoding = tiktoken.encoding_for_model(MODEL_NAME)
+        except Exception as err:
+            logger.warning("tiktoken encoding unavailable (%s), token counts are approximate", err)
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text) // APPROX_CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_by_tokens(text: str, max_tokens: int) -> List[str]:
+    """Cut `text` into consecutive pieces of at most `max_tokens` tokens."""
+    encoding = get_encoding()
+    if encoding is None:
+        size = max_tokens * APPROX_CHARS_PER_TOKEN
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]